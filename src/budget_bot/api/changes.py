@@ -0,0 +1,64 @@
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from budget_bot.db.models import Expense, ExpenseTombstone, User
+
+from .schemas import ExpenseChanges, ExpenseRead
+
+# Больше изменений дешевле получить полной загрузкой ленты
+MAX_CHANGES = 1000
+
+
+async def load_changes(
+    session: AsyncSession, user_id: int, since: int
+) -> ExpenseChanges:
+    """
+    Возвращает расходы, созданные или измененные после версии since,
+    и ID удаленных за это время. Объем ответа зависит от числа изменений,
+    а не от размера истории.
+    """
+    result = await session.execute(
+        select(User.data_version, User.changes_horizon).where(User.id == user_id)
+    )
+    version, horizon = result.one()
+    if since == version:
+        return ExpenseChanges(cursor=version)
+    # Курсор из будущего или старше очищенных надгробий: удаления могли
+    # быть потеряны, нужна полная синхронизация
+    if since > version or since < horizon:
+        return ExpenseChanges(cursor=version, reset=True)
+
+    changed = await session.execute(
+        select(Expense)
+        .where(
+            Expense.user_id == user_id,
+            Expense.version > since,
+            Expense.version <= version,
+        )
+        .options(selectinload(Expense.category))
+        .order_by(Expense.version)
+        .limit(MAX_CHANGES + 1)
+    )
+    expenses = list(changed.scalars().all())
+    deleted = await session.execute(
+        select(ExpenseTombstone.expense_id)
+        .where(
+            ExpenseTombstone.user_id == user_id,
+            ExpenseTombstone.version > since,
+            ExpenseTombstone.version <= version,
+        )
+        .order_by(ExpenseTombstone.version)
+        .limit(MAX_CHANGES + 1)
+    )
+    deleted_ids: List[int] = list(deleted.scalars().all())
+    if len(expenses) > MAX_CHANGES or len(deleted_ids) > MAX_CHANGES:
+        return ExpenseChanges(cursor=version, reset=True)
+
+    return ExpenseChanges(
+        cursor=version,
+        changed=[ExpenseRead.model_validate(e, from_attributes=True) for e in expenses],
+        deleted=deleted_ids,
+    )
@@ -0,0 +1,67 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from budget_bot.db.models import User
+
+# Ответ зависит от пользователя: кэшировать только в клиенте и всегда
+# перепроверять по ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+async def get_data_version(session: AsyncSession, user_id: int) -> int:
+    """Возвращает текущую версию данных пользователя."""
+    result = await session.execute(select(User.data_version).where(User.id == user_id))
+    return int(result.scalar_one_or_none() or 0)
+
+
+def make_etag(user_id: int, version: int, *parts: object) -> str:
+    """
+    Слабый ETag из версии данных пользователя. Дополнительные части
+    учитывают параметры представления: строку запроса (страница, фильтры)
+    и то, чего нет в URL (например, окно сводки по умолчанию, зависящее
+    от текущей даты).
+    """
+    tag = f"{user_id}-{version}"
+    if parts:
+        digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+        tag = f"{tag}-{digest}"
+    return f'W/"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет If-None-Match по правилам слабого сравнения."""
+    if not if_none_match:
+        return False
+    candidates = {
+        value.strip().removeprefix("W/") for value in if_none_match.split(",")
+    }
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+async def check_not_modified(
+    request: Request,
+    response: Response,
+    session: AsyncSession,
+    user_id: int,
+    *parts: object,
+) -> Optional[Response]:
+    """
+    Сверяет If-None-Match с текущей версией данных до загрузки строк.
+    Возвращает готовый ответ 304, если данные не менялись; иначе
+    проставляет ETag в ответ и возвращает None. ETag зависит от параметров
+    запроса, поэтому тело другой страницы или фильтра не переиспользуется.
+    """
+    # Порядок параметров в URL на представление не влияет
+    query = sorted(request.query_params.multi_items())
+    if query:
+        parts = (query, *parts)
+    etag = make_etag(user_id, await get_data_version(session, user_id), *parts)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
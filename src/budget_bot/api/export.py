@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from budget_bot.db.models import Category, Expense
+
+from .filters import apply_expense_filter
+from .schemas import ExpenseFilter
+
+ExportFormat = Literal["csv", "jsonl"]
+
+EXPORT_MEDIA_TYPES: Dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = (
+    "id",
+    "expense_date",
+    "amount",
+    "category_id",
+    "category",
+    "created_at",
+)
+
+# Сколько строк читается из курсора БД и кодируется за один шаг
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_filename(export_format: ExportFormat) -> str:
+    """Имя файла выгрузки для указанного формата."""
+    return f"expenses.{export_format}"
+
+
+def export_statement(user_id: int, expense_filter: ExpenseFilter) -> Select[Any]:
+    """Запрос расходов пользователя с названиями категорий, от старых к новым."""
+    statement = (
+        select(
+            Expense.id,
+            Expense.expense_date,
+            Expense.amount,
+            Expense.category_id,
+            Category.name,
+            Expense.created_at,
+        )
+        .join(Category, Category.id == Expense.category_id)
+        .where(Expense.user_id == user_id)
+        .order_by(Expense.expense_date, Expense.id)
+    )
+    return apply_expense_filter(statement, expense_filter)
+
+
+def _plain(row: Sequence[Any]) -> List[Any]:
+    """Приводит даты строки к ISO 8601, остальные значения оставляет как есть."""
+    return [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in row
+    ]
+
+
+def _encode_csv(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(_plain(row) for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_jsonl(rows: Sequence[Sequence[Any]]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _plain(row))), ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+
+async def iter_export(
+    session: AsyncSession,
+    user_id: Optional[int],
+    expense_filter: ExpenseFilter,
+    export_format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Построчно выгружает расходы пользователя в CSV или JSON Lines.
+    Строки читаются серверным курсором порциями по EXPORT_BATCH_SIZE,
+    поэтому расход памяти не зависит от объема истории.
+    """
+    encode = _encode_csv if export_format == "csv" else _encode_jsonl
+    if export_format == "csv":
+        yield _encode_csv([EXPORT_COLUMNS])
+    if user_id is None:
+        return
+
+    result = await session.stream(
+        export_statement(user_id, expense_filter).execution_options(
+            yield_per=EXPORT_BATCH_SIZE
+        )
+    )
+    async for rows in result.partitions():
+        yield encode(rows)
@@ -0,0 +1,47 @@
+from datetime import date
+from typing import Any, List, Optional, TypeVar
+
+from fastapi import Query
+
+from budget_bot.db.models import Expense
+
+from .schemas import ExpenseFilter
+
+SelectT = TypeVar("SelectT", bound=Any)
+
+
+def get_expense_filter(
+    date_from: Optional[date] = Query(
+        None, description="Дата расхода от (включительно)"
+    ),
+    date_to: Optional[date] = Query(None, description="Дата расхода до (включительно)"),
+    category_id: Optional[List[int]] = Query(None, description="ID категорий"),
+    min_amount: Optional[float] = Query(None, ge=0, description="Минимальная сумма"),
+    max_amount: Optional[float] = Query(None, ge=0, description="Максимальная сумма"),
+) -> ExpenseFilter:
+    """FastAPI зависимость, собирающая фильтр расходов из query-параметров."""
+    return ExpenseFilter(
+        date_from=date_from,
+        date_to=date_to,
+        category_id=category_id or [],
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+
+
+def apply_expense_filter(statement: SelectT, expense_filter: ExpenseFilter) -> SelectT:
+    """
+    Добавляет условия фильтра в WHERE запроса по таблице расходов, чтобы отбор
+    выполнялся в SQL с использованием составных индексов по user_id.
+    """
+    if expense_filter.date_from is not None:
+        statement = statement.where(Expense.expense_date >= expense_filter.date_from)
+    if expense_filter.date_to is not None:
+        statement = statement.where(Expense.expense_date <= expense_filter.date_to)
+    if expense_filter.category_id:
+        statement = statement.where(Expense.category_id.in_(expense_filter.category_id))
+    if expense_filter.min_amount is not None:
+        statement = statement.where(Expense.amount >= expense_filter.min_amount)
+    if expense_filter.max_amount is not None:
+        statement = statement.where(Expense.amount <= expense_filter.max_amount)
+    return statement
@@ -0,0 +1,250 @@
+import codecs
+import csv
+from collections import deque
+from datetime import UTC, datetime
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from budget_bot.db.models import Category, Expense
+
+from .schemas import ImportReport, ImportRow, ImportRowError, format_validation_error
+
+# Сколько строк вставляется одним executemany и фиксируется одним коммитом
+IMPORT_CHUNK_SIZE = 1000
+
+# Сколько ошибок по строкам попадает в отчет (остальные только считаются)
+MAX_IMPORT_ERRORS = 100
+
+IMPORT_COLUMNS = ("expense_date", "amount", "category")
+
+# Предельный размер одной записи CSV в символах: незакрытая кавычка не должна
+# накапливать в памяти весь остаток файла
+MAX_IMPORT_RECORD_SIZE = 64 * 1024
+
+# (номер строки файла, значения полей, ошибка разбора записи)
+CsvRecord = Tuple[int, List[str], Optional[str]]
+
+
+class _LineFeed:
+    """
+    Пополняемый источник строк для csv.reader. Когда строки кончаются,
+    итератор отмечает это в starved, но после пополнения снова отдает строки.
+    """
+
+    def __init__(self) -> None:
+        self.lines: Deque[str] = deque()
+        self.taken: List[str] = []
+        self.starved = False
+
+    def __iter__(self) -> "_LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            self.starved = True
+            raise StopIteration
+        line = self.lines.popleft()
+        self.taken.append(line)
+        return line
+
+
+async def iter_csv_records(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[List[CsvRecord]]:
+    """
+    Разбирает CSV по мере поступления данных одним csv.reader. Для каждого
+    куска входного потока отдает записи, завершенные в нем; незаконченная
+    строка и запись с переводом строки внутри кавычек переносятся в следующий
+    кусок. Запись, которую csv не разобрал или которая длиннее
+    MAX_IMPORT_RECORD_SIZE, отдается с ошибкой вместо полей.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    pending = ""
+    line_number = 0
+
+    def complete(final: bool) -> List[CsvRecord]:
+        nonlocal line_number
+        records: List[CsvRecord] = []
+        while feed.lines:
+            feed.taken, feed.starved = [], False
+            start = line_number + 1
+            try:
+                fields: List[str] = next(reader)
+            except csv.Error as exc:
+                line_number += len(feed.taken)
+                records.append((start, [], f"Malformed CSV record: {exc}."))
+                continue
+            if feed.starved:
+                if sum(map(len, feed.taken)) > MAX_IMPORT_RECORD_SIZE:
+                    # Скорее всего лишняя кавычка: пропускаем первую строку
+                    # записи, остальные разбираются заново
+                    feed.lines.extendleft(reversed(feed.taken[1:]))
+                    line_number += 1
+                    records.append((start, [], "CSV record is too long."))
+                    continue
+                if not final:
+                    # Запись продолжается в следующем куске
+                    feed.lines.extendleft(reversed(feed.taken))
+                    break
+            line_number += len(feed.taken)
+            if any(field.strip() for field in fields):
+                records.append((start, fields, None))
+        return records
+
+    async for chunk in chunks:
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        feed.lines.extend(line + "\n" for line in lines)
+        records = complete(final=False)
+        if records:
+            yield records
+
+    tail = pending + decoder.decode(b"", final=True)
+    if tail:
+        feed.lines.append(tail)
+    # Незакрытая кавычка в конце файла: запись отдается как есть
+    records = complete(final=True)
+    if records:
+        yield records
+
+
+def parse_header(fields: List[str]) -> Dict[str, int]:
+    """Возвращает позиции нужных колонок в заголовке CSV."""
+    positions = {name.strip().lower(): index for index, name in enumerate(fields)}
+    missing = [name for name in IMPORT_COLUMNS if name not in positions]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"CSV header must contain columns: {', '.join(IMPORT_COLUMNS)}.",
+        )
+    return {name: positions[name] for name in IMPORT_COLUMNS}
+
+
+async def load_category_map(session: AsyncSession, user_id: int) -> Dict[str, int]:
+    """Возвращает ID категорий пользователя по названию (один запрос)."""
+    result = await session.execute(
+        select(Category.name, Category.id).where(Category.user_id == user_id)
+    )
+    return {name: category_id for name, category_id in result.tuples()}
+
+
+def _add_error(report: ImportReport, line: int, detail: str) -> None:
+    report.failed += 1
+    if len(report.errors) < MAX_IMPORT_ERRORS:
+        report.errors.append(ImportRowError(line=line, detail=detail))
+
+
+async def _flush(
+    session: AsyncSession,
+    user_id: int,
+    rows: List[ImportRow],
+    categories: Dict[str, int],
+    report: ImportReport,
+) -> None:
+    """Создает недостающие категории и вставляет пачку расходов одним коммитом."""
+    missing = sorted({row.category for row in rows} - categories.keys())
+    if missing:
+        result = await session.execute(
+            insert(Category).returning(Category.name, Category.id),
+            [{"user_id": user_id, "name": name} for name in missing],
+        )
+        categories.update({name: category_id for name, category_id in result})
+        report.created_categories += len(missing)
+
+    # Вставка через Core-таблицу минует накладные расходы ORM bulk insert
+    created_at = datetime.now(UTC)
+    connection = await session.connection()
+    await connection.execute(
+        insert(Expense.__table__),
+        [
+            {
+                "user_id": user_id,
+                "category_id": categories[row.category],
+                "amount": row.amount,
+                "expense_date": row.expense_date,
+                "created_at": created_at,
+            }
+            for row in rows
+        ],
+    )
+    await session.commit()
+    report.imported += len(rows)
+
+
+async def import_expenses(
+    session: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterable[bytes],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Импортирует расходы из CSV с колонками expense_date, amount, category
+    (остальные колонки игнорируются). Файл разбирается потоково, расходы
+    вставляются пачками по chunk_size с коммитом на каждую пачку, поэтому
+    в памяти одновременно находится не больше одной пачки.
+    """
+    report = ImportReport()
+    categories = await load_category_map(session, user_id)
+    header: Optional[Dict[str, int]] = None
+    width = len(IMPORT_COLUMNS)
+    rows: List[ImportRow] = []
+
+    async for records in iter_csv_records(chunks):
+        for line, fields, error in records:
+            if header is None:
+                if error is not None:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"CSV header is malformed: {error}",
+                    )
+                header = parse_header(fields)
+                width = max(header.values()) + 1
+                continue
+
+            report.processed += 1
+            if error is not None:
+                _add_error(report, line, error)
+                continue
+            if len(fields) < width:
+                _add_error(report, line, "Missing columns.")
+                continue
+            try:
+                rows.append(
+                    ImportRow.model_validate(
+                        {name: fields[index] for name, index in header.items()}
+                    )
+                )
+            except ValidationError as exc:
+                _add_error(report, line, format_validation_error(exc))
+                continue
+
+            if len(rows) >= chunk_size:
+                await _flush(session, user_id, rows, categories, report)
+                rows = []
+                if on_progress is not None:
+                    on_progress(report)
+
+    if header is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="CSV file is empty."
+        )
+    if rows:
+        await _flush(session, user_id, rows, categories, report)
+        if on_progress is not None:
+            on_progress(report)
+    return report
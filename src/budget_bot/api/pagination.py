@@ -0,0 +1,37 @@
+import base64
+import binascii
+from datetime import date
+from typing import Tuple
+
+from fastapi import HTTPException, status
+
+# Размер страницы ленты расходов
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(expense_date: date, expense_id: int) -> str:
+    """Кодирует позицию (expense_date, id) в непрозрачный курсор."""
+    raw = f"{expense_date.isoformat()}|{expense_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Декодирует курсор в позицию (expense_date, id).
+    Бросает HTTPException 400, если курсор поврежден.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_date, raw_id = (
+            base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        )
+        return date.fromisoformat(raw_date), int(raw_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
@@ -1,47 +1,137 @@
 import logging
-from typing import Any, Dict, List
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import (
+    CursorResult,
+    String,
+    delete,
+    exists,
+    insert,
+    literal,
+    literal_column,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
-from budget_bot.db.models import Category, Expense, User
-from budget_bot.db.session import get_session
+from budget_bot.db.identity import create_user, resolve_user_id
+from budget_bot.db.models import Category, Expense
+from budget_bot.db.session import get_read_session, get_session, get_writer
+from budget_bot.db.writer import WriteCoordinator, WriteJob
 from budget_bot.utils.security import get_validated_user_data
 
+from .changes import load_changes
+from .etag import check_not_modified
+from .export import (
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    export_filename,
+    iter_export,
+)
+from .filters import apply_expense_filter, get_expense_filter
+from .importer import import_expenses
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+)
 from .schemas import (
+    MAX_BATCH_SIZE,
+    BulkResult,
     CategoryCreate,
+    CategoryMerge,
     CategoryRead,
     CreateExpense,
+    ExpenseBatchError,
+    ExpenseBatchItem,
+    ExpenseBatchResult,
+    ExpenseChanges,
+    ExpenseFilter,
+    ExpenseIds,
+    ExpenseListFormat,
     ExpenseRead,
+    ExpenseRecategorize,
+    ExpenseSummary,
+    ImportReport,
+    SummaryPeriod,
+    format_validation_error,
+)
+from .serialization import (
+    COLUMNAR_MEDIA_TYPE,
+    FastJSONResponse,
+    category_json,
+    expense_columns,
+    expense_json,
+    expense_rows_statement,
+    json_list,
+)
+from .summary import (
+    build_summary,
+    can_use_rollups,
+    rollup_statement,
+    summary_statement,
+    summary_window,
 )
 
 router = APIRouter(prefix="/api")
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 # --- Эндпоинты для Категорий ---
 
 
 @router.get("/categories", response_model=List[CategoryRead])
 async def get_categories(
+    request: Request,
+    response: Response,
     user_data: Dict[str, Any] = Depends(get_validated_user_data),
-    session: AsyncSession = Depends(get_session),
-) -> List[Category]:
-    """Возвращает список категорий для текущего пользователя."""
-    telegram_id = user_data.get("id")
-    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-    user = result.scalars().one_or_none()
-    if not user:
+    session: AsyncSession = Depends(get_read_session),
+) -> Union[List[CategoryRead], Response]:
+    """
+    Возвращает список категорий для текущего пользователя.
+    Поддерживает условный запрос по ETag версии данных пользователя.
+    """
+    user_id = await resolve_user_id(user_data.get("id"), session)
+    if user_id is None:
         return []
+    not_modified = await check_not_modified(request, response, session, user_id)
+    if not_modified is not None:
+        return not_modified
 
     result = await session.execute(
-        select(Category).where(Category.user_id == user.id).order_by(Category.name)
+        select(Category.id, Category.name)
+        .where(Category.user_id == user_id)
+        .order_by(Category.name)
     )
-    categories = result.scalars().all()
-    return list(categories)
+    return json_list(result, lambda row: category_json(*row), response.headers)
 
 
 @router.post("/categories", response_model=CategoryRead, status_code=201)
@@ -49,40 +139,97 @@ async def create_category(
     category_data: CategoryCreate,
     user_data: Dict[str, Any] = Depends(get_validated_user_data),
     session: AsyncSession = Depends(get_session),
-) -> Category:
+    writer: WriteCoordinator = Depends(get_writer),
+) -> CategoryRead:
     """Создает новую категорию для текущего пользователя."""
-    telegram_id = user_data.get("id")
-    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-    user = result.scalars().one_or_none()
-    if not user:
+    user_id = await resolve_user_id(user_data.get("id"), session)
+    if user_id is None:
         # В тестах пользователь еще не создан, создадим его здесь
-        full_name = user_data.get("first_name", "")
-        if last_name := user_data.get("last_name"):
-            full_name += f" {last_name}"
-        user = User(telegram_id=telegram_id, full_name=full_name.strip())
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
+        user_id = await create_user(user_data, session)
+
+    async def insert_category(write_session: AsyncSession) -> CategoryRead:
+        result = await write_session.execute(
+            insert(Category)
+            .values(user_id=user_id, name=category_data.name)
+            .returning(Category.id, Category.name)
+        )
+        category_id, name = result.one()
+        return CategoryRead(id=category_id, name=name)
+
+    category: CategoryRead = await writer.submit(insert_category)
+    return category
+
+
+async def submit_write(
+    writer: WriteCoordinator, job: WriteJob[Union[T, HTTPException]]
+) -> T:
+    """
+    Выполняет операцию через писателя. Отказ (404/403) операция возвращает,
+    а не выбрасывает: ее запросы ничего не изменили, и пачке не нужен повтор
+    с SAVEPOINT. Здесь отказ становится ответом клиенту.
+    """
+    result: Union[T, HTTPException] = await writer.submit(job)
+    if isinstance(result, HTTPException):
+        raise result
+    return result
+
+
+@router.post("/categories/{category_id}/merge", response_model=BulkResult)
+async def merge_category(
+    category_id: int,
+    merge_data: CategoryMerge,
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_session),
+) -> BulkResult:
+    """
+    Переносит все расходы категории в целевую и удаляет исходную категорию.
+    Выполняется одним UPDATE и одним DELETE в одной транзакции.
+    """
+    telegram_id = user_data.get("id")
+    if not isinstance(telegram_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid user ID in initData.",
+        )
+    if category_id == merge_data.target_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot merge a category into itself.",
+        )
+    user_id = await get_user_id(telegram_id, session)
+    owned = await owned_category_ids(
+        {category_id, merge_data.target_id}, user_id, session
+    )
+    if len(owned) != 2:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found or access denied.",
+        )
 
-    new_category = Category.model_validate(category_data, update={"user_id": user.id})
-    session.add(new_category)
+    moved = await execute_bulk(
+        update(Expense)
+        .where(Expense.user_id == user_id, Expense.category_id == category_id)
+        .values(category_id=merge_data.target_id),
+        session,
+    )
+    await session.execute(
+        delete(Category).where(Category.user_id == user_id, Category.id == category_id)
+    )
     await session.commit()
-    await session.refresh(new_category)
-    return new_category
+    return BulkResult(affected=moved)
 
 
 # --- Эндпоинты для Расходов ---
 
 
-async def get_user_from_db(telegram_id: int, session: AsyncSession) -> User:
-    """Вспомогательная функция для получения пользователя."""
-    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-    user = result.scalars().one_or_none()
-    if not user:
+async def get_user_id(telegram_id: int, session: AsyncSession) -> int:
+    """Вспомогательная функция для получения идентификатора пользователя."""
+    user_id: Optional[int] = await resolve_user_id(telegram_id, session)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="User not found."
         )
-    return user
+    return user_id
 
 
 async def verify_category_owner(
@@ -98,93 +245,457 @@ async def verify_category_owner(
         )
 
 
-@router.post("/expenses", status_code=201)
+def category_owned_by(category_id: int, user_id: int) -> Any:
+    """Условие EXISTS для проверки владения категорией внутри самого запроса."""
+    return exists().where(Category.id == category_id, Category.user_id == user_id)
+
+
+def expense_read_columns() -> Tuple[Any, ...]:
+    """
+    Колонки RETURNING, из которых собирается ExpenseRead (включая название
+    категории) без дополнительного SELECT.
+    """
+    return (
+        Expense.id,
+        Expense.amount,
+        Expense.expense_date,
+        Expense.created_at,
+        Expense.category_id,
+        # В RETURNING для INSERT SQLAlchemy не коррелирует подзапрос с
+        # вставляемой таблицей, поэтому он задан явным SQL
+        literal_column(
+            "(SELECT category.name FROM category "
+            "WHERE category.id = expense.category_id)",
+            String,
+        ),
+    )
+
+
+def expense_read_from_row(row: Any) -> ExpenseRead:
+    """Собирает ExpenseRead из строки с колонками expense_read_columns()."""
+    expense_id, amount, expense_date, created_at, category_id, category_name = row
+    return ExpenseRead(
+        id=expense_id,
+        amount=amount,
+        expense_date=expense_date,
+        created_at=created_at,
+        category=CategoryRead(id=category_id, name=category_name),
+    )
+
+
+async def owned_category_ids(
+    category_ids: Set[int], user_id: int, session: AsyncSession
+) -> Set[int]:
+    """Возвращает подмножество категорий, принадлежащих пользователю (один запрос)."""
+    if not category_ids:
+        return set()
+    result = await session.execute(
+        select(Category.id).where(
+            Category.user_id == user_id, Category.id.in_(category_ids)
+        )
+    )
+    return {cast(int, category_id) for category_id in result.scalars()}
+
+
+async def execute_bulk(statement: Any, session: AsyncSession) -> int:
+    """Выполняет массовый UPDATE/DELETE и возвращает число затронутых строк."""
+    result = cast(CursorResult[Any], await session.execute(statement))
+    return int(result.rowcount)
+
+
+@router.post("/expenses", response_model=ExpenseRead, status_code=201)
 async def add_expense(
     expense_data: CreateExpense,
     user_data: Dict[str, Any] = Depends(get_validated_user_data),
     session: AsyncSession = Depends(get_session),
-) -> Response:
-    """Добавляет новый расход."""
+    writer: WriteCoordinator = Depends(get_writer),
+) -> ExpenseRead:
+    """
+    Добавляет новый расход одним запросом с проверкой владения категорией.
+    Запись выполняется через групповой коммит единственного писателя.
+    """
+    telegram_id = user_data.get("id")
+    if not isinstance(telegram_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid user ID in initData.",
+        )
+    user_id = await get_user_id(telegram_id, session)
+
+    # INSERT ... SELECT ... WHERE EXISTS: вставка и проверка владения
+    # категорией выполняются одним запросом, созданная строка — через RETURNING
+    new_expense = Expense.model_validate(expense_data, update={"user_id": user_id})
+    values = new_expense.model_dump(exclude={"id"})
+
+    async def insert_expense(
+        write_session: AsyncSession,
+    ) -> Union[ExpenseRead, HTTPException]:
+        result = await write_session.execute(
+            insert(Expense.__table__)
+            .from_select(
+                list(values),
+                select(*(literal(value) for value in values.values())).where(
+                    category_owned_by(expense_data.category_id, user_id)
+                ),
+            )
+            .returning(*expense_read_columns())
+        )
+        row = result.one_or_none()
+        if row is None:
+            return HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found or access denied.",
+            )
+        return expense_read_from_row(row)
+
+    expense: ExpenseRead = await submit_write(writer, insert_expense)
+    return expense
+
+
+@router.post("/expenses/batch", response_model=ExpenseBatchResult, status_code=201)
+async def add_expenses_batch(
+    response: Response,
+    items: List[Dict[str, Any]] = Body(..., min_length=1, max_length=MAX_BATCH_SIZE),
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_session),
+) -> ExpenseBatchResult:
+    """
+    Добавляет пачку расходов в одной транзакции: владение категориями
+    проверяется одним запросом, вставка — одним executemany.
+    Некорректные элементы пропускаются и возвращаются в errors с их индексом;
+    если не прошел ни один элемент, ответ — 422.
+    """
     telegram_id = user_data.get("id")
     if not isinstance(telegram_id, int):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid user ID in initData.",
         )
-    user = await get_user_from_db(telegram_id, session)
-    await verify_category_owner(expense_data.category_id, user.id, session)
+    user_id = await get_user_id(telegram_id, session)
+
+    errors: List[ExpenseBatchError] = []
+    valid: List[Tuple[int, CreateExpense]] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, CreateExpense.model_validate(item)))
+        except ValidationError as exc:
+            errors.append(
+                ExpenseBatchError(index=index, detail=format_validation_error(exc))
+            )
+
+    owned = await owned_category_ids(
+        {expense.category_id for _, expense in valid}, user_id, session
+    )
+    indexes: List[int] = []
+    rows: List[Dict[str, Any]] = []
+    for index, expense in valid:
+        if expense.category_id not in owned:
+            errors.append(
+                ExpenseBatchError(
+                    index=index, detail="Category not found or access denied."
+                )
+            )
+            continue
+        indexes.append(index)
+        rows.append(
+            Expense.model_validate(expense, update={"user_id": user_id}).model_dump(
+                exclude={"id"}
+            )
+        )
 
-    new_expense = Expense.model_validate(expense_data, update={"user_id": user.id})
-    session.add(new_expense)
+    created: List[ExpenseBatchItem] = []
+    if rows:
+        result = await session.execute(
+            insert(Expense).returning(Expense.id, sort_by_parameter_order=True), rows
+        )
+        await session.commit()
+        created = [
+            ExpenseBatchItem(index=index, id=expense_id)
+            for index, expense_id in zip(indexes, result.scalars().all())
+        ]
+    else:
+        response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    errors.sort(key=lambda error: error.index)
+    return ExpenseBatchResult(created=created, errors=errors)
+
+
+@router.post("/expenses/bulk-delete", response_model=BulkResult)
+async def delete_expenses_bulk(
+    expense_ids: ExpenseIds,
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_session),
+) -> BulkResult:
+    """
+    Удаляет расходы по списку ID одним DELETE. Чужие и несуществующие ID
+    пропускаются; в ответе — число удаленных расходов.
+    """
+    telegram_id = user_data.get("id")
+    if not isinstance(telegram_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid user ID in initData.",
+        )
+    user_id = await get_user_id(telegram_id, session)
+    deleted = await execute_bulk(
+        delete(Expense).where(
+            Expense.user_id == user_id, Expense.id.in_(expense_ids.ids)
+        ),
+        session,
+    )
     await session.commit()
-    return JSONResponse(
-        content={"message": "Expense added successfully"}, status_code=201
+    return BulkResult(affected=deleted)
+
+
+@router.post("/expenses/bulk-recategorize", response_model=BulkResult)
+async def recategorize_expenses_bulk(
+    recategorize_data: ExpenseRecategorize,
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_session),
+) -> BulkResult:
+    """
+    Переносит в категорию расходы, выбранные по списку ID или по фильтру,
+    одним UPDATE. В ответе — число перенесенных расходов.
+    """
+    telegram_id = user_data.get("id")
+    if not isinstance(telegram_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid user ID in initData.",
+        )
+    user_id = await get_user_id(telegram_id, session)
+    await verify_category_owner(recategorize_data.category_id, user_id, session)
+
+    statement = (
+        update(Expense)
+        .where(Expense.user_id == user_id)
+        .values(category_id=recategorize_data.category_id)
     )
+    if recategorize_data.ids is not None:
+        statement = statement.where(Expense.id.in_(recategorize_data.ids))
+    if recategorize_data.where is not None:
+        statement = apply_expense_filter(statement, recategorize_data.where)
+    moved = await execute_bulk(statement, session)
+    await session.commit()
+    return BulkResult(affected=moved)
 
 
-@router.get("/expenses", response_model=List[ExpenseRead])
+@router.get(
+    "/expenses",
+    response_model=List[ExpenseRead],
+    responses={200: {"content": {COLUMNAR_MEDIA_TYPE: {}}}},
+)
 async def get_expenses(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    list_format: Optional[ExpenseListFormat] = Query(None, alias="format"),
+    expense_filter: ExpenseFilter = Depends(get_expense_filter),
     user_data: Dict[str, Any] = Depends(get_validated_user_data),
-    session: AsyncSession = Depends(get_session),
-) -> List[Expense]:
-    """Возвращает список расходов текущего пользователя."""
+    session: AsyncSession = Depends(get_read_session),
+) -> Union[List[ExpenseRead], Response]:
+    """
+    Возвращает страницу расходов текущего пользователя, от новых к старым.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
+    Необязательные параметры фильтра сужают выборку на стороне БД.
+    Если данные не менялись (If-None-Match), отвечает 304 без чтения строк.
+    С format=columnar или Accept: application/vnd.budget.columnar+json
+    страница отдается в колоночном виде (см. expense_columns).
+    """
+    if list_format is None:
+        accept = request.headers.get("Accept", "")
+        list_format = "columnar" if COLUMNAR_MEDIA_TYPE in accept else "json"
+    columnar = list_format == "columnar"
+    response.headers["Vary"] = "Accept"
+
     # В этом эндпоинте не бросаем ошибку, если юзера нет, а возвращаем [].
     # Это штатная ситуация для нового пользователя.
-    result = await session.execute(
-        select(User).where(User.telegram_id == user_data.get("id"))
-    )
-    user = result.scalars().one_or_none()
-    if not user:
+    user_id = await resolve_user_id(user_data.get("id"), session)
+    if user_id is None:
+        if columnar:
+            return FastJSONResponse(
+                expense_columns([]),
+                headers=response.headers,
+                media_type=COLUMNAR_MEDIA_TYPE,
+            )
         return []
+    not_modified = await check_not_modified(
+        request, response, session, user_id, *(("columnar",) if columnar else ())
+    )
+    if not_modified is not None:
+        return not_modified
 
     statement = (
-        select(Expense)
-        .where(Expense.user_id == user.id)
-        .options(selectinload(Expense.category))
+        expense_rows_statement(user_id)
         .order_by(Expense.expense_date.desc(), Expense.id.desc())
+        .limit(limit + 1)
     )
+    statement = apply_expense_filter(statement, expense_filter)
+    if cursor is not None:
+        # Keyset-пагинация: продолжаем строго после последней выданной строки
+        after_date, after_id = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(Expense.expense_date, Expense.id)
+            < tuple_(literal(after_date), literal(after_id))
+        )
     result = await session.execute(statement)
-    expenses = result.scalars().all()
-    return list(expenses)
+    rows = list(result.tuples())
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id, _, last_date = rows[-1][:3]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_date, last_id)
+    if columnar:
+        return FastJSONResponse(
+            expense_columns(rows),
+            headers=response.headers,
+            media_type=COLUMNAR_MEDIA_TYPE,
+        )
+    return json_list(rows, expense_json, response.headers)
 
 
-@router.put("/expenses/{expense_id}", response_model=ExpenseRead)
-async def update_expense(
-    expense_id: int,
-    expense_data: CreateExpense,
+@router.get("/expenses/changes", response_model=ExpenseChanges)
+async def get_expense_changes(
+    since: int = Query(0, ge=0, description="Курсор из прошлого ответа"),
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_read_session),
+) -> ExpenseChanges:
+    """
+    Дельта-синхронизация: расходы, созданные или измененные после курсора,
+    и ID удаленных. При since=0 возвращает всю историю, если она небольшая.
+    """
+    user_id = await resolve_user_id(user_data.get("id"), session)
+    if user_id is None:
+        return ExpenseChanges(cursor=0)
+    changes: ExpenseChanges = await load_changes(session, user_id, since)
+    return changes
+
+
+@router.get("/expenses/export")
+async def export_expenses(
+    export_format: ExportFormat = Query("csv", alias="format"),
+    expense_filter: ExpenseFilter = Depends(get_expense_filter),
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_read_session),
+) -> StreamingResponse:
+    """
+    Потоково выгружает расходы текущего пользователя в CSV или JSON Lines
+    с теми же фильтрами, что и список расходов.
+    """
+    user_id = await resolve_user_id(user_data.get("id"), session)
+
+    async def body() -> AsyncIterator[bytes]:
+        # Выход из зависимости get_session происходит до отправки тела ответа,
+        # поэтому сессия закрывается здесь, когда выгрузка завершена
+        try:
+            async for chunk in iter_export(
+                session, user_id, expense_filter, export_format
+            ):
+                yield chunk
+        finally:
+            await session.close()
+
+    filename = export_filename(export_format)
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/expenses/import",
+    response_model=ImportReport,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/csv": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def import_expenses_csv(
+    request: Request,
     user_data: Dict[str, Any] = Depends(get_validated_user_data),
     session: AsyncSession = Depends(get_session),
-) -> Expense:
-    """Обновляет расход."""
+) -> ImportReport:
+    """
+    Импортирует расходы из CSV в теле запроса (колонки expense_date, amount,
+    category). Тело читается потоково, отсутствующие категории создаются.
+    В ответе — счетчики строк и ошибки по номерам строк файла.
+    """
     telegram_id = user_data.get("id")
     if not isinstance(telegram_id, int):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid user ID in initData.",
         )
-    user = await get_user_from_db(telegram_id, session)
-    await verify_category_owner(expense_data.category_id, user.id, session)
+    user_id = await resolve_user_id(telegram_id, session)
+    if user_id is None:
+        user_id = await create_user(user_data, session)
+
+    def log_progress(report: ImportReport) -> None:
+        logger.info(
+            "Импорт расходов пользователя %s: обработано %s, импортировано %s",
+            user_id,
+            report.processed,
+            report.imported,
+        )
 
-    result = await session.execute(
-        select(Expense)
-        .where(Expense.id == expense_id)
-        .options(selectinload(Expense.category))
+    report: ImportReport = await import_expenses(
+        session, user_id, request.stream(), on_progress=log_progress
     )
-    expense = result.scalars().one_or_none()
+    return report
 
-    if not expense or expense.user_id != user.id:
+
+@router.put("/expenses/{expense_id}", response_model=ExpenseRead)
+async def update_expense(
+    expense_id: int,
+    expense_data: CreateExpense,
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_session),
+    writer: WriteCoordinator = Depends(get_writer),
+) -> ExpenseRead:
+    """Обновляет расход одним запросом с проверкой владения."""
+    telegram_id = user_data.get("id")
+    if not isinstance(telegram_id, int):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expense not found or access denied.",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid user ID in initData.",
         )
-
-    update_data = expense_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(expense, key, value)
-
-    session.add(expense)
-    await session.commit()
-    await session.refresh(expense)
+    user_id = await get_user_id(telegram_id, session)
+
+    # Один UPDATE с проверкой владения расходом и категорией; обновленная
+    # строка и название категории возвращаются через RETURNING
+    async def update_row(
+        write_session: AsyncSession,
+    ) -> Union[ExpenseRead, HTTPException]:
+        result = await write_session.execute(
+            update(Expense)
+            .where(
+                Expense.id == expense_id,
+                Expense.user_id == user_id,
+                category_owned_by(expense_data.category_id, user_id),
+            )
+            .values(**expense_data.model_dump())
+            .returning(*expense_read_columns())
+        )
+        row = result.one_or_none()
+        if row is None:
+            # Причину отказа выясняем только на неуспешном пути
+            try:
+                await verify_category_owner(
+                    expense_data.category_id, user_id, write_session
+                )
+            except HTTPException as error:
+                return error
+            return HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Expense not found or access denied.",
+            )
+        return expense_read_from_row(row)
+
+    expense: ExpenseRead = await submit_write(writer, update_row)
     return expense
 
 
@@ -193,30 +704,80 @@ async def delete_expense(
     expense_id: int,
     user_data: Dict[str, Any] = Depends(get_validated_user_data),
     session: AsyncSession = Depends(get_session),
+    writer: WriteCoordinator = Depends(get_writer),
 ) -> None:
-    """Удаляет расход."""
+    """Удаляет расход одним запросом с проверкой владения."""
     telegram_id = user_data.get("id")
     if not isinstance(telegram_id, int):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid user ID in initData.",
         )
-    user = await get_user_from_db(telegram_id, session)
-    result = await session.execute(select(Expense).where(Expense.id == expense_id))
-    expense = result.scalars().one_or_none()
+    user_id = await get_user_id(telegram_id, session)
 
-    if not expense:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expense not found.",
+    async def delete_row(write_session: AsyncSession) -> Optional[HTTPException]:
+        deleted = await execute_bulk(
+            delete(Expense).where(Expense.id == expense_id, Expense.user_id == user_id),
+            write_session,
         )
+        if not deleted:
+            # Различаем «нет такого расхода» и «чужой расход» только при отказе
+            owner = await write_session.execute(
+                select(Expense.user_id).where(Expense.id == expense_id)
+            )
+            if owner.scalar_one_or_none() is None:
+                return HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Expense not found.",
+                )
+            return HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied: you can only delete your own expenses.",
+            )
+        return None
+
+    await submit_write(writer, delete_row)
+    return None
 
-    if expense.user_id != user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied: you can only delete your own expenses.",
-        )
 
-    await session.delete(expense)
-    await session.commit()
-    return None
+# --- Эндпоинты для Сводки ---
+
+
+@router.get("/summary", response_model=ExpenseSummary)
+async def get_summary(
+    request: Request,
+    response: Response,
+    period: SummaryPeriod = "month",
+    expense_filter: ExpenseFilter = Depends(get_expense_filter),
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+    session: AsyncSession = Depends(get_read_session),
+) -> Union[ExpenseSummary, Response]:
+    """
+    Возвращает суммы, количество и средний расход по категориям и периодам
+    (день/неделя/месяц) за окно дат. По умолчанию окно — текущий месяц.
+    Помесячная сводка по целым месяцам читается из таблицы агрегатов.
+    Поддерживает условный запрос по ETag версии данных пользователя.
+    """
+    date_from, date_to = summary_window(expense_filter)
+    user_id = await resolve_user_id(user_data.get("id"), session)
+    if user_id is None:
+        return build_summary([], period, date_from, date_to)
+    # Окно по умолчанию зависит от текущей даты, поэтому входит в ETag
+    not_modified = await check_not_modified(
+        request, response, session, user_id, date_from, date_to
+    )
+    if not_modified is not None:
+        return not_modified
+
+    if can_use_rollups(period, expense_filter, date_from, date_to):
+        statement = rollup_statement(user_id, expense_filter, date_from, date_to)
+    else:
+        statement = summary_statement(
+            user_id,
+            period,
+            expense_filter.model_copy(
+                update={"date_from": date_from, "date_to": date_to}
+            ),
+        )
+    result = await session.execute(statement)
+    return build_summary(result.tuples(), period, date_from, date_to)
@@ -1,6 +1,7 @@
 from datetime import date, datetime
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 
 
 class CategoryBase(BaseModel):
@@ -32,3 +33,160 @@ class ExpenseRead(ExpenseBase):
     id: int
     created_at: datetime
     category: CategoryRead
+
+
+# Представление ленты расходов: список ExpenseRead или колоночный формат
+ExpenseListFormat = Literal["json", "columnar"]
+
+
+class ExpenseChanges(BaseModel):
+    """
+    Изменения расходов после курсора since. Клиент сначала удаляет deleted,
+    затем применяет changed и сохраняет cursor для следующего запроса.
+    При reset локальную копию нужно сбросить и загрузить ленту заново.
+    """
+
+    cursor: int
+    reset: bool = False
+    changed: List[ExpenseRead] = Field(default_factory=list)
+    deleted: List[int] = Field(default_factory=list)
+
+
+# Максимальное число расходов в одном запросе пакетного создания
+MAX_BATCH_SIZE = 500
+
+
+class ExpenseBatchItem(BaseModel):
+    """Созданный расход: позиция в запросе и его ID."""
+
+    index: int
+    id: int
+
+
+class ExpenseBatchError(BaseModel):
+    """Ошибка элемента пакета: позиция в запросе и причина."""
+
+    index: int
+    detail: str
+
+
+class ExpenseBatchResult(BaseModel):
+    """Результат пакетного создания расходов."""
+
+    created: List[ExpenseBatchItem]
+    errors: List[ExpenseBatchError]
+
+
+class ImportRow(ExpenseBase):
+    """Строка CSV-импорта: категория задается названием."""
+
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    category: str = Field(..., min_length=1, max_length=100)
+
+
+class ImportRowError(BaseModel):
+    """Ошибка строки импорта: номер строки файла и причина."""
+
+    line: int
+    detail: str
+
+
+class ImportReport(BaseModel):
+    """Итог импорта: счетчики строк и первые ошибки по строкам."""
+
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    created_categories: int = 0
+    errors: List[ImportRowError] = Field(default_factory=list)
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    """Сводит ошибки валидации pydantic в одну строку."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+class ExpenseFilter(BaseModel):
+    """Условия отбора расходов (все необязательные, объединяются через AND)."""
+
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    category_id: List[int] = Field(default_factory=list)
+    min_amount: Optional[float] = Field(None, ge=0)
+    max_amount: Optional[float] = Field(None, ge=0)
+
+
+class ExpenseIds(BaseModel):
+    """Список ID расходов для массовой операции."""
+
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class ExpenseRecategorize(BaseModel):
+    """Перенос расходов в категорию: по списку ID или по фильтру (ровно одно)."""
+
+    category_id: int
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BATCH_SIZE)
+    where: Optional[ExpenseFilter] = None
+
+    @model_validator(mode="after")
+    def check_selector(self) -> "ExpenseRecategorize":
+        if (self.ids is None) == (self.where is None):
+            raise ValueError("Exactly one of 'ids' or 'where' must be provided.")
+        # Пустой фильтр выбрал бы всю историю расходов пользователя
+        if self.where is not None and not self.where.model_dump(exclude_defaults=True):
+            raise ValueError("'where' must contain at least one condition.")
+        return self
+
+
+class CategoryMerge(BaseModel):
+    """Категория, в которую переносятся расходы объединяемой категории."""
+
+    target_id: int
+
+
+class BulkResult(BaseModel):
+    """Результат массовой операции: число затронутых расходов."""
+
+    affected: int
+
+
+SummaryPeriod = Literal["day", "week", "month"]
+
+
+class SummaryBucket(BaseModel):
+    """Агрегаты по группе расходов."""
+
+    total: float
+    count: int
+    average: float
+
+
+class CategorySummary(SummaryBucket):
+    """Итоги по категории."""
+
+    category_id: int
+    name: str
+
+
+class PeriodSummary(SummaryBucket):
+    """
+    Итоги за период. Ключ периода: YYYY-MM-DD для дня, дата понедельника
+    для недели, YYYY-MM для месяца.
+    """
+
+    period: str
+
+
+class ExpenseSummary(SummaryBucket):
+    """Сводка расходов за окно дат."""
+
+    period: SummaryPeriod
+    date_from: date
+    date_to: date
+    by_category: List[CategorySummary]
+    by_period: List[PeriodSummary]
@@ -0,0 +1,113 @@
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Select, select
+
+from budget_bot.db.models import Category, Expense
+
+
+def dumps(content: Any) -> bytes:
+    """Кодирует содержимое ответа в компактный JSON (UTF-8, даты в ISO 8601)."""
+    return bytes(orjson.dumps(content))
+
+
+# Тип содержимого компактной (колоночной) ленты расходов
+COLUMNAR_MEDIA_TYPE = "application/vnd.budget.columnar+json"
+
+
+class FastJSONResponse(Response):
+    """
+    JSON-ответ, который кодирует готовые словари и списки без валидации
+    через response_model. Схема в OpenAPI по-прежнему берется из
+    response_model эндпоинта, поэтому содержимое обязано ей соответствовать.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def category_json(category_id: int, name: str) -> Dict[str, Any]:
+    """Словарь в форме CategoryRead (порядок ключей как у pydantic)."""
+    return {"name": name, "id": category_id}
+
+
+def expense_rows_statement(user_id: int) -> Select[Any]:
+    """
+    Запрос расходов пользователя кортежами в порядке полей expense_json:
+    строки кодируются в JSON напрямую, минуя ORM-объекты и повторную
+    валидацию через response_model.
+    """
+    return (
+        select(
+            Expense.id,
+            Expense.amount,
+            Expense.expense_date,
+            Expense.created_at,
+            Expense.category_id,
+            Category.name,
+        )
+        .join(Category, Category.id == Expense.category_id)
+        .where(Expense.user_id == user_id)
+    )
+
+
+def expense_json(row: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Словарь в форме ExpenseRead из строки
+    (id, amount, expense_date, created_at, category_id, category_name).
+    """
+    expense_id, amount, expense_date, created_at, category_id, category_name = row
+    return {
+        "amount": amount,
+        "expense_date": expense_date,
+        "id": expense_id,
+        "created_at": created_at,
+        "category": category_json(category_id, category_name),
+    }
+
+
+def expense_columns(rows: Iterable[Sequence[Any]]) -> Dict[str, Any]:
+    """
+    Колоночное представление ленты из строк expense_rows_statement:
+    параллельные массивы полей расходов и словарь категорий, на который
+    ссылается category_indexes. i-й расход — это ids[i], amounts[i],
+    expense_dates[i], created_at[i] и categories[category_indexes[i]].
+    """
+    ids: List[int] = []
+    amounts: List[float] = []
+    expense_dates: List[Any] = []
+    created: List[Any] = []
+    category_indexes: List[int] = []
+    positions: Dict[int, int] = {}
+    categories: List[Dict[str, Any]] = []
+    for expense_id, amount, expense_date, created_at, category_id, name in rows:
+        position = positions.get(category_id)
+        if position is None:
+            position = positions[category_id] = len(categories)
+            categories.append(category_json(category_id, name))
+        ids.append(expense_id)
+        amounts.append(amount)
+        expense_dates.append(expense_date)
+        created.append(created_at)
+        category_indexes.append(position)
+    return {
+        "ids": ids,
+        "amounts": amounts,
+        "expense_dates": expense_dates,
+        "created_at": created,
+        "category_indexes": category_indexes,
+        "categories": categories,
+    }
+
+
+def json_list(
+    rows: Iterable[Sequence[Any]],
+    convert: Callable[[Sequence[Any]], Dict[str, Any]],
+    headers: Optional[Mapping[str, str]] = None,
+) -> FastJSONResponse:
+    """Ответ со списком, собранным из строк результата запроса."""
+    content: List[Dict[str, Any]] = [convert(row) for row in rows]
+    return FastJSONResponse(content, headers=headers)
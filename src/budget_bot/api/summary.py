@@ -0,0 +1,151 @@
+import calendar
+from datetime import date
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy import Select, func, select
+
+from budget_bot.db.models import Category, Expense, ExpenseMonthlyRollup
+
+from .filters import apply_expense_filter
+from .schemas import (
+    CategorySummary,
+    ExpenseFilter,
+    ExpenseSummary,
+    PeriodSummary,
+    SummaryPeriod,
+)
+
+# Строка сгруппированного запроса: (category_id, name, period, total, count)
+SummaryRow = Tuple[int, str, str, float, int]
+
+
+def period_key(period: SummaryPeriod) -> Any:
+    """Возвращает SQL-выражение ключа периода для даты расхода."""
+    if period == "day":
+        return func.date(Expense.expense_date)
+    if period == "week":
+        # Понедельник недели: ближайшее воскресенье не раньше даты минус 6 дней
+        return func.date(Expense.expense_date, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m", Expense.expense_date)
+
+
+def _month_end(day: date) -> date:
+    """Последний день месяца для указанной даты."""
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def summary_window(expense_filter: ExpenseFilter) -> Tuple[date, date]:
+    """
+    Возвращает окно дат сводки. По умолчанию — текущий месяц целиком;
+    если задана только одна граница, вторая берется по ее месяцу.
+    """
+    anchor = expense_filter.date_to or expense_filter.date_from or date.today()
+    date_from = expense_filter.date_from or anchor.replace(day=1)
+    date_to = expense_filter.date_to or _month_end(anchor)
+    return date_from, date_to
+
+
+def can_use_rollups(
+    period: SummaryPeriod, expense_filter: ExpenseFilter, date_from: date, date_to: date
+) -> bool:
+    """
+    Месячные агрегаты подходят, если окно состоит из целых месяцев,
+    группировка помесячная и нет фильтра по сумме.
+    """
+    return (
+        period == "month"
+        and expense_filter.min_amount is None
+        and expense_filter.max_amount is None
+        and date_from.day == 1
+        and date_to == _month_end(date_to)
+    )
+
+
+def rollup_statement(
+    user_id: int, expense_filter: ExpenseFilter, date_from: date, date_to: date
+) -> Select[SummaryRow]:
+    """Строит запрос сводки по таблице месячных агрегатов."""
+    statement = (
+        select(
+            ExpenseMonthlyRollup.category_id,
+            Category.name,
+            ExpenseMonthlyRollup.month,
+            ExpenseMonthlyRollup.total,
+            ExpenseMonthlyRollup.count,
+        )
+        .join(Category, Category.id == ExpenseMonthlyRollup.category_id)
+        .where(ExpenseMonthlyRollup.user_id == user_id)
+        .where(ExpenseMonthlyRollup.month >= date_from.strftime("%Y-%m"))
+        .where(ExpenseMonthlyRollup.month <= date_to.strftime("%Y-%m"))
+    )
+    if expense_filter.category_id:
+        statement = statement.where(
+            ExpenseMonthlyRollup.category_id.in_(expense_filter.category_id)
+        )
+    return statement
+
+
+def summary_statement(
+    user_id: int, period: SummaryPeriod, expense_filter: ExpenseFilter
+) -> Select[SummaryRow]:
+    """Строит один сгруппированный запрос по (категория, период)."""
+    period_value = period_key(period).label("period")
+    statement = (
+        select(
+            Expense.category_id,
+            Category.name,
+            period_value,
+            func.sum(Expense.amount),
+            func.count(),
+        )
+        .join(Category, Category.id == Expense.category_id)
+        .where(Expense.user_id == user_id)
+        .group_by(Expense.category_id, Category.name, period_value)
+    )
+    return apply_expense_filter(statement, expense_filter)
+
+
+def build_summary(
+    rows: Iterable[SummaryRow],
+    period: SummaryPeriod,
+    date_from: date,
+    date_to: date,
+) -> ExpenseSummary:
+    """Сворачивает строки GROUP BY (категория, период) в итоговую сводку."""
+    by_category: Dict[int, Dict[str, Any]] = {}
+    by_period: Dict[str, Dict[str, Any]] = {}
+    total, count = 0.0, 0
+
+    for category_id, name, period_value, row_total, row_count in rows:
+        category = by_category.setdefault(
+            category_id,
+            {"category_id": category_id, "name": name, "total": 0.0, "count": 0},
+        )
+        bucket = by_period.setdefault(
+            period_value, {"period": period_value, "total": 0.0, "count": 0}
+        )
+        for item in (category, bucket):
+            item["total"] += row_total
+            item["count"] += row_count
+
+        total += row_total
+        count += row_count
+
+    def average(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {**item, "average": item["total"] / item["count"]}
+
+    return ExpenseSummary(
+        period=period,
+        date_from=date_from,
+        date_to=date_to,
+        total=total,
+        count=count,
+        average=total / count if count else 0.0,
+        by_category=sorted(
+            (CategorySummary(**average(item)) for item in by_category.values()),
+            key=lambda item: (-item.total, item.name),
+        ),
+        by_period=[
+            PeriodSummary(**average(by_period[key])) for key in sorted(by_period)
+        ],
+    )
@@ -0,0 +1,161 @@
+# src/budget_bot/assets.py
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request, Response, status
+
+try:  # brotli необязателен: без него отдаются только gzip и исходные файлы
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+# Главная страница перепроверяется при каждом открытии (ответ 304 из памяти),
+# а файлы с хэшем в имени не меняются и кэшируются клиентом надолго
+ENTRY_CACHE_CONTROL = "no-cache"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+ENTRY_NAME = "index.html"
+
+# Кодировки в порядке предпочтения -> функция сжатия
+_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+}
+if brotli is not None:  # pragma: no cover - зависит от окружения
+    _COMPRESSORS = {"br": lambda data: bytes(brotli.compress(data)), **_COMPRESSORS}
+
+
+@dataclass(frozen=True)
+class Asset:
+    """Файл фронтенда в памяти: исходное содержимое и сжатые варианты."""
+
+    content_type: str
+    digest: str
+    cache_control: str
+    # Кодировка ("identity", "gzip", "br") -> тело ответа
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        """Сильный ETag варианта: у каждой кодировки свой."""
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest}{suffix}"'
+
+
+def hashed_name(name: str, digest: str) -> str:
+    """Имя файла с хэшем содержимого: app.js -> app.<hash>.js."""
+    path = Path(name)
+    return str(path.with_name(f"{path.stem}.{digest[:12]}{path.suffix}"))
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Кодировки из Accept-Encoding, которые клиент не запретил (q=0)."""
+    encodings: List[str] = []
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if name and not (match and float(match.group(1)) == 0):
+            encodings.append(name.strip().lower())
+    return encodings
+
+
+def _make_asset(data: bytes, name: str, cache_control: str) -> Asset:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type.endswith(
+        ("javascript", "json", "svg+xml")
+    ):
+        content_type = f"{content_type}; charset=utf-8"
+    bodies = {"identity": data}
+    for encoding, compress in _COMPRESSORS.items():
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            bodies[encoding] = compressed
+    return Asset(
+        content_type=content_type,
+        digest=hashlib.sha256(data).hexdigest()[:32],
+        cache_control=cache_control,
+        bodies=bodies,
+    )
+
+
+class AssetBundle:
+    """
+    Фронтенд Mini App, собранный один раз при старте: файлы читаются с диска,
+    сжимаются заранее и отдаются из памяти. Ссылки главной страницы на
+    /static/<файл> заменяются именами с хэшем содержимого.
+    """
+
+    def __init__(self, entry: Asset, assets: Dict[str, Asset]) -> None:
+        self.entry = entry
+        self.assets = assets
+
+    @classmethod
+    def build(cls, directory: Path) -> "AssetBundle":
+        assets: Dict[str, Asset] = {}
+        links: Dict[str, str] = {}
+        for path in sorted(directory.rglob("*")):
+            name = path.relative_to(directory).as_posix()
+            if not path.is_file() or name == ENTRY_NAME or path.suffix == ".py":
+                continue
+            data = path.read_bytes()
+            # Исходное имя оставлено для совместимости, но без долгого кэша
+            assets[name] = _make_asset(data, name, ENTRY_CACHE_CONTROL)
+            hashed = hashed_name(name, assets[name].digest)
+            assets[hashed] = replace(
+                assets[name], cache_control=IMMUTABLE_CACHE_CONTROL
+            )
+            links[f"/static/{name}"] = f"/static/{hashed}"
+
+        html = (directory / ENTRY_NAME).read_text(encoding="utf-8")
+        for link, hashed_link in links.items():
+            html = re.sub(
+                rf"""(["']){re.escape(link)}\1""", rf"\g<1>{hashed_link}\1", html
+            )
+        entry = _make_asset(html.encode(), ENTRY_NAME, ENTRY_CACHE_CONTROL)
+        return cls(entry, assets)
+
+    def get(self, name: str) -> Optional[Asset]:
+        """
+        Файл по пути внутри /static (None, если такого нет). Главная страница
+        доступна и как /static/index.html — по этому адресу ее отдавала
+        прежняя раздача статики, и на него могут вести ссылки Mini App.
+        """
+        if name == ENTRY_NAME:
+            return self.entry
+        return self.assets.get(name)
+
+
+@lru_cache(maxsize=None)
+def load_bundle(directory: Path) -> AssetBundle:
+    """Собирает фронтенд из каталога при первом обращении и держит в памяти."""
+    return AssetBundle.build(directory)
+
+
+def asset_response(asset: Asset, request: Request) -> Response:
+    """
+    Отдает вариант файла в лучшей из принятых клиентом кодировок.
+    Если клиент прислал совпадающий ETag, отвечает 304 без тела.
+    """
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+    encoding = next(
+        (name for name in _COMPRESSORS if name in accepted and name in asset.bodies),
+        "identity",
+    )
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": asset.cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("If-None-Match", "")
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in tags or headers["ETag"] in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(
+        asset.bodies[encoding], media_type=asset.content_type, headers=headers
+    )
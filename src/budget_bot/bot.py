@@ -0,0 +1,105 @@
+# src/budget_bot/bot.py
+import asyncio
+import logging
+import signal
+from contextlib import suppress
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from budget_bot.config import BotSettings
+from budget_bot.db.changes import run_tombstone_purger
+from budget_bot.db.engine import engine
+from budget_bot.db.session import shard_router
+from budget_bot.db.shards import run_shard_purger
+from budget_bot.handlers import common, export
+from budget_bot.webhook import TelegramWebhook
+
+logger = logging.getLogger(__name__)
+
+
+def create_dispatcher(web_app_url: str) -> Dispatcher:
+    """Создает диспетчер aiogram с роутерами и общими зависимостями."""
+    dp = Dispatcher()
+    dp.include_router(common.router)
+    dp.include_router(export.router)
+    dp["web_app_url"] = web_app_url
+    dp["session_factory"] = async_sessionmaker(engine, expire_on_commit=False)
+    dp["shards"] = shard_router
+    return dp
+
+
+def load_bot_settings() -> Optional[BotSettings]:
+    """Читает настройки бота; при нехватке обязательных пишет ошибку в лог."""
+    settings = BotSettings.from_env()
+    if not settings.token:
+        logger.error("BOT_TOKEN не найден в .env файле!")
+        return None
+    if not settings.web_app_url:
+        logger.error("WEB_APP_URL не найден в .env файле!")
+        return None
+    if settings.mode == "webhook" and not settings.webhook_secret:
+        logger.error("WEBHOOK_SECRET не найден в .env файле!")
+        return None
+    return settings
+
+
+def create_webhook(settings: BotSettings) -> TelegramWebhook:
+    """Бот с диспетчером для приема обновлений через webhook."""
+    return TelegramWebhook(
+        Bot(token=settings.token),
+        create_dispatcher(settings.web_app_url),
+        settings.webhook_secret,
+    )
+
+
+async def wait_for_shutdown() -> None:
+    """Ждет SIGINT или SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+
+
+async def run_bot(settings: BotSettings) -> None:
+    """
+    Работа выделенного процесса бота в режиме supervisor. При polling
+    процесс опрашивает Telegram; при webhook обновления принимают процессы
+    API, а этот процесс только регистрирует webhook. В обоих режимах здесь
+    же, в единственном экземпляре, работают фоновые задачи.
+    """
+    purger = asyncio.create_task(
+        run_tombstone_purger(engine)
+        if shard_router is None
+        else run_shard_purger(shard_router)
+    )
+    try:
+        if settings.mode == "webhook":
+            webhook = create_webhook(settings)
+            try:
+                await webhook.register(settings.webhook_base_url)
+                await wait_for_shutdown()
+            finally:
+                await webhook.bot.session.close()
+        else:
+            bot = Bot(token=settings.token)
+            # Пока webhook зарегистрирован, Telegram не отдает обновления опросом
+            await bot.delete_webhook()
+            await create_dispatcher(settings.web_app_url).start_polling(bot)
+    finally:
+        purger.cancel()
+        if shard_router is not None:
+            await shard_router.close()
+        await engine.dispose()
+
+
+def run_bot_process() -> None:
+    """Точка входа процесса бота, который запускает supervisor."""
+    logging.basicConfig(level=logging.INFO)
+    settings = load_bot_settings()
+    if settings is None:
+        return
+    with suppress(KeyboardInterrupt):
+        asyncio.run(run_bot(settings))
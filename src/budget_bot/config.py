@@ -0,0 +1,179 @@
+# src/budget_bot/config.py
+import os
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+# Переменные из .env должны быть доступны до создания движка БД
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Читает булево значение из переменной окружения."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    """Читает целое значение из переменной окружения."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Читает вещественное значение из переменной окружения."""
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """Настройки подключения к базе данных."""
+
+    url: str = "sqlite+aiosqlite:///budget.db"
+    # Адрес для чтения (реплика). Пустой — та же БД: для SQLite открывается
+    # в режиме только для чтения (mode=ro, query_only)
+    read_url: str = ""
+    echo: bool = False
+    pool_size: int = 5
+    # Отдельный пул соединений для чтения
+    read_pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    # Размер кэша скомпилированных SQLAlchemy выражений
+    statement_cache_size: int = 500
+    # PRAGMA, применяемые к каждому новому соединению SQLite
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # Отрицательное значение задает размер кэша страниц в КиБ
+    sqlite_cache_size: int = -64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
+    @property
+    def is_sqlite(self) -> bool:
+        """Используется ли SQLite."""
+        return self.url.startswith("sqlite")
+
+    @property
+    def is_sqlite_memory(self) -> bool:
+        """Используется ли SQLite в памяти (без файла и пула соединений)."""
+        return self.is_sqlite and (
+            ":memory:" in self.url
+            or "mode=memory" in self.url
+            or self.url.endswith("://")
+        )
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        """Собирает настройки из переменных окружения."""
+        defaults = cls()
+        return cls(
+            url=os.getenv("DATABASE_URL", defaults.url),
+            read_url=os.getenv("DATABASE_READ_URL", defaults.read_url),
+            echo=_env_bool("DATABASE_ECHO", defaults.echo),
+            pool_size=_env_int("DATABASE_POOL_SIZE", defaults.pool_size),
+            read_pool_size=_env_int("DATABASE_READ_POOL_SIZE", defaults.read_pool_size),
+            max_overflow=_env_int("DATABASE_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=_env_float("DATABASE_POOL_TIMEOUT", defaults.pool_timeout),
+            statement_cache_size=_env_int(
+                "DATABASE_STATEMENT_CACHE_SIZE", defaults.statement_cache_size
+            ),
+            sqlite_journal_mode=os.getenv(
+                "SQLITE_JOURNAL_MODE", defaults.sqlite_journal_mode
+            ),
+            sqlite_synchronous=os.getenv(
+                "SQLITE_SYNCHRONOUS", defaults.sqlite_synchronous
+            ),
+            sqlite_mmap_size=_env_int("SQLITE_MMAP_SIZE", defaults.sqlite_mmap_size),
+            sqlite_cache_size=_env_int("SQLITE_CACHE_SIZE", defaults.sqlite_cache_size),
+            sqlite_busy_timeout_ms=_env_int(
+                "SQLITE_BUSY_TIMEOUT_MS", defaults.sqlite_busy_timeout_ms
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class ShardSettings:
+    """Настройки шардирования данных пользователей по файлам SQLite."""
+
+    # off — одна БД; hash — count файлов по хэшу telegram_id; user — файл
+    # на каждого пользователя
+    mode: str = "off"
+    count: int = 16
+    directory: str = "shards"
+    # Сколько шардов (движков с пулами соединений) процесс держит открытыми
+    cache_size: int = 64
+
+    @property
+    def enabled(self) -> bool:
+        """Включено ли шардирование."""
+        return self.mode != "off"
+
+    @classmethod
+    def from_env(cls) -> "ShardSettings":
+        """Собирает настройки из переменных окружения."""
+        defaults = cls()
+        return cls(
+            mode=os.getenv("SHARD_MODE", defaults.mode),
+            count=_env_int("SHARD_COUNT", defaults.count),
+            directory=os.getenv("SHARD_DIR", defaults.directory),
+            cache_size=_env_int("SHARD_CACHE_SIZE", defaults.cache_size),
+        )
+
+
+@dataclass(frozen=True)
+class BotSettings:
+    """Настройки бота и способа получения обновлений Telegram."""
+
+    token: str = ""
+    web_app_url: str = ""
+    # polling — опрос из процесса бота, webhook — обновления на маршрут FastAPI
+    mode: str = "polling"
+    webhook_secret: str = ""
+    # Публичный адрес для setWebhook (по умолчанию web_app_url)
+    webhook_base_url: str = ""
+
+    @classmethod
+    def from_env(cls) -> "BotSettings":
+        """Собирает настройки из переменных окружения."""
+        web_app_url = os.getenv("WEB_APP_URL", "")
+        return cls(
+            token=os.getenv("BOT_TOKEN", ""),
+            web_app_url=web_app_url,
+            mode=os.getenv("BOT_MODE", "polling"),
+            webhook_secret=os.getenv("WEBHOOK_SECRET", ""),
+            webhook_base_url=os.getenv("WEBHOOK_BASE_URL", web_app_url),
+        )
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    """Настройки веб-сервера и топологии процессов."""
+
+    host: str = "0.0.0.0"  # nosec B104
+    port: int = 8000
+    # Число процессов API в режиме supervisor (0 — по числу ядер)
+    workers: int = 0
+    # Применять миграции при старте приложения. Supervisor применяет их
+    # один раз до запуска процессов и отключает в процессах API
+    run_migrations: bool = True
+    # Фоновые задачи (очистка надгробий, регистрация webhook) выполняет
+    # ровно один процесс: единственный в обычном режиме или процесс бота
+    run_background_tasks: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ServerSettings":
+        """Собирает настройки из переменных окружения."""
+        defaults = cls()
+        return cls(
+            host=os.getenv("API_HOST", defaults.host),
+            port=_env_int("API_PORT", defaults.port),
+            workers=_env_int("API_WORKERS", defaults.workers),
+            run_migrations=_env_bool("RUN_MIGRATIONS", defaults.run_migrations),
+            run_background_tasks=_env_bool(
+                "RUN_BACKGROUND_TASKS", defaults.run_background_tasks
+            ),
+        )
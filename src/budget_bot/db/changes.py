@@ -0,0 +1,147 @@
+# src/budget_bot/db/changes.py
+import asyncio
+import logging
+import os
+from datetime import UTC, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Сколько дней хранятся надгробия удаленных расходов
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Как часто фоновая задача очищает устаревшие надгробия, сек
+TOMBSTONE_PURGE_INTERVAL = float(os.getenv("TOMBSTONE_PURGE_INTERVAL", "3600"))
+
+_BUMP = """
+    UPDATE "user" SET data_version = data_version + 1
+    WHERE id IN ({users});
+"""
+
+_STAMP = """
+    UPDATE expense
+    SET version = (SELECT data_version FROM "user" WHERE id = NEW.user_id)
+    WHERE id = NEW.id;
+"""
+
+_TOMBSTONE = """
+    INSERT OR REPLACE INTO expense_tombstone
+        (user_id, version, expense_id, deleted_at)
+    VALUES (
+        OLD.user_id,
+        (SELECT data_version FROM "user" WHERE id = OLD.user_id),
+        OLD.id,
+        strftime('%Y-%m-%d %H:%M:%f', 'now')
+    );
+"""
+
+# Триггеры расходов заменяют прежние expense_data_version_*: кроме версии
+# данных пользователя они проставляют версию измененной строке и оставляют
+# надгробие для удаленной. Обновление только колонки version их не вызывает.
+SUPERSEDED_TRIGGERS: List[str] = [
+    "expense_data_version_insert",
+    "expense_data_version_update",
+    "expense_data_version_delete",
+]
+
+CHANGE_FEED_TRIGGERS: Dict[str, str] = {
+    "expense_changes_insert": f"""
+        CREATE TRIGGER expense_changes_insert AFTER INSERT ON expense
+        BEGIN {_BUMP.format(users="NEW.user_id")} {_STAMP} END
+    """,
+    "expense_changes_update": f"""
+        CREATE TRIGGER expense_changes_update
+        AFTER UPDATE OF user_id, category_id, amount, expense_date ON expense
+        BEGIN {_BUMP.format(users="OLD.user_id, NEW.user_id")} {_STAMP} END
+    """,
+    "expense_changes_delete": f"""
+        CREATE TRIGGER expense_changes_delete AFTER DELETE ON expense
+        BEGIN {_BUMP.format(users="OLD.user_id")} {_TOMBSTONE} END
+    """,
+}
+
+
+def install_triggers(conn: Connection) -> None:
+    """Пересоздает триггеры ленты изменений расходов."""
+    for name in SUPERSEDED_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    for name, ddl in CHANGE_FEED_TRIGGERS.items():
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql(ddl)
+
+
+def add_version_columns(conn: Connection) -> None:
+    """Добавляет колонки expense.version и user.changes_horizon, если их нет."""
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(expense)"))}
+    if "version" not in columns:
+        conn.execute(
+            text("ALTER TABLE expense ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        )
+    user_columns = {row[1] for row in conn.execute(text('PRAGMA table_info("user")'))}
+    if "changes_horizon" not in user_columns:
+        conn.execute(
+            text(
+                'ALTER TABLE "user" '
+                "ADD COLUMN changes_horizon INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+
+
+def backfill_versions(conn: Connection) -> None:
+    """
+    Проставляет существующим расходам новую версию данных пользователя,
+    чтобы они попали в первую синхронизацию клиента (since=0).
+    """
+    conn.execute(text('UPDATE "user" SET data_version = data_version + 1'))
+    conn.execute(
+        text(
+            'UPDATE expense SET version = (SELECT data_version FROM "user" '
+            "WHERE id = expense.user_id)"
+        )
+    )
+
+
+def purge_tombstones(conn: Connection, now: Optional[datetime] = None) -> int:
+    """
+    Удаляет надгробия старше срока хранения. Для затронутых пользователей
+    сдвигает changes_horizon: клиент с курсором ниже горизонта должен
+    выполнить полную синхронизацию. Возвращает число удаленных надгробий.
+    """
+    cutoff = (now or datetime.now(UTC)) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    params = {"cutoff": cutoff.strftime("%Y-%m-%d %H:%M:%f")}
+    conn.execute(
+        text(
+            'UPDATE "user" SET changes_horizon = ('
+            "SELECT MAX(version) FROM expense_tombstone "
+            'WHERE user_id = "user".id AND deleted_at < :cutoff) '
+            "WHERE id IN (SELECT user_id FROM expense_tombstone "
+            "WHERE deleted_at < :cutoff)"
+        ),
+        params,
+    )
+    result = conn.execute(
+        text("DELETE FROM expense_tombstone WHERE deleted_at < :cutoff"), params
+    )
+    return int(result.rowcount)
+
+
+async def run_tombstone_purger(
+    engine: AsyncEngine, interval: float = TOMBSTONE_PURGE_INTERVAL
+) -> None:
+    """
+    Периодически очищает устаревшие надгробия (фоновая задача приложения).
+    Ошибка одного прохода (например, занятая БД) только пишется в лог:
+    задачу никто не ожидает, и без перехвата очистка остановилась бы навсегда.
+    """
+    while True:
+        try:
+            async with engine.begin() as conn:
+                purged = await conn.run_sync(purge_tombstones)
+            if purged:
+                logger.info("Удалено устаревших надгробий расходов: %s", purged)
+        except Exception:  # повтор через interval
+            logger.exception("Очистка надгробий не удалась")
+        await asyncio.sleep(interval)
@@ -1,13 +1,86 @@
 # src/budget_bot/db/engine.py
+from typing import Any, Dict
+
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
-from sqlmodel import SQLModel
 
-DATABASE_URL = "sqlite+aiosqlite:///budget.db"
+from budget_bot.config import DatabaseSettings
+
+
+def _sqlite_pragmas(settings: DatabaseSettings) -> Dict[str, Any]:
+    """Возвращает PRAGMA для настройки производительности SQLite."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": "MEMORY",
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+    }
+
+
+def read_only_url(settings: DatabaseSettings) -> str:
+    """
+    Адрес БД для чтения: реплика из настроек или, для файла SQLite, тот же
+    файл, открытый в режиме только для чтения.
+    """
+    if settings.read_url:
+        return str(settings.read_url)
+    if not settings.is_sqlite or settings.is_sqlite_memory:
+        return str(settings.url)
+    url = make_url(settings.url)
+    return url.set(
+        database=f"file:{url.database}",
+        query={**url.query, "mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+
+def create_engine_from_settings(
+    settings: DatabaseSettings, read_only: bool = False
+) -> AsyncEngine:
+    """
+    Создает асинхронный движок БД по настройкам. С read_only — движок для
+    чтения со своим пулом соединений (см. read_only_url).
+    """
+    url = read_only_url(settings) if read_only else settings.url
+    kwargs: Dict[str, Any] = {
+        "echo": settings.echo,
+        "query_cache_size": settings.statement_cache_size,
+    }
+    # Для SQLite в памяти SQLAlchemy использует StaticPool без параметров пула
+    if not settings.is_sqlite_memory:
+        kwargs.update(
+            pool_size=settings.read_pool_size if read_only else settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+        )
+    new_engine = create_async_engine(url, **kwargs)
+
+    if url.startswith("sqlite"):
+        pragmas = _sqlite_pragmas(settings)
+        if read_only:
+            # Режим журнала задает пишущий движок; чтение дополнительно
+            # защищено от случайной записи
+            del pragmas["journal_mode"], pragmas["synchronous"]
+            pragmas["query_only"] = "ON"
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def apply_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return new_engine
+
 
-engine: AsyncEngine = create_async_engine(DATABASE_URL, echo=True)
+settings = DatabaseSettings.from_env()
 
+engine: AsyncEngine = create_engine_from_settings(settings)
 
-async def create_db_and_tables() -> None:
-    """Инициализирует базу данных и создает таблицы."""
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+# Для SQLite в памяти отдельное соединение открыло бы другую, пустую БД
+read_engine: AsyncEngine = (
+    engine
+    if settings.is_sqlite_memory and not settings.read_url
+    else create_engine_from_settings(settings, read_only=True)
+)
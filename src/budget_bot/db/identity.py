@@ -0,0 +1,94 @@
+# src/budget_bot/db/identity.py
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, cast
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from budget_bot.db.models import User
+from budget_bot.utils.cache import CacheStats
+
+
+class IdentityCache:
+    """
+    Ограниченное in-memory отображение telegram_id -> User.id.
+
+    Заполняется лениво при первом обращении и избавляет каждый запрос API
+    от отдельного SELECT по таблице пользователей.
+    """
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.maxsize = maxsize
+        self.counters = CacheStats()
+        self._entries: "OrderedDict[int, int]" = OrderedDict()
+
+    def get(self, telegram_id: int) -> Optional[int]:
+        """Возвращает User.id из кэша или None."""
+        user_id = self._entries.get(telegram_id)
+        if user_id is None:
+            self.counters.misses += 1
+            return None
+        self._entries.move_to_end(telegram_id)
+        self.counters.hits += 1
+        return user_id
+
+    def put(self, telegram_id: int, user_id: int) -> None:
+        """Запоминает соответствие, вытесняя самые старые записи."""
+        if self.maxsize <= 0:
+            return
+        self._entries[telegram_id] = user_id
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        """Удаляет запись для пользователя."""
+        self._entries.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        """Очищает кэш и сбрасывает счетчики."""
+        self._entries.clear()
+        self.counters.reset()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает статистику кэша для подбора его размера."""
+        stats: Dict[str, Any] = self.counters.snapshot(len(self), self.maxsize)
+        return stats
+
+
+identity_cache = IdentityCache(maxsize=int(os.getenv("IDENTITY_CACHE_SIZE", "10000")))
+
+
+async def resolve_user_id(telegram_id: int, session: AsyncSession) -> Optional[int]:
+    """Возвращает User.id по telegram_id, обращаясь к БД только при промахе."""
+    cached_id = identity_cache.get(telegram_id)
+    if cached_id is not None:
+        return cached_id
+
+    result = await session.execute(
+        select(User.id).where(User.telegram_id == telegram_id)
+    )
+    user_id: Optional[int] = result.scalar_one_or_none()
+    if user_id is not None:
+        identity_cache.put(telegram_id, user_id)
+    return user_id
+
+
+async def create_user(user_data: Dict[str, Any], session: AsyncSession) -> int:
+    """Создает пользователя по данным initData и обновляет кэш идентификаторов."""
+    telegram_id: int = user_data["id"]
+    full_name = user_data.get("first_name", "")
+    if last_name := user_data.get("last_name"):
+        full_name += f" {last_name}"
+    user = User(telegram_id=telegram_id, full_name=full_name.strip())
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    user_id = cast(int, user.id)
+    # Перезаписываем возможную устаревшую запись для этого telegram_id
+    identity_cache.put(telegram_id, user_id)
+    return user_id
@@ -0,0 +1,215 @@
+# src/budget_bot/db/migrations.py
+import asyncio
+import logging
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import Column, Connection, Integer, Table, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
+
+from budget_bot.db import changes, rollups, versioning
+
+logger = logging.getLogger(__name__)
+
+# Таблица с текущей версией схемы БД (одна строка)
+schema_version = Table(
+    "schema_version",
+    SQLModel.metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    """Шаг миграции схемы."""
+
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _execute_all(conn: Connection, statements: List[str]) -> None:
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
+# DDL миграций зафиксирован текстом, а не строится из моделей: версия схемы
+# всегда означает одну и ту же схему, как бы модели ни менялись потом.
+# Колонки, которые добавили более поздние миграции, в этих таблицах нет
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS "user" (
+        id INTEGER NOT NULL,
+        telegram_id INTEGER NOT NULL,
+        full_name VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_telegram_id ON "user" (telegram_id)',
+    """
+    CREATE TABLE IF NOT EXISTS category (
+        id INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES "user" (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_category_user_id ON category (user_id)",
+    """
+    CREATE TABLE IF NOT EXISTS expense (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        amount FLOAT NOT NULL,
+        expense_date DATE NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES "user" (id),
+        FOREIGN KEY(category_id) REFERENCES category (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_expense_user_id ON expense (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_expense_category_id ON expense (category_id)",
+]
+
+# Составные индексы под основные запросы; одиночные индексы по user_id,
+# которые они покрывают, удаляются
+COMPOSITE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_category_user_id_name ON category (user_id, name)",
+    "CREATE INDEX IF NOT EXISTS ix_expense_user_id_expense_date_id "
+    "ON expense (user_id, expense_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_expense_user_id_category_id "
+    "ON expense (user_id, category_id)",
+    "DROP INDEX IF EXISTS ix_category_user_id",
+    "DROP INDEX IF EXISTS ix_expense_user_id",
+]
+
+MONTHLY_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS expense_monthly_rollup (
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        month VARCHAR(7) NOT NULL,
+        total FLOAT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, category_id, month),
+        FOREIGN KEY(user_id) REFERENCES "user" (id),
+        FOREIGN KEY(category_id) REFERENCES category (id)
+    )
+"""
+
+CHANGE_FEED_TABLES = [
+    "CREATE INDEX IF NOT EXISTS ix_expense_user_id_version "
+    "ON expense (user_id, version)",
+    """
+    CREATE TABLE IF NOT EXISTS expense_tombstone (
+        user_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        expense_id INTEGER NOT NULL,
+        deleted_at DATETIME NOT NULL,
+        PRIMARY KEY (user_id, version),
+        FOREIGN KEY(user_id) REFERENCES "user" (id)
+    )
+    """,
+]
+
+
+def _create_base_tables(conn: Connection) -> None:
+    """Создает исходные таблицы, если их еще нет."""
+    _execute_all(conn, BASE_TABLES)
+
+
+def _create_composite_indexes(conn: Connection) -> None:
+    """
+    Создает составные индексы под основные запросы и удаляет одиночные
+    индексы по user_id, которые они покрывают.
+    """
+    _execute_all(conn, COMPOSITE_INDEXES)
+
+
+def _create_monthly_rollups(conn: Connection) -> None:
+    """Создает таблицу месячных агрегатов, триггеры и заполняет ее."""
+    conn.exec_driver_sql(MONTHLY_ROLLUP_TABLE)
+    rollups.install_triggers(conn)
+    rollups.rebuild_rollups(conn)
+
+
+def _add_data_versions(conn: Connection) -> None:
+    """Добавляет версию данных пользователя и триггеры, которые ее увеличивают."""
+    versioning.add_data_version_column(conn)
+    versioning.install_triggers(conn)
+
+
+def _create_change_feed(conn: Connection) -> None:
+    """
+    Добавляет версии строк расходов, таблицу надгробий удаленных расходов
+    и триггеры, которые их поддерживают.
+    """
+    changes.add_version_columns(conn)
+    _execute_all(conn, CHANGE_FEED_TABLES)
+    changes.install_triggers(conn)
+    # После замены триггеров: обновление только version их не вызывает
+    changes.backfill_versions(conn)
+
+
+# Миграции применяются по возрастанию версии; каждая должна быть идемпотентной
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base tables", _create_base_tables),
+    Migration(2, "composite indexes for hot queries", _create_composite_indexes),
+    Migration(3, "monthly expense rollups", _create_monthly_rollups),
+    Migration(4, "per-user data versions", _add_data_versions),
+    Migration(5, "expense change feed", _create_change_feed),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def upgrade(conn: Connection) -> int:
+    """Применяет недостающие миграции и возвращает итоговую версию схемы."""
+    schema_version.create(conn, checkfirst=True)
+    current = conn.execute(select(schema_version.c.version)).scalar()
+    if current is None:
+        current = 0
+        conn.execute(insert(schema_version).values(version=current))
+
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info(
+            "Применение миграции %s: %s", migration.version, migration.description
+        )
+        migration.apply(conn)
+        conn.execute(update(schema_version).values(version=migration.version))
+        current = migration.version
+    return int(current)
+
+
+async def run_migrations(engine: AsyncEngine) -> int:
+    """Приводит схему БД к последней версии в одной транзакции."""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # Блокировка записи берется до чтения версии схемы: процессы,
+            # одновременно открывающие новый файл БД (шард), применяют
+            # миграции по очереди, а не создают одни и те же таблицы
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+        version = await conn.run_sync(upgrade)
+    logger.info("Версия схемы БД: %s", version)
+    return int(version)
+
+
+def run_cli() -> None:
+    """Точка входа для `poetry run migrate`."""
+    from budget_bot.db.engine import engine
+    from budget_bot.db.session import shard_router
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def migrate() -> None:
+        await run_migrations(engine)
+        if shard_router is not None:
+            await shard_router.migrate_all()
+            await shard_router.close()
+        await engine.dispose()
+
+    asyncio.run(migrate())
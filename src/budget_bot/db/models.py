@@ -1,7 +1,8 @@
 # src/budget_bot/db/models.py
 from datetime import UTC, date, datetime
-from typing import List, Optional
+from typing import Any, List, Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -15,6 +16,14 @@ class User(SQLModel, table=True):
         default_factory=lambda: datetime.now(UTC),
         nullable=False,
     )
+    # Растет при каждом изменении расходов и категорий (триггеры БД)
+    data_version: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": "0"}
+    )
+    # Версия, до которой удаленные надгробия расходов уже очищены
+    changes_horizon: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": "0"}
+    )
 
     categories: List["Category"] = Relationship(back_populates="user")
 
@@ -22,9 +31,12 @@ class User(SQLModel, table=True):
 class Category(SQLModel, table=True):
     """Модель категории расходов."""
 
+    # Покрывает выборку категорий пользователя с сортировкой по имени
+    __table_args__: Any = (Index("ix_category_user_id_name", "user_id", "name"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    user_id: int = Field(foreign_key="user.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
 
     user: User = Relationship(back_populates="categories")
     expenses: List["Expense"] = Relationship(back_populates="category")
@@ -33,8 +45,16 @@ class Category(SQLModel, table=True):
 class Expense(SQLModel, table=True):
     """Модель расхода."""
 
+    # Составные индексы под основные запросы: лента расходов пользователя
+    # с сортировкой (expense_date DESC, id DESC) и выборки по категории
+    __table_args__: Any = (
+        Index("ix_expense_user_id_expense_date_id", "user_id", "expense_date", "id"),
+        Index("ix_expense_user_id_category_id", "user_id", "category_id"),
+        Index("ix_expense_user_id_version", "user_id", "version"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
     category_id: int = Field(foreign_key="category.id", index=True)
     amount: float
     expense_date: date = Field(default_factory=date.today, nullable=False)
@@ -42,5 +62,43 @@ class Expense(SQLModel, table=True):
         default_factory=lambda: datetime.now(UTC),
         nullable=False,
     )
+    # Версия данных пользователя на момент последнего изменения (триггеры БД)
+    version: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": "0"}
+    )
 
     category: Category = Relationship(back_populates="expenses")
+
+
+class ExpenseMonthlyRollup(SQLModel, table=True):
+    """
+    Агрегат расходов пользователя по категории за месяц.
+    Поддерживается триггерами БД при любом изменении таблицы expense.
+    """
+
+    __tablename__ = "expense_monthly_rollup"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    category_id: int = Field(foreign_key="category.id", primary_key=True)
+    # Месяц в формате YYYY-MM
+    month: str = Field(primary_key=True, max_length=7)
+    total: float = 0.0
+    count: int = 0
+
+
+class ExpenseTombstone(SQLModel, table=True):
+    """
+    Отметка об удаленном расходе для дельта-синхронизации клиентов.
+    Создается триггером БД и хранится ограниченное время.
+    """
+
+    __tablename__ = "expense_tombstone"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    # Версия данных пользователя, на которой расход был удален
+    version: int = Field(primary_key=True)
+    expense_id: int
+    deleted_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        nullable=False,
+    )
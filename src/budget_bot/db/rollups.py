@@ -0,0 +1,182 @@
+# src/budget_bot/db/rollups.py
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Допустимое расхождение сумм из-за накопления ошибки округления float
+TOTAL_TOLERANCE = 1e-6
+
+_MONTH = "substr({row}.expense_date, 1, 7)"
+
+_ADD_ROW = f"""
+    INSERT INTO expense_monthly_rollup (user_id, category_id, month, total, count)
+    VALUES (NEW.user_id, NEW.category_id, {_MONTH.format(row="NEW")}, NEW.amount, 1)
+    ON CONFLICT (user_id, category_id, month)
+    DO UPDATE SET total = total + excluded.total, count = count + 1;
+"""
+
+_REMOVE_ROW = f"""
+    UPDATE expense_monthly_rollup
+    SET total = total - OLD.amount, count = count - 1
+    WHERE user_id = OLD.user_id AND category_id = OLD.category_id
+      AND month = {_MONTH.format(row="OLD")};
+    DELETE FROM expense_monthly_rollup
+    WHERE user_id = OLD.user_id AND category_id = OLD.category_id
+      AND month = {_MONTH.format(row="OLD")} AND count <= 0;
+"""
+
+# Триггеры обновляют агрегат в той же транзакции, что и изменение расхода,
+# включая перенос расхода между месяцами или категориями
+ROLLUP_TRIGGERS: Dict[str, str] = {
+    "expense_rollup_insert": f"""
+        CREATE TRIGGER expense_rollup_insert AFTER INSERT ON expense
+        BEGIN {_ADD_ROW} END
+    """,
+    "expense_rollup_delete": f"""
+        CREATE TRIGGER expense_rollup_delete AFTER DELETE ON expense
+        BEGIN {_REMOVE_ROW} END
+    """,
+    "expense_rollup_update": f"""
+        CREATE TRIGGER expense_rollup_update
+        AFTER UPDATE OF user_id, category_id, amount, expense_date ON expense
+        BEGIN {_REMOVE_ROW} {_ADD_ROW} END
+    """,
+}
+
+_AGGREGATE_EXPENSES = """
+    SELECT user_id, category_id, substr(expense_date, 1, 7) AS month,
+           SUM(amount) AS total, COUNT(*) AS count
+    FROM expense
+    {where}
+    GROUP BY user_id, category_id, month
+"""
+
+
+# (user_id, category_id, month)
+RollupKey = Tuple[int, int, str]
+
+
+class RollupMismatch(NamedTuple):
+    """Расхождение агрегата с данными таблицы expense."""
+
+    user_id: int
+    category_id: int
+    month: str
+    expected_total: float
+    expected_count: int
+    actual_total: float
+    actual_count: int
+
+
+def install_triggers(conn: Connection) -> None:
+    """Пересоздает триггеры, поддерживающие таблицу агрегатов."""
+    for name, ddl in ROLLUP_TRIGGERS.items():
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql(ddl)
+
+
+def rebuild_rollups(conn: Connection, user_id: Optional[int] = None) -> None:
+    """Пересчитывает агрегаты из таблицы expense (для всех или одного пользователя)."""
+    where = "" if user_id is None else "WHERE user_id = :user_id"
+    params = {} if user_id is None else {"user_id": user_id}
+    conn.execute(text(f"DELETE FROM expense_monthly_rollup {where}"), params)
+    conn.execute(
+        text(
+            "INSERT INTO expense_monthly_rollup "
+            "(user_id, category_id, month, total, count) "
+            + _AGGREGATE_EXPENSES.format(where=where)
+        ),
+        params,
+    )
+
+
+def verify_rollups(conn: Connection) -> List[RollupMismatch]:
+    """Сравнивает агрегаты с пересчетом по таблице expense."""
+    expected: Dict[RollupKey, Tuple[float, int]] = {
+        (row[0], row[1], row[2]): (row[3], row[4])
+        for row in conn.execute(text(_AGGREGATE_EXPENSES.format(where="")))
+    }
+    actual: Dict[RollupKey, Tuple[float, int]] = {
+        (row[0], row[1], row[2]): (row[3], row[4])
+        for row in conn.execute(
+            text(
+                "SELECT user_id, category_id, month, total, count "
+                "FROM expense_monthly_rollup"
+            )
+        )
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_total, expected_count = expected.get(key, (0.0, 0))
+        actual_total, actual_count = actual.get(key, (0.0, 0))
+        if (
+            expected_count != actual_count
+            or abs(expected_total - actual_total) > TOTAL_TOLERANCE
+        ):
+            mismatches.append(
+                RollupMismatch(
+                    *key, expected_total, expected_count, actual_total, actual_count
+                )
+            )
+    return mismatches
+
+
+async def check_rollups(
+    engine: AsyncEngine, rebuild: bool = False
+) -> List[RollupMismatch]:
+    """
+    Пересчитывает агрегаты БД с нуля (rebuild) или возвращает их расхождения
+    с таблицей expense.
+    """
+    async with engine.begin() as conn:
+        if rebuild:
+            await conn.run_sync(rebuild_rollups)
+            return []
+        mismatches: List[RollupMismatch] = await conn.run_sync(verify_rollups)
+    return mismatches
+
+
+def run_cli() -> None:
+    """
+    Точка входа для `poetry run rollups {rebuild,verify}`. В режиме
+    шардирования обрабатываются и все шарды на диске.
+    """
+    from budget_bot.db.engine import engine
+    from budget_bot.db.session import shard_router
+    from budget_bot.db.shards import check_shard_rollups
+
+    parser = argparse.ArgumentParser(description="Месячные агрегаты расходов")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    rebuild = args.command == "rebuild"
+
+    async def run() -> int:
+        try:
+            results = {"основная БД": await check_rollups(engine, rebuild)}
+            if shard_router is not None:
+                results.update(await check_shard_rollups(shard_router, rebuild))
+        finally:
+            if shard_router is not None:
+                await shard_router.close()
+            await engine.dispose()
+        if rebuild:
+            logger.info("Агрегаты пересчитаны: %s", ", ".join(results))
+            return 0
+        found = 0
+        for name, mismatches in results.items():
+            for mismatch in mismatches:
+                logger.warning("Расхождение агрегата (%s): %s", name, mismatch)
+            found += len(mismatches)
+        logger.info("Найдено расхождений: %s", found)
+        return 1 if found else 0
+
+    sys.exit(asyncio.run(run()))
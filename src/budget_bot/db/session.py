@@ -1,14 +1,71 @@
 # src/budget_bot/db/session.py
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from budget_bot.db.engine import engine
+from budget_bot.config import ShardSettings
+from budget_bot.db.engine import engine, read_engine, settings
+from budget_bot.db.shards import Shard, ShardRouter
+from budget_bot.db.writer import WriteCoordinator
+from budget_bot.utils.security import get_validated_user_data
 
+shard_settings = ShardSettings.from_env()
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+# В режиме шардирования данные каждого пользователя лежат в своем файле
+shard_router: Optional[ShardRouter] = (
+    ShardRouter(shard_settings, settings) if shard_settings.enabled else None
+)
+
+
+async def get_shard(
+    user_data: Dict[str, Any] = Depends(get_validated_user_data),
+) -> Optional[Shard]:
+    """
+    FastAPI зависимость: шард текущего пользователя или None, если
+    шардирование выключено.
+    """
+    if shard_router is None:
+        return None
+    # Идентификатор попадает в имя файла шарда: принимается только целое
+    telegram_id = user_data.get("id")
+    if not isinstance(telegram_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid user ID in initData.",
+        )
+    return await shard_router.get(telegram_id)
+
+
+async def get_session(
+    shard: Optional[Shard] = Depends(get_shard),
+) -> AsyncGenerator[AsyncSession, None]:
     """
     FastAPI зависимость для получения асинхронной сессии БД.
     """
-    async with AsyncSession(engine) as session:
+    async with AsyncSession(engine if shard is None else shard.engine) as session:
         yield session
+
+
+async def get_read_session(
+    shard: Optional[Shard] = Depends(get_shard),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI зависимость для сессии только для чтения: отдельный пул
+    соединений, которые не ждут блокировку записи и не могут писать.
+    """
+    bind = read_engine if shard is None else shard.read_engine
+    async with AsyncSession(bind) as session:
+        yield session
+
+
+# Единственный писатель процесса: операции записи API фиксируются пачками
+write_coordinator = WriteCoordinator(async_sessionmaker(engine, expire_on_commit=False))
+
+
+async def get_writer(shard: Optional[Shard] = Depends(get_shard)) -> WriteCoordinator:
+    """
+    FastAPI зависимость для записи через групповой коммит (у каждого шарда
+    свой писатель).
+    """
+    return write_coordinator if shard is None else shard.writer
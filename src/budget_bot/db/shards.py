@@ -0,0 +1,428 @@
+# src/budget_bot/db/shards.py
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import weakref
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    async_sessionmaker,
+)
+from sqlmodel import SQLModel
+
+from budget_bot.config import DatabaseSettings, ShardSettings
+from budget_bot.db.changes import TOMBSTONE_PURGE_INTERVAL, purge_tombstones
+from budget_bot.db.engine import create_engine_from_settings
+from budget_bot.db.migrations import run_migrations
+from budget_bot.db.models import (
+    Category,
+    Expense,
+    ExpenseMonthlyRollup,
+    ExpenseTombstone,
+    User,
+)
+from budget_bot.db.rollups import RollupMismatch, check_rollups
+from budget_bot.db.writer import WriteCoordinator
+
+logger = logging.getLogger(__name__)
+
+# Через сколько секунд без записей писатель шарда останавливает свою задачу:
+# иначе у каждого когда-либо открытого шарда оставалась бы задача-писатель
+SHARD_WRITER_IDLE_TIMEOUT = float(os.getenv("SHARD_WRITER_IDLE_TIMEOUT", "60"))
+
+user_table = SQLModel.metadata.tables[User.__tablename__]
+category_table = SQLModel.metadata.tables[Category.__tablename__]
+expense_table = SQLModel.metadata.tables[Expense.__tablename__]
+
+# Таблицы с данными пользователя в порядке удаления (зависимые первыми)
+USER_DATA_TABLES = [
+    expense_table,
+    SQLModel.metadata.tables[ExpenseTombstone.__tablename__],
+    SQLModel.metadata.tables[ExpenseMonthlyRollup.__tablename__],
+    category_table,
+]
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping, Veach): номер корзины от 0 до buckets - 1.
+    При увеличении числа корзин с n до m переезжает лишь доля (m - n) / m
+    ключей, и только в новые корзины.
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+class Shard:
+    """Открытый шард: движки записи и чтения и писатель с групповым коммитом."""
+
+    def __init__(self, name: str, settings: DatabaseSettings) -> None:
+        self.name = name
+        self.engine = create_engine_from_settings(settings)
+        self.read_engine = create_engine_from_settings(settings, read_only=True)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.read_sessions = async_sessionmaker(
+            self.read_engine, expire_on_commit=False
+        )
+        self.writer = WriteCoordinator(
+            self.sessions, idle_timeout=SHARD_WRITER_IDLE_TIMEOUT
+        )
+
+    async def dispose(self) -> None:
+        """Закрывает свободные соединения; движки остаются пригодными."""
+        await self.engine.dispose()
+        await self.read_engine.dispose()
+
+
+class ShardRouter:
+    """
+    Детерминированно сопоставляет пользователя файлу SQLite и держит LRU
+    открытых шардов. Шард при первом открытии в процессе приводится к
+    последней версии схемы, поэтому новые файлы создаются по требованию.
+    """
+
+    def __init__(self, settings: ShardSettings, database: DatabaseSettings) -> None:
+        if settings.mode not in ("hash", "user"):
+            raise ValueError(f"Unknown shard mode: {settings.mode}")
+        self.settings = settings
+        self.directory = Path(settings.directory)
+        self._database = database
+        self._shards: "OrderedDict[str, Shard]" = OrderedDict()
+        # Вытесненные шарды, которые еще используют запросы или писатель:
+        # при повторном открытии возвращается тот же шард, и у файла в
+        # процессе остается один писатель. Работающий писатель не ссылается
+        # на шард, поэтому такие шарды удерживаются в _draining
+        self._retired: "weakref.WeakValueDictionary[str, Shard]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._draining: Dict[str, Shard] = {}
+        self._migrated: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self.opened = 0
+
+    def shard_name(self, telegram_id: int) -> str:
+        """Имя шарда пользователя; зависит только от telegram_id и настроек."""
+        if self.settings.mode == "user":
+            return f"user-{telegram_id}"
+        # Хэш выравнивает распределение, как бы ни выдавались telegram_id
+        digest = hashlib.blake2b(str(telegram_id).encode(), digest_size=8).digest()
+        bucket = jump_hash(int.from_bytes(digest, "big"), self.settings.count)
+        return f"shard-{bucket:04d}"
+
+    def path(self, name: str) -> Path:
+        """Файл БД шарда."""
+        return self.directory / f"{name}.db"
+
+    def database(self, name: str) -> DatabaseSettings:
+        """Настройки подключения к шарду: общие, кроме адреса файла."""
+        return replace(
+            self._database, url=f"sqlite+aiosqlite:///{self.path(name)}", read_url=""
+        )
+
+    def stored_names(self) -> List[str]:
+        """Имена всех шардов, уже созданных на диске."""
+        return sorted(path.stem for path in self.directory.glob("*.db"))
+
+    async def open(self, name: str) -> Shard:
+        """Возвращает открытый шард, при необходимости создавая его файл."""
+        shard = self._shards.get(name)
+        if shard is not None:
+            self._shards.move_to_end(name)
+            return shard
+
+        evicted: List[Shard] = []
+        async with self._lock:
+            shard = self._shards.get(name)
+            if shard is None:
+                shard = self._retired.pop(name, None)
+            if shard is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                shard = Shard(name, self.database(name))
+                if name not in self._migrated:
+                    await run_migrations(shard.engine)
+                    self._migrated.add(name)
+                self.opened += 1
+            self._shards[name] = shard
+            while len(self._shards) > max(self.settings.cache_size, 1):
+                evicted.append(self._shards.popitem(last=False)[1])
+            self._draining = {
+                key: old
+                for key, old in self._draining.items()
+                if old.writer.running and key not in self._shards
+            }
+            for old in evicted:
+                self._retired[old.name] = old
+                if old.writer.running:
+                    self._draining[old.name] = old
+        # Вытесненный шард может еще обслуживать запрос: dispose закрывает
+        # только свободные соединения (движок остается пригодным), а его
+        # писатель остановится сам по idle_timeout
+        for old in evicted:
+            await old.dispose()
+        return shard
+
+    async def get(self, telegram_id: int) -> Shard:
+        """Шард пользователя."""
+        return await self.open(self.shard_name(telegram_id))
+
+    async def release(self, name: str) -> None:
+        """Убирает шард из кэша и закрывает его писатель и соединения."""
+        shard = self._shards.pop(name, None) or self._retired.pop(name, None)
+        self._draining.pop(name, None)
+        self._migrated.discard(name)
+        if shard is not None:
+            await shard.writer.close()
+            await shard.dispose()
+
+    async def close(self) -> None:
+        """Закрывает все открытые шарды (остановка процесса)."""
+        for name in [*self._shards, *self._retired.keys()]:
+            await self.release(name)
+
+    async def migrate_all(self) -> int:
+        """Применяет миграции ко всем шардам на диске; возвращает их число."""
+        names = self.stored_names()
+        for name in names:
+            await self.open(name)
+        return len(names)
+
+    async def purge_tombstones(self) -> int:
+        """
+        Очищает устаревшие надгробия во всех шардах на диске. Закрытые шарды
+        открываются временным движком мимо LRU, чтобы не вытеснять шарды,
+        обслуживающие запросы; ошибка одного шарда не прерывает проход.
+        """
+        purged = 0
+        for name in self.stored_names():
+            shard = self._shards.get(name)
+            engine = (
+                shard.engine
+                if shard is not None
+                else create_engine_from_settings(self.database(name))
+            )
+            try:
+                async with engine.begin() as conn:
+                    purged += int(await conn.run_sync(purge_tombstones))
+            except Exception:  # остальные шарды очищаются дальше
+                logger.exception("Очистка надгробий шарда %s не удалась", name)
+            finally:
+                if shard is None:
+                    await engine.dispose()
+        return purged
+
+
+async def check_shard_rollups(
+    router: ShardRouter, rebuild: bool = False
+) -> Dict[str, List[RollupMismatch]]:
+    """
+    Пересчитывает (rebuild) или проверяет месячные агрегаты в каждом шарде
+    на диске; возвращает расхождения по именам шардов.
+    """
+    results: Dict[str, List[RollupMismatch]] = {}
+    for name in router.stored_names():
+        shard = await router.open(name)
+        results[name] = await check_rollups(shard.engine, rebuild)
+    return results
+
+
+async def run_shard_purger(
+    router: ShardRouter, interval: float = TOMBSTONE_PURGE_INTERVAL
+) -> None:
+    """Фоновая очистка надгробий в режиме шардирования."""
+    while True:
+        try:
+            purged = await router.purge_tombstones()
+            if purged:
+                logger.info("Удалено устаревших надгробий расходов: %s", purged)
+        except Exception:  # повтор через interval
+            logger.exception("Очистка надгробий шардов не удалась")
+        await asyncio.sleep(interval)
+
+
+async def _delete_user(conn: AsyncConnection, telegram_id: int) -> None:
+    """Удаляет пользователя со всеми его данными, если он есть в БД."""
+    user_id = (
+        await conn.execute(
+            select(user_table.c.id).where(user_table.c.telegram_id == telegram_id)
+        )
+    ).scalar()
+    if user_id is None:
+        return
+    for table in USER_DATA_TABLES:
+        await conn.execute(delete(table).where(table.c.user_id == user_id))
+    await conn.execute(delete(user_table).where(user_table.c.id == user_id))
+
+
+async def copy_user(
+    source: AsyncConnection, target: AsyncConnection, telegram_id: int
+) -> int:
+    """
+    Копирует пользователя с категориями и расходами в другую БД, где они
+    получают новые ID. Агрегаты и версии строк заполняют триггеры целевой
+    БД. Возвращает число скопированных расходов.
+    """
+    user = (
+        (
+            await source.execute(
+                select(user_table).where(user_table.c.telegram_id == telegram_id)
+            )
+        )
+        .mappings()
+        .one()
+    )
+    # Копия могла остаться в целевой БД от прерванного переноса
+    await _delete_user(target, telegram_id)
+    new_user_id = (
+        await target.execute(
+            insert(user_table)
+            .values({key: value for key, value in user.items() if key != "id"})
+            .returning(user_table.c.id)
+        )
+    ).scalar_one()
+
+    category_ids: Dict[int, int] = {}
+    categories = await source.execute(
+        select(category_table).where(category_table.c.user_id == user["id"])
+    )
+    for category in categories.mappings():
+        values = {key: value for key, value in category.items() if key != "id"}
+        category_ids[category["id"]] = (
+            await target.execute(
+                insert(category_table)
+                .values({**values, "user_id": new_user_id})
+                .returning(category_table.c.id)
+            )
+        ).scalar_one()
+
+    expenses = await source.execute(
+        select(expense_table).where(expense_table.c.user_id == user["id"])
+    )
+    rows: List[Dict[str, Any]] = [
+        {
+            **{k: v for k, v in expense.items() if k not in ("id", "version")},
+            "user_id": new_user_id,
+            "category_id": category_ids[expense["category_id"]],
+        }
+        for expense in expenses.mappings()
+    ]
+    if rows:
+        await target.execute(insert(expense_table), rows)
+
+    # ID расходов сменились: версия сдвигается выше любого курсора, выданного
+    # до переноса (даже если копировать было нечего), и горизонт встает на
+    # нее — лента изменений потребует полной синхронизации
+    moved_version = user_table.c.data_version + 1
+    await target.execute(
+        update(user_table)
+        .where(user_table.c.id == new_user_id)
+        .values(data_version=moved_version, changes_horizon=moved_version)
+    )
+    return len(rows)
+
+
+async def _move_users(
+    router: ShardRouter, source: AsyncEngine, source_name: Optional[str]
+) -> int:
+    """Переносит из source всех пользователей, чей шард не source_name."""
+    async with source.connect() as conn:
+        telegram_ids = (await conn.execute(select(user_table.c.telegram_id))).scalars()
+        moving = [
+            telegram_id
+            for telegram_id in telegram_ids
+            if router.shard_name(telegram_id) != source_name
+        ]
+
+    for telegram_id in moving:
+        target = await router.get(telegram_id)
+        async with source.begin() as source_conn:
+            async with target.engine.begin() as target_conn:
+                count = await copy_user(source_conn, target_conn, telegram_id)
+            # Копия уже зафиксирована: при сбое здесь повторный запуск
+            # перезапишет ее и удалит пользователя из источника
+            await _delete_user(source_conn, telegram_id)
+        logger.info(
+            "Пользователь %s (%s расходов) перенесен в %s",
+            telegram_id,
+            count,
+            target.name,
+        )
+    return len(moving)
+
+
+def _remove_files(path: Path) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+async def rebalance(router: ShardRouter, main: Optional[AsyncEngine] = None) -> int:
+    """
+    Раскладывает пользователей по шардам согласно текущим настройкам (после
+    смены SHARD_MODE или SHARD_COUNT) и, с main, переносит в шарды
+    пользователей общей БД. Опустевшие файлы шардов удаляются. Выполняется
+    при остановленном сервисе: ID пользователей и расходов меняются.
+    Возвращает число перенесенных пользователей.
+    """
+    moved = 0
+    if main is not None:
+        await run_migrations(main)
+        moved += await _move_users(router, main, None)
+    for name in router.stored_names():
+        source = await router.open(name)
+        moved += await _move_users(router, source.engine, name)
+        async with source.engine.connect() as conn:
+            remaining = (await conn.execute(select(user_table.c.id).limit(1))).first()
+        if remaining is None:
+            await router.release(name)
+            _remove_files(router.path(name))
+            logger.info("Пустой шард %s удален", name)
+    return moved
+
+
+def run_cli() -> None:
+    """Точка входа для `poetry run shards {migrate,rebalance}`."""
+    from budget_bot.db.engine import engine, settings
+
+    parser = argparse.ArgumentParser(description="Шарды БД пользователей")
+    parser.add_argument("command", choices=["migrate", "rebalance"])
+    parser.add_argument(
+        "--from-main",
+        action="store_true",
+        help="перенести в шарды и пользователей общей БД (DATABASE_URL)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    shard_settings = ShardSettings.from_env()
+    if not shard_settings.enabled:
+        logger.error("Шардирование выключено: задайте SHARD_MODE=hash или user.")
+        sys.exit(1)
+    router = ShardRouter(shard_settings, settings)
+
+    async def run() -> None:
+        try:
+            if args.command == "migrate":
+                count = await router.migrate_all()
+                logger.info("Миграции применены к %s шардам.", count)
+            else:
+                main = engine if args.from_main else None
+                moved = await rebalance(router, main)
+                logger.info("Перенесено пользователей: %s", moved)
+        finally:
+            await router.close()
+            await engine.dispose()
+
+    asyncio.run(run())
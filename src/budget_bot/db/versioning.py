@@ -0,0 +1,48 @@
+# src/budget_bot/db/versioning.py
+from typing import Dict
+
+from sqlalchemy import Connection, text
+
+_BUMP = """
+    UPDATE "user" SET data_version = data_version + 1
+    WHERE id IN ({users});
+"""
+
+
+def _trigger(table: str, event: str, users: str) -> str:
+    return f"""
+        CREATE TRIGGER {table}_data_version_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN {_BUMP.format(users=users)} END
+    """
+
+
+# Любое изменение расходов или категорий пользователя увеличивает его версию
+# данных в той же транзакции; по ней строятся ETag ответов API
+DATA_VERSION_TRIGGERS: Dict[str, str] = {
+    f"{table}_data_version_{event.lower()}": _trigger(table, event, users)
+    for table in ("expense", "category")
+    for event, users in (
+        ("INSERT", "NEW.user_id"),
+        ("DELETE", "OLD.user_id"),
+        ("UPDATE", "OLD.user_id, NEW.user_id"),
+    )
+}
+
+
+def add_data_version_column(conn: Connection) -> None:
+    """Добавляет колонку user.data_version, если ее еще нет."""
+    columns = {row[1] for row in conn.execute(text('PRAGMA table_info("user")'))}
+    if "data_version" not in columns:
+        conn.execute(
+            text(
+                'ALTER TABLE "user" ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0'
+            )
+        )
+
+
+def install_triggers(conn: Connection) -> None:
+    """Пересоздает триггеры, поддерживающие версию данных пользователя."""
+    for name, ddl in DATA_VERSION_TRIGGERS.items():
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql(ddl)
@@ -0,0 +1,191 @@
+# src/budget_bot/db/writer.py
+import asyncio
+import logging
+import os
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Операция записи: выполняется в сессии писателя и не должна сама фиксировать
+# или откатывать транзакцию. Если в пачке была ошибка, операция выполняется
+# повторно, поэтому кроме запросов к БД у нее не должно быть побочных эффектов.
+# Ожидаемый отказ (нет строки, чужие данные) операция возвращает как результат,
+# а не исключением: исключение откатывает и повторяет всю пачку
+WriteJob = Callable[[AsyncSession], Awaitable[T]]
+
+# Максимум операций в одной транзакции группового коммита
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+
+# Сколько писатель ждет новых операций после первой, прежде чем
+# зафиксировать пачку, сек (ограничивает добавочную задержку записи)
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY", "0.002"))
+
+_Pending = Tuple[WriteJob[Any], "asyncio.Future[Any]"]
+
+
+class WriteCoordinator:
+    """
+    Единственный писатель в БД внутри процесса. Операции записи ставятся в
+    очередь; задача-писатель забирает все накопившиеся операции (не больше
+    max_batch, ожидая новые не дольше max_delay) и выполняет их в одной
+    транзакции с одним коммитом. Ошибка операции откатывает только ее
+    (пачка повторяется с SAVEPOINT на каждую операцию), а вызывающий
+    получает свой результат или свое исключение после коммита пачки.
+    С idle_timeout задача-писатель завершается, если операций не было
+    дольше этого времени, и запускается снова при следующей операции.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+        max_batch: int = WRITE_BATCH_SIZE,
+        max_delay: float = WRITE_BATCH_DELAY,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._idle_timeout = idle_timeout
+        self._queue: Optional["asyncio.Queue[_Pending]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.batches = 0
+        self.jobs = 0
+        self.replays = 0
+
+    @property
+    def running(self) -> bool:
+        """Работает ли задача-писатель (до остановки по idle_timeout)."""
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, job: WriteJob[T]) -> T:
+        """Ставит операцию в очередь и ждет ее результата после коммита."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run(self._queue))
+        assert self._queue is not None
+        future: "asyncio.Future[T]" = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+        return await future
+
+    async def close(self) -> None:
+        """Останавливает писателя; операции в очереди завершаются ошибкой."""
+        task, queue = self._task, self._queue
+        self._task = self._queue = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        while queue is not None and not queue.empty():
+            _, future = queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Write coordinator is closed."))
+
+    async def _collect(self, queue: "asyncio.Queue[_Pending]") -> List[_Pending]:
+        try:
+            batch = [await asyncio.wait_for(queue.get(), self._idle_timeout)]
+        except asyncio.TimeoutError:
+            return []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_delay
+        while len(batch) < self._max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: "asyncio.Queue[_Pending]") -> None:
+        while True:
+            batch = await self._collect(queue)
+            if not batch:
+                # Между проверкой и завершением задачи нет await: submit
+                # увидит завершенную задачу и запустит новую
+                if queue.empty():
+                    return
+                continue
+            try:
+                await self._commit_batch(batch)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+            except Exception as exc:  # нужна для ответа всем ждущим
+                logger.exception("Групповой коммит не удался")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    async def _commit_batch(self, batch: List[_Pending]) -> None:
+        # Обычно все операции пачки успешны, поэтому сначала пачка выполняется
+        # без SAVEPOINT (на каждую операцию два запроса меньше). Если какая-то
+        # операция упала, транзакция откатывается и пачка повторяется с
+        # SAVEPOINT на каждую операцию, чтобы откатить только упавшие
+        pending = [(job, future) for job, future in batch if not future.cancelled()]
+        outcomes = await self._execute(pending, isolate=False)
+        if outcomes is None:
+            self.replays += 1
+            outcomes = await self._execute(pending, isolate=True)
+            assert outcomes is not None
+        self.batches += 1
+        self.jobs += len(pending)
+
+        for (_, future), (error, result) in zip(pending, outcomes):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def _execute(
+        self, batch: List[_Pending], isolate: bool
+    ) -> Optional[List[Tuple[Optional[BaseException], Any]]]:
+        """
+        Выполняет пачку в одной транзакции. Без isolate при первой ошибке
+        откатывает транзакцию и возвращает None.
+        """
+        outcomes: List[Tuple[Optional[BaseException], Any]] = []
+        async with self._session_factory() as session:
+            if session.get_bind().dialect.name == "sqlite":
+                # Блокировка записи берется сразу, и вся пачка идет одной
+                # транзакцией: иначе драйвер начал бы ее только с первого DML,
+                # а SAVEPOINT вне транзакции фиксировался бы сам по себе
+                await session.execute(text("BEGIN IMMEDIATE"))
+            for job, _ in batch:
+                if not isolate:
+                    try:
+                        outcomes.append((None, await job(session)))
+                    except Exception:  # повтор пачки с SAVEPOINT
+                        await session.rollback()
+                        return None
+                    continue
+                try:
+                    async with session.begin_nested():
+                        outcomes.append((None, await job(session)))
+                except Exception as exc:  # ошибка одной операции
+                    outcomes.append((exc, None))
+            await session.commit()
+        return outcomes
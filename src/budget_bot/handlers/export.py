@@ -0,0 +1,59 @@
+import tempfile
+from pathlib import Path
+from typing import Optional, cast
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile, Message
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from budget_bot.api.export import (
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    export_filename,
+    iter_export,
+)
+from budget_bot.api.schemas import ExpenseFilter
+from budget_bot.db.identity import resolve_user_id
+from budget_bot.db.shards import ShardRouter
+
+router = Router()
+
+
+@router.message(Command("export"))
+async def command_export(
+    message: Message,
+    command: CommandObject,
+    session_factory: async_sessionmaker[AsyncSession],
+    shards: Optional[ShardRouter] = None,
+) -> None:
+    """
+    Обработчик команды /export [csv|jsonl]. Потоково выгружает расходы
+    пользователя во временный файл и отправляет его документом.
+    """
+    requested = (command.args or "csv").strip().lower()
+    if requested not in EXPORT_MEDIA_TYPES:
+        await message.answer("Укажите формат выгрузки: /export csv или /export jsonl")
+        return
+    if message.from_user is None:
+        return
+    export_format = cast(ExportFormat, requested)
+    if shards is not None:
+        session_factory = (await shards.get(message.from_user.id)).read_sessions
+
+    async with session_factory() as session:
+        user_id: Optional[int] = await resolve_user_id(message.from_user.id, session)
+        if user_id is None:
+            await message.answer("Расходов пока нет: добавьте их в приложении.")
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / export_filename(export_format)
+            with path.open("wb") as file:
+                async for chunk in iter_export(
+                    session, user_id, ExpenseFilter(), export_format
+                ):
+                    file.write(chunk)
+            await message.answer_document(
+                FSInputFile(path, filename=path.name), caption="Выгрузка расходов"
+            )
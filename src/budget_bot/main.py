@@ -2,79 +2,172 @@ import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from pathlib import Path
+from typing import AsyncGenerator, Optional
 
 import uvicorn
-from aiogram import Bot, Dispatcher
+from aiogram import Bot
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.middleware.gzip import GZipMiddleware
 
 from budget_bot.api import routers as api_routers
-from budget_bot.db.engine import create_db_and_tables
-from budget_bot.handlers import common
+from budget_bot.assets import AssetBundle, asset_response, load_bundle
+from budget_bot.bot import create_dispatcher, create_webhook, load_bot_settings
+from budget_bot.config import BotSettings, ServerSettings
+from budget_bot.db.changes import run_tombstone_purger
+from budget_bot.db.engine import engine
+from budget_bot.db.identity import identity_cache
+from budget_bot.db.migrations import run_migrations
+from budget_bot.db.session import shard_router, write_coordinator
+from budget_bot.db.shards import run_shard_purger
+from budget_bot.utils.security import init_data_cache
+from budget_bot.webhook import TelegramWebhook
+from budget_bot.webhook import router as webhook_router
 
 # --- Настройка логирования ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+server_settings = ServerSettings.from_env()
+
+# Каталог фронтенда Mini App
+FRONTEND_DIR = Path(os.getenv("FRONTEND_DIR", "tma_frontend"))
+
+# Ответы меньше порога (в байтах) не сжимаются: выигрыш не окупает заголовки
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+# Период записи статистики кэшей в лог, сек; 0 — только при остановке
+CACHE_STATS_INTERVAL = float(os.getenv("CACHE_STATS_INTERVAL", "300"))
+
+
+def log_cache_stats() -> None:
+    """Пишет в лог статистику кэшей initData и идентификаторов процесса."""
+    logger.info("Кэш initData: %s", init_data_cache.stats())
+    logger.info("Кэш идентификаторов: %s", identity_cache.stats())
+
+
+async def run_cache_stats_logger(interval: float = CACHE_STATS_INTERVAL) -> None:
+    """
+    Периодически пишет статистику кэшей, чтобы долю попаданий под нагрузкой
+    было видно без остановки сервиса. Кэши у каждого процесса API свои,
+    поэтому задача запускается в каждом процессе.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        log_cache_stats()
+
 
 # --- Контекстный менеджер для FastAPI (startup/shutdown) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Контекстный менеджер для событий startup и shutdown."""
     logger.info("Запуск приложения...")
-    await create_db_and_tables()
+    if server_settings.run_migrations:
+        await run_migrations(engine)
+    # Фронтенд читается с диска и сжимается один раз при старте
+    load_bundle(FRONTEND_DIR)
+
+    # В режиме webhook обновления принимает каждый процесс API
+    webhook: Optional[TelegramWebhook] = None
+    if BotSettings.from_env().mode == "webhook":
+        bot_settings = load_bot_settings()
+        if bot_settings is not None:
+            webhook = create_webhook(bot_settings)
+            app.state.telegram_webhook = webhook
+            if server_settings.run_background_tasks:
+                await webhook.register(bot_settings.webhook_base_url)
+
+    purger: Optional[asyncio.Task[None]] = None
+    if server_settings.run_background_tasks:
+        purger = asyncio.create_task(
+            run_tombstone_purger(engine)
+            if shard_router is None
+            else run_shard_purger(shard_router)
+        )
+    stats_logger: Optional[asyncio.Task[None]] = None
+    if CACHE_STATS_INTERVAL > 0:
+        stats_logger = asyncio.create_task(run_cache_stats_logger())
     yield
     logger.info("Остановка приложения...")
+    if purger is not None:
+        purger.cancel()
+    if stats_logger is not None:
+        stats_logger.cancel()
+    await write_coordinator.close()
+    if shard_router is not None:
+        await shard_router.close()
+    if webhook is not None:
+        del app.state.telegram_webhook
+        await webhook.bot.session.close()
+    log_cache_stats()
 
 
 # --- Создание и конфигурация экземпляра FastAPI ---
 # Теперь 'app' находится на уровне модуля и доступен для импорта
 app = FastAPI(lifespan=lifespan)
 
+# Сжимаем ответы API; уже сжатые ответы (статика) middleware пропускает
+app.add_middleware(
+    GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=COMPRESSION_LEVEL
+)
+
 # Подключаем API роутеры
 app.include_router(api_routers.router)
-
-# Монтируем директорию с фронтендом для отдачи статики
-app.mount("/static", StaticFiles(directory="tma_frontend"), name="static")
+app.include_router(webhook_router)
 
 
 @app.get("/")
-async def root() -> FileResponse:
-    """Отдаем главный HTML файл нашего Mini App."""
-    return FileResponse("tma_frontend/index.html")
+async def root(request: Request) -> Response:
+    """Отдаем главный HTML файл нашего Mini App из памяти."""
+    assets: AssetBundle = load_bundle(FRONTEND_DIR)
+    response: Response = asset_response(assets.entry, request)
+    return response
+
+
+@app.get("/static/{path:path}")
+async def static_file(path: str, request: Request) -> Response:
+    """Отдаем статику фронтенда из памяти, заранее сжатую."""
+    assets: AssetBundle = load_bundle(FRONTEND_DIR)
+    asset = assets.get(path)
+    if asset is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    response: Response = asset_response(asset, request)
+    return response
 
 
 # --- Основная логика запуска ---
 async def main() -> None:
-    """Главная асинхронная функция для запуска бота и веб-сервера."""
+    """
+    Главная асинхронная функция для запуска бота и веб-сервера в одном
+    процессе. Несколько процессов API запускает supervisor (serve).
+    """
     load_dotenv()
-    bot_token: str | None = os.getenv("BOT_TOKEN")
-    if not bot_token:
-        logger.error("BOT_TOKEN не найден в .env файле!")
+    settings = load_bot_settings()
+    if settings is None:
         return
 
-    web_app_url: str | None = os.getenv("WEB_APP_URL")
-    if not web_app_url:
-        logger.error("WEB_APP_URL не найден в .env файле!")
-        return
-
-    # Инициализация бота и диспетчера aiogram
-    bot = Bot(token=bot_token)
-    dp = Dispatcher()
-    dp.include_router(common.router)
-    dp["web_app_url"] = web_app_url
-
     # Конфигурация для Uvicorn
     config = uvicorn.Config(
         app=app,
-        host="0.0.0.0",  # nosec B104
-        port=8000,
+        host=server_settings.host,
+        port=server_settings.port,
     )
     server = uvicorn.Server(config)
 
+    if settings.mode == "webhook":
+        # Обновления приходят на маршрут FastAPI: отдельного цикла опроса нет;
+        # webhook подключается и регистрируется в lifespan приложения
+        await server.serve()
+        return
+
+    # Инициализация бота и диспетчера aiogram
+    bot = Bot(token=settings.token)
+    dp = create_dispatcher(settings.web_app_url)
+
+    # Пока webhook зарегистрирован, Telegram не отдает обновления через опрос
+    await bot.delete_webhook()
     # Запускаем обе задачи одновременно
     await asyncio.gather(
         dp.start_polling(bot),
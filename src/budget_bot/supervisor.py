@@ -0,0 +1,139 @@
+# src/budget_bot/supervisor.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Optional, Tuple
+
+import uvicorn
+
+from budget_bot.bot import load_bot_settings, run_bot_process
+from budget_bot.config import ServerSettings
+from budget_bot.db.engine import engine
+from budget_bot.db.migrations import run_migrations
+from budget_bot.db.session import shard_router
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед перезапуском упавшего процесса бота, сек
+BOT_RESTART_DELAY = 5.0
+
+# Сколько ждать завершения процесса бота по SIGTERM, прежде чем убить его
+BOT_STOP_TIMEOUT = 10.0
+
+
+class BotProcess:
+    """
+    Процесс бота под присмотром supervisor: если он завершился сам,
+    запускается заново через restart_delay секунд.
+    """
+
+    def __init__(
+        self,
+        target: Callable[..., Any] = run_bot_process,
+        args: Tuple[Any, ...] = (),
+        restart_delay: float = BOT_RESTART_DELAY,
+    ) -> None:
+        self._context = multiprocessing.get_context("spawn")
+        self._target = target
+        self._args = args
+        self._restart_delay = restart_delay
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.process: Optional[BaseProcess] = None
+        self.starts = 0
+
+    def _spawn(self) -> None:
+        with self._lock:
+            if self._stopping.is_set():
+                return
+            self.process = self._context.Process(
+                target=self._target, args=self._args, name="budget-bot"
+            )
+            self.process.start()
+            self.starts += 1
+
+    def _watch(self) -> None:
+        while not self._stopping.is_set():
+            process = self.process
+            if process is not None:
+                process.join()
+            if self._stopping.is_set():
+                return
+            logger.error(
+                "Процесс бота завершился (код %s), перезапуск через %s с",
+                process.exitcode if process is not None else None,
+                self._restart_delay,
+            )
+            if self._stopping.wait(self._restart_delay):
+                return
+            self._spawn()
+
+    def start(self) -> None:
+        """Запускает процесс бота и наблюдение за ним."""
+        self._spawn()
+        threading.Thread(target=self._watch, name="bot-watchdog", daemon=True).start()
+
+    def stop(self, timeout: float = BOT_STOP_TIMEOUT) -> None:
+        """Останавливает процесс бота: SIGTERM, а по истечении timeout — SIGKILL."""
+        with self._lock:
+            self._stopping.set()
+            process = self.process
+        if process is None or not process.is_alive():
+            return
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning("Процесс бота не завершился за %s с, SIGKILL", timeout)
+            process.kill()
+            process.join()
+
+
+async def _migrate() -> None:
+    await run_migrations(engine)
+    if shard_router is not None:
+        # Новые шарды процессы создают и мигрируют сами при первом обращении
+        await shard_router.migrate_all()
+        await shard_router.close()
+    # Соединения не должны переходить в дочерние процессы
+    await engine.dispose()
+
+
+def run_cli() -> None:
+    """
+    Supervisor: применяет миграции один раз, запускает процесс бота и
+    workers процессов API (uvicorn с uvloop/httptools), а при остановке
+    завершает их все. Настройки процессы берут из общего окружения (.env).
+    """
+    logging.basicConfig(level=logging.INFO)
+    settings = ServerSettings.from_env()
+    if load_bot_settings() is None:
+        return
+    workers = settings.workers or os.cpu_count() or 1
+
+    asyncio.run(_migrate())
+    bot = BotProcess()
+    bot.start()
+
+    # Процессы API наследуют окружение: схема уже обновлена, а фоновые
+    # задачи выполняет процесс бота
+    os.environ["RUN_MIGRATIONS"] = "0"
+    os.environ["RUN_BACKGROUND_TASKS"] = "0"
+    logger.info(
+        "Запуск %s процессов API на %s:%s", workers, settings.host, settings.port
+    )
+    try:
+        # loop="auto" и http="auto" выбирают uvloop и httptools из uvicorn[standard]
+        uvicorn.run(
+            "budget_bot.main:app",
+            host=settings.host,
+            port=settings.port,
+            workers=workers,
+            loop="auto",
+            http="auto",
+        )
+    finally:
+        bot.stop()
+        logger.info("Supervisor остановлен.")
@@ -0,0 +1,33 @@
+from typing import Any, Dict
+
+
+class CacheStats:
+    """
+    Счетчики попаданий и промахов in-memory кэша: общие для кэшей initData
+    и идентификаторов, по ним подбирается размер кэша.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self) -> None:
+        """Сбрасывает счетчики."""
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий в кэш среди всех обращений."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self, size: int, maxsize: int) -> Dict[str, Any]:
+        """Возвращает статистику кэша с текущим и предельным размером."""
+        return {
+            "size": size,
+            "maxsize": maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
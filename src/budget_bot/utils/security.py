@@ -2,67 +2,227 @@ import hashlib
 import hmac
 import json
 import logging
-from typing import Any, Dict, Optional, cast
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 from urllib.parse import unquote
 
 from fastapi import Header, HTTPException, status
 
+from budget_bot.utils.cache import CacheStats
+
 logger = logging.getLogger(__name__)
 
 
-def parse_init_data(init_data: str) -> Optional[Dict[str, Any]]:
+class InitDataCache:
     """
-    Парсит строку initData и возвращает данные пользователя в виде словаря.
-    Возвращает None, если 'user' ключ отсутствует.
+    LRU-кэш успешно провалидированных initData с ограниченным временем жизни.
+
+    Ключом служит SHA-256 дайджест заголовка X-Init-Data, поэтому повторный
+    запрос в рамках одной сессии TMA не требует ни проверки HMAC, ни парсинга.
+    В кэш попадают только прошедшие проверку данные.
     """
-    for item in init_data.split("&"):
-        try:
-            key, value = item.split("=", 1)
-            if key == "user":
-                user_data_str = unquote(value)
-                return cast(Dict[str, Any], json.loads(user_data_str))
-        except ValueError:
-            continue
-    return None
 
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.counters = CacheStats()
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def make_key(init_data: str) -> bytes:
+        """Возвращает ключ кэша для строки initData."""
+        return hashlib.sha256(init_data.encode()).digest()
 
-def validate_init_data(init_data: str, bot_token: str) -> bool:
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Возвращает данные пользователя или None, если записи нет или она устарела."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters.misses += 1
+                return None
+            expires_at, user_data = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters.hits += 1
+            return dict(user_data)
+
+    def put(
+        self, key: bytes, user_data: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        """
+        Сохраняет данные пользователя, вытесняя самые старые записи.
+        ttl позволяет сократить время жизни записи относительно кэша.
+        """
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + lifetime, dict(user_data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очищает кэш и сбрасывает счетчики."""
+        with self._lock:
+            self._entries.clear()
+            self.counters.reset()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает статистику кэша."""
+        stats: Dict[str, Any] = self.counters.snapshot(len(self), self.maxsize)
+        return stats
+
+
+# Максимальный возраст initData (по auth_date) в секундах; 0 отключает проверку
+INIT_DATA_MAX_AGE = int(os.getenv("INIT_DATA_MAX_AGE", "86400"))
+# Допустимое расхождение часов: auth_date не может быть позже now + skew
+INIT_DATA_CLOCK_SKEW = int(os.getenv("INIT_DATA_CLOCK_SKEW", "60"))
+
+init_data_cache = InitDataCache(
+    maxsize=int(os.getenv("INIT_DATA_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("INIT_DATA_CACHE_TTL", "300")),
+)
+
+
+@lru_cache(maxsize=4)
+def get_secret_key(bot_token: str) -> bytes:
+    """Вычисляет секретный ключ WebAppData один раз для каждого токена бота."""
+    return hmac.new(
+        key=b"WebAppData", msg=bot_token.encode(), digestmod=hashlib.sha256
+    ).digest()
+
+
+class InitData:
     """
-    Валидирует initData, проверяя HMAC подпись.
+    Разобранная за один проход строка initData.
+
+    Хранит данные пользователя, auth_date, query_id, полученный хэш и строку
+    для проверки подписи (data-check-string), чтобы проверка подписи и
+    извлечение пользователя не разбирали заголовок повторно.
     """
-    try:
-        pairs = [
-            (key, unquote(value))
-            for key, value in (item.split("=", 1) for item in init_data.split("&"))
-        ]
-
-        data_check_string = "\n".join(
-            f"{key}={value}"
-            for key, value in sorted(pairs, key=lambda x: x[0])
-            if key != "hash"
-        )
 
-        received_hash = next(
-            item.split("=", 1)[1]
-            for item in init_data.split("&")
-            if item.startswith("hash=")
-        )
+    __slots__ = ("user", "auth_date", "query_id", "hash", "data_check_string")
 
-        secret_key = hmac.new(
-            key=b"WebAppData", msg=bot_token.encode(), digestmod=hashlib.sha256
-        ).digest()
+    def __init__(
+        self,
+        user: Optional[Dict[str, Any]],
+        auth_date: Optional[int],
+        query_id: Optional[str],
+        hash: Optional[str],
+        data_check_string: str,
+    ) -> None:
+        self.user = user
+        self.auth_date = auth_date
+        self.query_id = query_id
+        self.hash = hash
+        self.data_check_string = data_check_string
 
+    @classmethod
+    def parse(cls, init_data: str) -> Optional["InitData"]:
+        """
+        Разбирает строку initData. Возвращает None, если строка некорректна
+        (элемент без '=').
+        """
+        pairs: List[Tuple[str, str]] = []
+        user: Optional[Dict[str, Any]] = None
+        auth_date: Optional[int] = None
+        query_id: Optional[str] = None
+        received_hash: Optional[str] = None
+
+        for item in init_data.split("&"):
+            key, sep, raw_value = item.partition("=")
+            if not sep:
+                return None
+            if key == "hash":
+                if received_hash is None:
+                    received_hash = raw_value
+                continue
+            value = unquote(raw_value)
+            pairs.append((key, value))
+            if key == "user" and user is None:
+                try:
+                    decoded = json.loads(value)
+                except ValueError:
+                    decoded = None
+                if isinstance(decoded, dict):
+                    user = cast(Dict[str, Any], decoded)
+            elif key == "auth_date" and value.isdigit():
+                auth_date = int(value)
+            elif key == "query_id":
+                query_id = value
+
+        pairs.sort(key=lambda pair: pair[0])
+        data_check_string = "\n".join(f"{key}={value}" for key, value in pairs)
+        return cls(user, auth_date, query_id, received_hash, data_check_string)
+
+    def is_fresh(
+        self,
+        max_age: int,
+        now: Optional[float] = None,
+        skew: int = INIT_DATA_CLOCK_SKEW,
+    ) -> bool:
+        """
+        Проверяет, что auth_date не старше max_age секунд и не позже now
+        больше чем на skew секунд.
+        """
+        if self.auth_date is None:
+            return False
+        current = time.time() if now is None else now
+        return -skew <= current - self.auth_date <= max_age
+
+    def verify_signature(self, bot_token: str) -> bool:
+        """Проверяет HMAC подпись данных."""
+        if self.hash is None:
+            return False
         calculated_hash = hmac.new(
-            key=secret_key, msg=data_check_string.encode(), digestmod=hashlib.sha256
+            key=get_secret_key(bot_token),
+            msg=self.data_check_string.encode(),
+            digestmod=hashlib.sha256,
         ).hexdigest()
+        return hmac.compare_digest(calculated_hash, self.hash)
+
+
+def parse_init_data(init_data: str) -> Optional[Dict[str, Any]]:
+    """
+    Парсит строку initData и возвращает данные пользователя в виде словаря.
+    Возвращает None, если 'user' ключ отсутствует.
+    """
+    parsed = InitData.parse(init_data)
+    return parsed.user if parsed is not None else None
+
 
-        is_valid = calculated_hash == received_hash
-        if not is_valid:
-            logger.warning("Signature validation FAILED!")
-        return is_valid
-    except (ValueError, StopIteration, IndexError):
-        logger.error("Error during initData validation", exc_info=True)
+def validate_init_data(init_data: str, bot_token: str) -> bool:
+    """
+    Валидирует initData, проверяя HMAC подпись.
+    """
+    parsed = InitData.parse(init_data)
+    if parsed is None:
+        logger.error("Error during initData validation: malformed initData")
         return False
+    is_valid = parsed.verify_signature(bot_token)
+    if not is_valid:
+        logger.warning("Signature validation FAILED!")
+    return is_valid
 
 
 def get_validated_user_data(
@@ -70,22 +230,45 @@ def get_validated_user_data(
 ) -> Dict[str, Any]:
     """
     FastAPI зависимость для валидации initData и извлечения данных пользователя.
+    Успешно провалидированные данные кэшируются в init_data_cache.
     """
-    import os
+    cache_key = init_data_cache.make_key(x_init_data)
+    cached = init_data_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    bot_token = os.getenv("BOT_TOKEN", "")
+    parsed = InitData.parse(x_init_data)
+    if parsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Malformed initData",
+        )
+
+    # Устаревшие данные отсекаем до вычисления HMAC
+    if INIT_DATA_MAX_AGE > 0 and not parsed.is_fresh(INIT_DATA_MAX_AGE):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="initData has expired",
+        )
 
-    if not validate_init_data(x_init_data, bot_token):
+    if not parsed.verify_signature(os.getenv("BOT_TOKEN", "")):
+        logger.warning("Signature validation FAILED!")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid initData signature",
         )
 
-    user_data = parse_init_data(x_init_data)
+    user_data = parsed.user
     if user_data is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User data not found in initData",
         )
 
+    ttl = None
+    if INIT_DATA_MAX_AGE > 0 and parsed.auth_date is not None:
+        # Запись в кэше не должна переживать окно свежести initData
+        remaining = parsed.auth_date + INIT_DATA_MAX_AGE - time.time()
+        ttl = min(remaining, INIT_DATA_MAX_AGE)
+    init_data_cache.put(cache_key, user_data, ttl=ttl)
     return user_data
@@ -0,0 +1,75 @@
+# src/budget_bot/webhook.py
+import hmac
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+
+# Заголовок, в котором Telegram передает secret_token из setWebhook
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+router = APIRouter()
+
+
+@dataclass(frozen=True)
+class TelegramWebhook:
+    """Бот и диспетчер, которым маршрут webhook передает обновления."""
+
+    bot: Bot
+    dispatcher: Dispatcher
+    secret_token: str
+
+    def url(self, base_url: str) -> str:
+        """Публичный адрес webhook для setWebhook."""
+        return base_url.rstrip("/") + WEBHOOK_PATH
+
+    async def register(self, base_url: str) -> None:
+        """Регистрирует webhook в Telegram с секретным токеном."""
+        await self.bot.set_webhook(
+            url=self.url(base_url),
+            secret_token=self.secret_token,
+            allowed_updates=self.dispatcher.resolve_used_update_types(),
+        )
+        logger.info("Webhook зарегистрирован: %s", self.url(base_url))
+
+
+def get_webhook(request: Request) -> Optional[TelegramWebhook]:
+    """Webhook, подключенный к приложению (None в режиме polling)."""
+    webhook: Optional[TelegramWebhook] = getattr(
+        request.app.state, "telegram_webhook", None
+    )
+    return webhook
+
+
+@router.post(WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request) -> Response:
+    """
+    Принимает обновление от Telegram и передает его диспетчеру aiogram.
+    Запросы без верного секретного токена отклоняются до разбора тела.
+    """
+    webhook = get_webhook(request)
+    if webhook is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    token = request.headers.get(SECRET_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode(), webhook.secret_token.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        # Тело не JSON (в том числе не UTF-8) дает ValueError
+        payload: Any = await request.json()
+        update = Update.model_validate(payload, context={"bot": webhook.bot})
+    except (ValueError, ValidationError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid update."
+        )
+    await webhook.dispatcher.feed_update(webhook.bot, update)
+    return Response(status_code=status.HTTP_200_OK)
@@ -121,3 +121,43 @@ async def test_create_category_with_any_invalid_name(
     app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
     response = await client.post("/api/categories", json={"name": invalid_name})
     assert response.status_code == 422
+
+
+async def test_merge_category(client: AsyncClient, user_a_data: Dict[str, Any]) -> None:
+    """Тест: объединение переносит расходы в целевую категорию и удаляет исходную."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    source_id = (await client.post("/api/categories", json={"name": "Кафе"})).json()[
+        "id"
+    ]
+    target_id = (await client.post("/api/categories", json={"name": "Еда"})).json()[
+        "id"
+    ]
+    for amount in (100, 200):
+        await client.post(
+            "/api/expenses",
+            json={
+                "category_id": source_id,
+                "amount": amount,
+                "expense_date": "2025-08-01",
+            },
+        )
+
+    response = await client.post(
+        f"/api/categories/{source_id}/merge", json={"target_id": target_id}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"affected": 2}
+
+    categories = (await client.get("/api/categories")).json()
+    assert [c["id"] for c in categories] == [target_id]
+    expenses = (await client.get("/api/expenses")).json()
+    assert {e["category"]["id"] for e in expenses} == {target_id}
+
+    missing = await client.post(
+        f"/api/categories/{source_id}/merge", json={"target_id": target_id}
+    )
+    assert missing.status_code == 404
+    itself = await client.post(
+        f"/api/categories/{target_id}/merge", json={"target_id": target_id}
+    )
+    assert itself.status_code == 400
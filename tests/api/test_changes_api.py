@@ -0,0 +1,133 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from budget_bot.api import changes
+from budget_bot.db.changes import (
+    TOMBSTONE_RETENTION_DAYS,
+    purge_tombstones,
+    run_tombstone_purger,
+)
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def add_expense(client: AsyncClient, category_id: int, amount: float) -> None:
+    """Создает расход в указанной категории."""
+    await client.post(
+        "/api/expenses",
+        json={
+            "category_id": category_id,
+            "amount": amount,
+            "expense_date": "2025-08-01",
+        },
+    )
+
+
+async def test_changes_since_cursor(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: лента изменений отдает только созданные, измененные и удаленные
+    после курсора расходы.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    empty = await client.get("/api/expenses/changes")
+    assert empty.json() == {"cursor": 0, "reset": False, "changed": [], "deleted": []}
+
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    for amount in (10, 20, 30):
+        await add_expense(client, food_id, amount)
+
+    initial = (await client.get("/api/expenses/changes", params={"since": 0})).json()
+    assert [e["amount"] for e in initial["changed"]] == [10, 20, 30]
+    assert initial["changed"][0]["category"] == {"id": food_id, "name": "Еда"}
+    cursor = initial["cursor"]
+
+    unchanged = await client.get("/api/expenses/changes", params={"since": cursor})
+    assert unchanged.json() == {
+        "cursor": cursor,
+        "reset": False,
+        "changed": [],
+        "deleted": [],
+    }
+
+    first_id, second_id, _ = (e["id"] for e in initial["changed"])
+    await client.put(
+        f"/api/expenses/{first_id}",
+        json={"category_id": food_id, "amount": 15, "expense_date": "2025-08-02"},
+    )
+    await client.delete(f"/api/expenses/{second_id}")
+    await add_expense(client, food_id, 40)
+
+    delta = (await client.get("/api/expenses/changes", params={"since": cursor})).json()
+    assert delta["cursor"] > cursor
+    assert not delta["reset"]
+    assert [e["amount"] for e in delta["changed"]] == [15, 40]
+    assert delta["deleted"] == [second_id]
+
+
+async def test_changes_require_reset(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    user_a_data: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест: курсор из будущего, курсор старше очищенных надгробий и слишком
+    большая дельта требуют полной синхронизации.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    for amount in (10, 20, 30):
+        await add_expense(client, food_id, amount)
+    cursor = (await client.get("/api/expenses/changes")).json()["cursor"]
+
+    future = await client.get("/api/expenses/changes", params={"since": cursor + 1})
+    assert future.json()["reset"] is True
+
+    monkeypatch.setattr(changes, "MAX_CHANGES", 2)
+    overflow = (await client.get("/api/expenses/changes")).json()
+    assert overflow["reset"] is True
+    assert overflow["cursor"] == cursor
+    assert overflow["changed"] == []
+    monkeypatch.undo()
+
+    expense_id = (await client.get("/api/expenses")).json()[0]["id"]
+    await client.delete(f"/api/expenses/{expense_id}")
+    later = datetime.now(UTC) + timedelta(days=TOMBSTONE_RETENTION_DAYS + 1)
+    purged = await db_session.run_sync(
+        lambda session: purge_tombstones(session.connection(), later)
+    )
+    await db_session.commit()
+    assert purged == 1
+
+    stale = await client.get("/api/expenses/changes", params={"since": cursor})
+    assert stale.json()["reset"] is True
+    current = (await client.get("/api/expenses/changes")).json()["cursor"]
+    fresh = await client.get("/api/expenses/changes", params={"since": current})
+    assert fresh.json()["reset"] is False
+
+
+async def test_purger_survives_failed_pass(caplog: pytest.LogCaptureFixture) -> None:
+    """Тест: ошибка прохода очистки пишется в лог, а задача продолжает работу."""
+    # В пустой БД нет таблицы надгробий: каждый проход падает
+    engine = create_async_engine("sqlite+aiosqlite://")
+    purger = asyncio.create_task(run_tombstone_purger(engine, interval=0.01))
+    try:
+        await asyncio.sleep(0.05)
+        assert not purger.done()
+    finally:
+        purger.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await purger
+        await engine.dispose()
+
+    failures = [r for r in caplog.records if "Очистка надгробий" in r.getMessage()]
+    assert len(failures) >= 2
@@ -0,0 +1,97 @@
+from typing import Any, Dict, List
+
+import pytest
+from httpx import AsyncClient
+
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_conditional_get_expenses(
+    client: AsyncClient, user_a_data: Dict[str, Any], executed_statements: List[str]
+) -> None:
+    """
+    Тест: повторный запрос с If-None-Match получает 304 без чтения расходов,
+    ETag зависит от параметров запроса, а любое изменение данных
+    пользователя меняет ETag.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    category_id = (await client.post("/api/categories", json={"name": "Еда"})).json()[
+        "id"
+    ]
+    await client.post(
+        "/api/expenses",
+        json={"category_id": category_id, "amount": 10, "expense_date": "2025-08-01"},
+    )
+
+    first = await client.get("/api/expenses")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    executed_statements.clear()
+    cached = await client.get("/api/expenses", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+    assert len(executed_statements) == 1
+    assert "FROM expense" not in executed_statements[0]
+
+    # ETag другой страницы или фильтра не подходит к этому URL
+    for params in ({"limit": 1}, {"category_id": category_id}):
+        other = await client.get(
+            "/api/expenses", params=params, headers={"If-None-Match": etag}
+        )
+        assert other.status_code == 200
+        assert other.headers["etag"] != etag
+    paged = await client.get(f"/api/expenses?limit=1&category_id={category_id}")
+    same = await client.get(
+        f"/api/expenses?category_id={category_id}&limit=1",
+        headers={"If-None-Match": paged.headers["etag"]},
+    )
+    assert same.status_code == 304
+
+    expense_id = first.json()[0]["id"]
+    await client.put(
+        f"/api/expenses/{expense_id}",
+        json={"category_id": category_id, "amount": 20, "expense_date": "2025-08-01"},
+    )
+    changed = await client.get("/api/expenses", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()[0]["amount"] == 20
+
+
+async def test_conditional_get_categories_and_summary(
+    client: AsyncClient, user_a_data: Dict[str, Any], user_b_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: ETag категорий и сводки меняется после записи, а данные другого
+    пользователя на версию не влияют.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    await client.post("/api/categories", json={"name": "Еда"})
+    categories_etag = (await client.get("/api/categories")).headers["etag"]
+    summary_etag = (await client.get("/api/summary")).headers["etag"]
+
+    app.dependency_overrides[get_validated_user_data] = lambda: user_b_data
+    await client.post("/api/categories", json={"name": "Чужая"})
+
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    headers = {"If-None-Match": categories_etag}
+    assert (await client.get("/api/categories", headers=headers)).status_code == 304
+    headers = {"If-None-Match": summary_etag}
+    assert (await client.get("/api/summary", headers=headers)).status_code == 304
+    other_window = await client.get(
+        "/api/summary", params={"date_from": "2025-01-01"}, headers=headers
+    )
+    assert other_window.status_code == 200
+
+    await client.post("/api/categories", json={"name": "Такси"})
+    headers = {"If-None-Match": categories_etag}
+    response = await client.get("/api/categories", headers=headers)
+    assert response.status_code == 200
+    assert [c["name"] for c in response.json()] == ["Еда", "Такси"]
@@ -1,5 +1,9 @@
+import asyncio
+import csv
+import io
+import json
 from datetime import date
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import pytest
 from httpx import AsyncClient
@@ -8,6 +12,8 @@ from hypothesis import strategies as st
 from hypothesis.strategies import SearchStrategy
 from pytest import approx
 
+from budget_bot.api.schemas import MAX_BATCH_SIZE
+from budget_bot.db.session import get_writer
 from budget_bot.main import app
 from budget_bot.utils.security import get_validated_user_data
 
@@ -48,17 +54,17 @@ async def test_create_and_get_expense(
     }
     response = await client.post("/api/expenses", json=expense_data)
     assert response.status_code == 201
-    assert response.json() == {"message": "Expense added successfully"}
+    created_expense = response.json()
+    assert created_expense["amount"] == approx(123.45)
+    assert created_expense["expense_date"] == expense_data["expense_date"]
+    assert created_expense["category"] == created_category
+    assert created_expense["created_at"]
 
-    # 3. Получаем список расходов и проверяем его содержимое
+    # 3. Получаем список расходов: он совпадает с ответом на создание
     response = await client.get("/api/expenses")
     assert response.status_code == 200
     expenses_list = response.json()
-    assert len(expenses_list) == 1
-    expense = expenses_list[0]
-    assert expense["amount"] == approx(123.45)
-    assert expense["category"]["id"] == created_category["id"]
-    assert expense["category"]["name"] == "Продукты"
+    assert expenses_list == [created_expense]
 
 
 async def test_update_expense(client: AsyncClient, user_a_data: Dict[str, Any]) -> None:
@@ -300,7 +306,8 @@ async def test_create_expense_with_any_valid_data(
 
     # Шаг 3: Проверяем, что расход успешно создан
     assert exp_resp.status_code == 201
-    assert exp_resp.json() == {"message": "Expense added successfully"}
+    assert exp_resp.json()["amount"] == approx(amount)
+    assert exp_resp.json()["category"]["id"] == category_id
 
 
 @settings(suppress_health_check=[HealthCheck.function_scoped_fixture])
@@ -342,3 +349,384 @@ async def test_create_expense_with_invalid_data(
     }
     response2 = await client.post("/api/expenses", json=expense_data_invalid_category)
     assert response2.status_code == 404
+
+
+async def test_get_expenses_keyset_pagination(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: постраничный обход ленты по курсору возвращает все расходы
+    в порядке (expense_date DESC, id DESC) без повторов и пропусков.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    cat_resp = await client.post("/api/categories", json={"name": "Кафе"})
+    category_id = cat_resp.json()["id"]
+    dates = ["2025-08-01", "2025-08-03", "2025-08-03", "2025-08-02", "2025-08-03"]
+    for index, expense_date in enumerate(dates):
+        await client.post(
+            "/api/expenses",
+            json={
+                "category_id": category_id,
+                "amount": index + 1,
+                "expense_date": expense_date,
+            },
+        )
+
+    full_list = (await client.get("/api/expenses")).json()
+    assert "X-Next-Cursor" not in (await client.get("/api/expenses")).headers
+
+    collected = []
+    params: Dict[str, Any] = {"limit": 2}
+    pages = 0
+    while True:
+        response = await client.get("/api/expenses", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        collected.extend(page)
+        pages += 1
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+
+    assert pages == 3
+    assert [e["id"] for e in collected] == [e["id"] for e in full_list]
+    assert [e["expense_date"] for e in collected] == sorted(dates, reverse=True)
+
+
+async def test_get_expenses_invalid_cursor(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: поврежденный курсор отклоняется с кодом 400."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    await client.post("/api/categories", json={"name": "Кафе"})
+    response = await client.get("/api/expenses", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_get_expenses_filters(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: фильтры по датам, категориям и сумме применяются вместе
+    и сочетаются с пагинацией.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    taxi_id = (await client.post("/api/categories", json={"name": "Такси"})).json()[
+        "id"
+    ]
+    rows = [
+        (food_id, 100, "2025-07-31"),
+        (food_id, 200, "2025-08-01"),
+        (food_id, 300, "2025-08-15"),
+        (taxi_id, 400, "2025-08-20"),
+        (food_id, 500, "2025-09-01"),
+    ]
+    for category_id, amount, expense_date in rows:
+        await client.post(
+            "/api/expenses",
+            json={
+                "category_id": category_id,
+                "amount": amount,
+                "expense_date": expense_date,
+            },
+        )
+
+    august = {"date_from": "2025-08-01", "date_to": "2025-08-31"}
+    response = await client.get("/api/expenses", params=august)
+    assert [e["amount"] for e in response.json()] == [400, 300, 200]
+
+    response = await client.get(
+        "/api/expenses", params={**august, "category_id": food_id}
+    )
+    assert [e["amount"] for e in response.json()] == [300, 200]
+
+    response = await client.get(
+        "/api/expenses",
+        params={
+            "category_id": [food_id, taxi_id],
+            "min_amount": 150,
+            "max_amount": 450,
+        },
+    )
+    assert [e["amount"] for e in response.json()] == [400, 300, 200]
+
+    first_page = await client.get("/api/expenses", params={**august, "limit": 2})
+    assert [e["amount"] for e in first_page.json()] == [400, 300]
+    second_page = await client.get(
+        "/api/expenses",
+        params={
+            **august,
+            "limit": 2,
+            "cursor": first_page.headers["X-Next-Cursor"],
+        },
+    )
+    assert [e["amount"] for e in second_page.json()] == [200]
+    assert "X-Next-Cursor" not in second_page.headers
+
+    response = await client.get("/api/expenses", params={"min_amount": -1})
+    assert response.status_code == 422
+
+
+async def test_add_expenses_batch(
+    client: AsyncClient, user_a_data: Dict[str, Any], user_b_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: пакетное создание сохраняет корректные элементы и сообщает
+    об ошибках остальных по их индексу.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_b_data
+    foreign_resp = await client.post("/api/categories", json={"name": "Чужая"})
+    foreign_id = foreign_resp.json()["id"]
+
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    category_id = (await client.post("/api/categories", json={"name": "Чек"})).json()[
+        "id"
+    ]
+    response = await client.post(
+        "/api/expenses/batch",
+        json=[
+            {"category_id": category_id, "amount": 10, "expense_date": "2025-08-01"},
+            {"category_id": category_id, "amount": -1, "expense_date": "2025-08-01"},
+            {"category_id": foreign_id, "amount": 5, "expense_date": "2025-08-01"},
+            {"category_id": category_id, "amount": 20, "expense_date": "2025-08-02"},
+        ],
+    )
+    assert response.status_code == 201
+    result = response.json()
+    assert [item["index"] for item in result["created"]] == [0, 3]
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert "amount" in result["errors"][0]["detail"]
+
+    expenses = (await client.get("/api/expenses")).json()
+    assert {e["id"]: e["amount"] for e in expenses} == {
+        result["created"][0]["id"]: approx(10),
+        result["created"][1]["id"]: approx(20),
+    }
+
+
+async def test_add_expenses_batch_rejected(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: пустой, слишком большой или полностью некорректный пакет — 422."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    await client.post("/api/categories", json={"name": "Чек"})
+    item = {"category_id": 0, "amount": 1, "expense_date": "2025-08-01"}
+
+    assert (await client.post("/api/expenses/batch", json=[])).status_code == 422
+    too_many = [item] * (MAX_BATCH_SIZE + 1)
+    assert (await client.post("/api/expenses/batch", json=too_many)).status_code == 422
+
+    response = await client.post("/api/expenses/batch", json=[item])
+    assert response.status_code == 422
+    assert response.json()["created"] == []
+    assert response.json()["errors"][0]["index"] == 0
+
+
+async def test_recategorize_rejects_empty_filter(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: перенос по пустому фильтру отклоняется и ничего не переносит."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    misc_id = (await client.post("/api/categories", json={"name": "Разное"})).json()[
+        "id"
+    ]
+    await client.post(
+        "/api/expenses",
+        json={"category_id": food_id, "amount": 10, "expense_date": "2025-08-01"},
+    )
+
+    empty_filters: List[Dict[str, Any]] = [{}, {"category_id": []}]
+    for where in empty_filters:
+        response = await client.post(
+            "/api/expenses/bulk-recategorize",
+            json={"category_id": misc_id, "where": where},
+        )
+        assert response.status_code == 422
+    expenses = (await client.get("/api/expenses")).json()
+    assert [e["category"]["id"] for e in expenses] == [food_id]
+
+
+async def test_bulk_delete_and_recategorize(
+    client: AsyncClient, user_a_data: Dict[str, Any], user_b_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: массовое удаление и перенос по списку ID и по фильтру
+    затрагивают только расходы текущего пользователя.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_b_data
+    other_id = (await client.post("/api/categories", json={"name": "Б"})).json()["id"]
+    await client.post(
+        "/api/expenses",
+        json={"category_id": other_id, "amount": 1, "expense_date": "2025-08-01"},
+    )
+    foreign_expense_id = (await client.get("/api/expenses")).json()[0]["id"]
+
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    misc_id = (await client.post("/api/categories", json={"name": "Разное"})).json()[
+        "id"
+    ]
+    batch = await client.post(
+        "/api/expenses/batch",
+        json=[
+            {"category_id": food_id, "amount": amount, "expense_date": day}
+            for amount, day in [
+                (10, "2025-08-01"),
+                (20, "2025-08-02"),
+                (30, "2025-09-01"),
+            ]
+        ],
+    )
+    ids = [item["id"] for item in batch.json()["created"]]
+
+    response = await client.post(
+        "/api/expenses/bulk-recategorize",
+        json={"category_id": misc_id, "where": {"date_to": "2025-08-31"}},
+    )
+    assert response.json() == {"affected": 2}
+    response = await client.post(
+        "/api/expenses/bulk-recategorize",
+        json={"category_id": misc_id, "ids": [ids[2], foreign_expense_id]},
+    )
+    assert response.json() == {"affected": 1}
+    expenses = (await client.get("/api/expenses")).json()
+    assert {e["category"]["id"] for e in expenses} == {misc_id}
+
+    invalid = await client.post(
+        "/api/expenses/bulk-recategorize", json={"category_id": misc_id}
+    )
+    assert invalid.status_code == 422
+    foreign = await client.post(
+        "/api/expenses/bulk-recategorize",
+        json={"category_id": other_id, "ids": ids},
+    )
+    assert foreign.status_code == 404
+
+    response = await client.post(
+        "/api/expenses/bulk-delete", json={"ids": [*ids[:2], foreign_expense_id]}
+    )
+    assert response.json() == {"affected": 2}
+    assert [e["id"] for e in (await client.get("/api/expenses")).json()] == [ids[2]]
+
+    app.dependency_overrides[get_validated_user_data] = lambda: user_b_data
+    assert len((await client.get("/api/expenses")).json()) == 1
+
+
+async def test_export_expenses(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: потоковая выгрузка в CSV и JSON Lines с фильтрами списка."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    await client.post(
+        "/api/expenses/batch",
+        json=[
+            {"category_id": food_id, "amount": 10.5, "expense_date": "2025-08-02"},
+            {"category_id": food_id, "amount": 20, "expense_date": "2025-08-01"},
+            {"category_id": food_id, "amount": 30, "expense_date": "2025-09-01"},
+        ],
+    )
+
+    response = await client.get(
+        "/api/expenses/export", params={"date_to": "2025-08-31"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="expenses.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["expense_date"], float(r["amount"]), r["category"]) for r in rows] == [
+        ("2025-08-01", 20, "Еда"),
+        ("2025-08-02", 10.5, "Еда"),
+    ]
+
+    response = await client.get("/api/expenses/export", params={"format": "jsonl"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["amount"] for line in lines] == [20, 10.5, 30]
+    assert lines[0]["category_id"] == food_id
+
+    invalid = await client.get("/api/expenses/export", params={"format": "xml"})
+    assert invalid.status_code == 422
+
+
+def data_statements(statements: List[str]) -> List[str]:
+    """Запросы без управления транзакцией (BEGIN, SAVEPOINT, RELEASE)."""
+    return [
+        statement
+        for statement in statements
+        if not statement.startswith(("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK"))
+    ]
+
+
+async def test_expense_writes_are_single_statements(
+    client: AsyncClient, user_a_data: Dict[str, Any], executed_statements: List[str]
+) -> None:
+    """
+    Тест: добавление, изменение и удаление расхода выполняются одним
+    запросом к БД с проверкой владения внутри запроса (не считая
+    управления транзакцией группового коммита).
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    taxi_id = (await client.post("/api/categories", json={"name": "Такси"})).json()[
+        "id"
+    ]
+
+    executed_statements.clear()
+    response = await client.post(
+        "/api/expenses",
+        json={"category_id": food_id, "amount": 10, "expense_date": "2025-08-01"},
+    )
+    assert response.status_code == 201
+    assert len(data_statements(executed_statements)) == 1
+    expense_id = (await client.get("/api/expenses")).json()[0]["id"]
+
+    executed_statements.clear()
+    response = await client.put(
+        f"/api/expenses/{expense_id}",
+        json={"category_id": taxi_id, "amount": 25, "expense_date": "2025-08-02"},
+    )
+    assert response.status_code == 200
+    assert len(data_statements(executed_statements)) == 1
+    updated = response.json()
+    assert updated["category"] == {"id": taxi_id, "name": "Такси"}
+    assert updated["amount"] == approx(25)
+    assert updated["expense_date"] == "2025-08-02"
+
+    executed_statements.clear()
+    response = await client.delete(f"/api/expenses/{expense_id}")
+    assert response.status_code == 204
+    assert len(data_statements(executed_statements)) == 1
+
+
+async def test_rejected_writes_do_not_replay_batch(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: отказ 404 одной операции в пачке не откатывает пачку и не
+    заставляет писателя повторять ее с SAVEPOINT.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    category = await client.post("/api/categories", json={"name": "Еда"})
+    writer = app.dependency_overrides[get_writer]()
+
+    def add(category_id: int) -> Any:
+        return client.post(
+            "/api/expenses",
+            json={
+                "category_id": category_id,
+                "amount": 10,
+                "expense_date": "2025-08-01",
+            },
+        )
+
+    category_ids = [category.json()["id"], 999_999] * 5
+    responses = await asyncio.gather(*(add(value) for value in category_ids))
+
+    assert [r.status_code for r in responses] == [201, 404] * 5
+    assert writer.replays == 0
+    assert len((await client.get("/api/expenses")).json()) == 5
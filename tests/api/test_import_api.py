@@ -0,0 +1,188 @@
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import pytest
+from httpx import AsyncClient
+from pytest import approx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from budget_bot.api import importer
+from budget_bot.api.importer import IMPORT_CHUNK_SIZE, import_expenses
+from budget_bot.api.schemas import ImportReport
+from budget_bot.db.identity import resolve_user_id
+from budget_bot.db.models import Expense
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def chunked(data: bytes, size: int) -> AsyncIterator[bytes]:
+    """Отдает данные кусками фиксированного размера, как сетевой поток."""
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def test_import_expenses_csv(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: импорт создает недостающие категории, сообщает об ошибках
+    по номерам строк и принимает выгрузку с лишними колонками.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    existing_id = (await client.post("/api/categories", json={"name": "Еда"})).json()[
+        "id"
+    ]
+    data = (
+        "﻿id,expense_date,amount,category\r\n"
+        "1,2025-08-01,100,Еда\r\n"
+        '2,2025-08-02,50,"Кафе\nи рестораны"\r\n'
+        "3,not-a-date,10,Еда\r\n"
+        "\r\n"
+        "4,2025-08-03,-5,Еда\r\n"
+        "5,2025-08-04\r\n"
+        "6,2025-08-05,7.5,Такси"
+    ).encode()
+
+    response = await client.post(
+        "/api/expenses/import",
+        content=chunked(data, 7),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["processed"] == 6
+    assert report["imported"] == 3
+    assert report["failed"] == 3
+    assert report["created_categories"] == 2
+    assert [error["line"] for error in report["errors"]] == [5, 7, 8]
+    assert "expense_date" in report["errors"][0]["detail"]
+
+    categories = {
+        c["name"]: c["id"] for c in (await client.get("/api/categories")).json()
+    }
+    assert categories["Еда"] == existing_id
+    assert set(categories) == {"Еда", "Кафе\nи рестораны", "Такси"}
+    expenses = (await client.get("/api/expenses")).json()
+    assert [(e["category"]["name"], e["amount"]) for e in expenses] == [
+        ("Такси", approx(7.5)),
+        ("Кафе\nи рестораны", approx(50)),
+        ("Еда", approx(100)),
+    ]
+
+
+async def test_import_rejects_bad_header(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: файл без нужных колонок или пустой файл отклоняется с 400."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    response = await client.post("/api/expenses/import", content=b"date,sum\n1,2\n")
+    assert response.status_code == 400
+    assert "expense_date" in response.json()["detail"]
+    response = await client.post("/api/expenses/import", content=b"")
+    assert response.status_code == 400
+
+
+async def test_import_survives_stray_quotes(
+    client: AsyncClient,
+    user_a_data: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест: кавычка внутри поля без кавычек импортируется как символ, а запись
+    с незакрытой кавычкой или ошибкой csv попадает в отчет, не обрывая импорт.
+    """
+    monkeypatch.setattr(importer, "MAX_IMPORT_RECORD_SIZE", 200)
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    data = (
+        "expense_date,amount,category\n"
+        '2025-08-01,1,TV 27"\n'
+        '2025-08-02,"2,Еда\n'
+        + "".join(f"2025-08-03,{amount},Еда\n" for amount in range(3, 23))
+        + "2025-08-04,23,Е\rда\n"
+        "2025-08-05,24,Еда"
+    ).encode()
+
+    response = await client.post(
+        "/api/expenses/import",
+        content=chunked(data, 16),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 22
+    assert [error["line"] for error in report["errors"]] == [3, 24]
+    assert report["errors"][0]["detail"] == "CSV record is too long."
+    assert report["errors"][1]["detail"].startswith("Malformed CSV record")
+
+    categories = {c["name"] for c in (await client.get("/api/categories")).json()}
+    assert categories == {'TV 27"', "Еда"}
+
+
+def make_csv(rows: int) -> bytes:
+    """CSV с датами по всему году и 20 категориями."""
+    return (
+        "expense_date,amount,category\n"
+        + "".join(
+            f"2025-{index % 12 + 1:02d}-{index % 28 + 1:02d},{index % 500 + 1},"
+            f"Категория {index % 20}\n"
+            for index in range(rows)
+        )
+    ).encode()
+
+
+async def run_import(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    user_data: Dict[str, Any],
+    rows: int,
+) -> Tuple[ImportReport, List[int], float]:
+    """Импортирует rows строк; возвращает отчет, прогресс и время, сек."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_data
+    await client.post("/api/categories", json={"name": "Еда"})
+    user_id = await resolve_user_id(user_data["id"], db_session)
+    data = make_csv(rows)
+    progress: List[int] = []
+
+    def on_progress(report: ImportReport) -> None:
+        progress.append(report.imported)
+
+    started = time.perf_counter()
+    report = await import_expenses(
+        db_session, user_id, chunked(data, 64 * 1024), on_progress=on_progress
+    )
+    return report, progress, time.perf_counter() - started
+
+
+async def test_import_commits_in_chunks(
+    client: AsyncClient, db_session: AsyncSession, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: импорт идет пачками по IMPORT_CHUNK_SIZE строк с отчетом о
+    прогрессе после каждой и создает недостающие категории один раз.
+    """
+    rows = 3 * IMPORT_CHUNK_SIZE + 500
+    report, progress, _ = await run_import(client, db_session, user_a_data, rows)
+
+    assert report.imported == rows
+    assert report.created_categories == 20
+    assert progress[-1] == rows and len(progress) == 4
+    count = await db_session.execute(select(func.count()).select_from(Expense))
+    assert count.scalar() == rows
+
+
+@pytest.mark.benchmark
+async def test_import_benchmark(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    user_a_data: Dict[str, Any],
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Бенчмарк: импорт 100 000 строк пачками с коммитом на каждую пачку."""
+    rows = 100_000
+    report, _, elapsed = await run_import(client, db_session, user_a_data, rows)
+    with capsys.disabled():
+        print(f"\nCSV import x{rows}: {elapsed:.2f} s, {rows / elapsed:,.0f} rows/s")
+    assert report.imported == rows
@@ -0,0 +1,202 @@
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from httpx import AsyncClient
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from budget_bot.api.schemas import CategoryRead, ExpenseRead
+from budget_bot.api.serialization import (
+    COLUMNAR_MEDIA_TYPE,
+    dumps,
+    expense_json,
+)
+from budget_bot.db.models import Category, Expense
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_fast_json_matches_response_model(
+    client: AsyncClient, db_session: AsyncSession, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: списки расходов и категорий, собранные из строк запроса,
+    совпадают с тем, что дала бы сериализация через response_model.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    for name in ("Транспорт", "Еда"):
+        category_id = (
+            await client.post("/api/categories", json={"name": name})
+        ).json()["id"]
+        for day in (1, 2):
+            await client.post(
+                "/api/expenses",
+                json={
+                    "category_id": category_id,
+                    "amount": 10.5 * day,
+                    "expense_date": f"2025-08-0{day}",
+                },
+            )
+
+    response = await client.get("/api/expenses")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "etag" in response.headers
+    result = await db_session.execute(select(Expense))
+    expenses = sorted(
+        result.scalars().all(), key=lambda e: (e.expense_date, e.id), reverse=True
+    )
+    for expense in expenses:
+        await db_session.refresh(expense, ["category"])
+    adapter = TypeAdapter(List[ExpenseRead])
+    expected = adapter.dump_python(
+        adapter.validate_python(expenses, from_attributes=True), mode="json"
+    )
+    assert response.json() == expected
+
+    response = await client.get("/api/categories")
+    categories = (await db_session.execute(select(Category))).scalars().all()
+    assert response.json() == [
+        CategoryRead.model_validate(category, from_attributes=True).model_dump()
+        for category in sorted(categories, key=lambda c: c.name)
+    ]
+
+
+def _make_rows(count: int) -> List[Tuple[Any, ...]]:
+    created_at = datetime(2025, 8, 1, 12, 30, 15, 123456)
+    start = date(2025, 1, 1)
+    return [
+        (
+            index,
+            float(index % 500 + 1),
+            start + timedelta(days=index % 365),
+            created_at,
+            index % 20,
+            f"Категория {index % 20}",
+        )
+        for index in range(count)
+    ]
+
+
+def _model_json(rows: List[Tuple[Any, ...]]) -> bytes:
+    """JSON списка расходов через валидацию response_model, как в FastAPI."""
+    categories = {
+        category_id: Category(id=category_id, name=name, user_id=1)
+        for _, _, _, _, category_id, name in rows[:20]
+    }
+    expenses = [
+        Expense(
+            id=expense_id,
+            amount=amount,
+            expense_date=expense_date,
+            created_at=created_at,
+            category_id=category_id,
+            user_id=1,
+            category=categories[category_id],
+        )
+        for expense_id, amount, expense_date, created_at, category_id, _ in rows
+    ]
+    adapter = TypeAdapter(List[ExpenseRead])
+    validated = adapter.validate_python(expenses, from_attributes=True)
+    return json.dumps(
+        adapter.dump_python(validated, mode="json"),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+async def test_row_encoders_match_response_model() -> None:
+    """
+    Тест: кодирование кортежей дает тот же JSON, что и сериализация через
+    response_model.
+    """
+    rows = _make_rows(1_000)
+    expected = json.loads(_model_json(rows))
+    converted = [expense_json(row) for row in rows]
+
+    assert json.loads(dumps(converted)) == expected
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [1_000, 10_000, 100_000])
+async def test_serialization_benchmark(
+    count: int, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """
+    Бенчмарк: сериализация списка расходов через валидацию response_model
+    (как делает FastAPI для ORM-объектов) против кодирования кортежей.
+    """
+    rows = _make_rows(count)
+
+    started = time.perf_counter()
+    _model_json(rows)
+    model_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    dumps([expense_json(row) for row in rows])
+    fast_time = time.perf_counter() - started
+
+    with capsys.disabled():
+        print(
+            f"\nExpenses JSON x{count}: response_model {model_time * 1000:.1f} ms, "
+            f"rows {fast_time * 1000:.1f} ms ({model_time / fast_time:.1f}x)"
+        )
+
+
+async def test_columnar_expense_list(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: колоночная лента (по параметру или Accept) содержит те же расходы,
+    что и обычная, хранит каждую категорию один раз и имеет свой ETag.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    for name in ("Еда", "Транспорт"):
+        category_id = (
+            await client.post("/api/categories", json={"name": name})
+        ).json()["id"]
+        for day in (1, 2, 3):
+            await client.post(
+                "/api/expenses",
+                json={
+                    "category_id": category_id,
+                    "amount": day,
+                    "expense_date": f"2025-08-0{day}",
+                },
+            )
+
+    plain = await client.get("/api/expenses", params={"limit": 5})
+    columnar = await client.get(
+        "/api/expenses", params={"limit": 5, "format": "columnar"}
+    )
+    assert columnar.status_code == 200
+    assert columnar.headers["content-type"] == COLUMNAR_MEDIA_TYPE
+    assert columnar.headers["x-next-cursor"] == plain.headers["x-next-cursor"]
+    assert columnar.headers["etag"] != plain.headers["etag"]
+    assert len(columnar.content) < len(plain.content)
+
+    data = columnar.json()
+    assert len(data["categories"]) == 2
+    decoded = [
+        {
+            "id": data["ids"][i],
+            "amount": data["amounts"][i],
+            "expense_date": data["expense_dates"][i],
+            "created_at": data["created_at"][i],
+            "category": data["categories"][data["category_indexes"][i]],
+        }
+        for i in range(len(data["ids"]))
+    ]
+    assert decoded == plain.json()
+
+    by_accept = await client.get(
+        "/api/expenses", params={"limit": 5}, headers={"Accept": COLUMNAR_MEDIA_TYPE}
+    )
+    assert by_accept.json() == data
+    assert by_accept.headers["vary"] == "Accept"
@@ -0,0 +1,119 @@
+import calendar
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from httpx import AsyncClient
+from pytest import approx
+
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def create_expenses(
+    client: AsyncClient, rows: List[Tuple[str, float, str]]
+) -> Dict[str, int]:
+    """Создает категории и расходы; возвращает ID категорий по имени."""
+    category_ids: Dict[str, int] = {}
+    for name, amount, expense_date in rows:
+        if name not in category_ids:
+            response = await client.post("/api/categories", json={"name": name})
+            category_ids[name] = response.json()["id"]
+        await client.post(
+            "/api/expenses",
+            json={
+                "category_id": category_ids[name],
+                "amount": amount,
+                "expense_date": expense_date,
+            },
+        )
+    return category_ids
+
+
+async def test_summary_for_new_user(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: сводка нового пользователя пустая, окно — текущий месяц."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    response = await client.get("/api/summary")
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["total"] == 0
+    assert summary["count"] == 0
+    assert summary["by_category"] == []
+    today = date.today()
+    last_day = calendar.monthrange(today.year, today.month)[1]
+    assert summary["date_from"] == today.replace(day=1).isoformat()
+    assert summary["date_to"] == today.replace(day=last_day).isoformat()
+
+
+async def test_summary_by_category_and_month(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: суммы, количество и средние по категориям и месяцам."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    category_ids = await create_expenses(
+        client,
+        [
+            ("Еда", 100, "2025-07-10"),
+            ("Еда", 300, "2025-08-01"),
+            ("Еда", 500, "2025-08-31"),
+            ("Такси", 250, "2025-08-15"),
+            ("Такси", 999, "2025-09-01"),
+        ],
+    )
+
+    response = await client.get(
+        "/api/summary",
+        params={"date_from": "2025-07-01", "date_to": "2025-08-31"},
+    )
+    assert response.status_code == 200
+    summary = response.json()
+
+    assert summary["total"] == approx(1150)
+    assert summary["count"] == 4
+    assert [c["name"] for c in summary["by_category"]] == ["Еда", "Такси"]
+    food = summary["by_category"][0]
+    assert food["category_id"] == category_ids["Еда"]
+    assert food["total"] == approx(900)
+    assert food["count"] == 3
+    assert food["average"] == approx(300)
+    assert [(p["period"], p["total"], p["count"]) for p in summary["by_period"]] == [
+        ("2025-07", approx(100), 1),
+        ("2025-08", approx(1050), 3),
+    ]
+
+
+async def test_summary_by_week_and_day(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: неделя группируется по дате понедельника, день — по дате."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    # 2025-08-17 — воскресенье, 2025-08-18 — понедельник следующей недели
+    await create_expenses(
+        client,
+        [
+            ("Еда", 10, "2025-08-11"),
+            ("Еда", 20, "2025-08-17"),
+            ("Еда", 40, "2025-08-18"),
+        ],
+    )
+    window = {"date_from": "2025-08-01", "date_to": "2025-08-31"}
+
+    weekly = await client.get("/api/summary", params={**window, "period": "week"})
+    assert [(p["period"], p["total"]) for p in weekly.json()["by_period"]] == [
+        ("2025-08-11", approx(30)),
+        ("2025-08-18", approx(40)),
+    ]
+
+    daily = await client.get("/api/summary", params={**window, "period": "day"})
+    assert [p["period"] for p in daily.json()["by_period"]] == [
+        "2025-08-11",
+        "2025-08-17",
+        "2025-08-18",
+    ]
+
+    invalid = await client.get("/api/summary", params={"period": "year"})
+    assert invalid.status_code == 422
@@ -1,23 +1,28 @@
 # tests/conftest.py
-from typing import Any, AsyncGenerator, Dict
+from typing import Any, AsyncGenerator, Dict, Iterator, List
 
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import (
-    AsyncSession,
-    async_sessionmaker,
-    create_async_engine,
-)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlmodel import SQLModel
 
-from budget_bot.db.session import get_session
+from budget_bot.config import DatabaseSettings
+from budget_bot.db.engine import create_engine_from_settings
+from budget_bot.db.identity import identity_cache
+from budget_bot.db.migrations import run_migrations
+from budget_bot.db.session import get_read_session, get_session, get_writer
+from budget_bot.db.writer import WriteCoordinator
 from budget_bot.main import app
 
 # Используем отдельную БД для тестов
 TEST_DATABASE_URL = "sqlite+aiosqlite:///test.db"
 
-engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+engine = create_engine_from_settings(DatabaseSettings(url=TEST_DATABASE_URL))
+read_engine = create_engine_from_settings(
+    DatabaseSettings(url=TEST_DATABASE_URL), read_only=True
+)
 
 # ИСПОЛЬЗУЕМ СОВРЕМЕННЫЙ ASYNC_SESSIONMAKER
 AsyncTestingSessionLocal = async_sessionmaker(
@@ -37,11 +42,12 @@ async def db_setup_and_teardown(
     db_session: AsyncSession,
 ) -> AsyncGenerator[None, None]:
     """
-    Создает таблицы перед каждым тестом и удаляет их после.
+    Применяет миграции схемы перед каждым тестом и удаляет таблицы после.
     Применяется автоматически ко всем тестам.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    # Идентификаторы пользователей не переживают пересоздание таблиц
+    identity_cache.clear()
+    await run_migrations(engine)
     yield
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
@@ -60,12 +66,21 @@ async def client(
     async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
         yield db_session
 
+    async def override_get_read_session() -> AsyncGenerator[AsyncSession, None]:
+        async with AsyncSession(read_engine) as session:
+            yield session
+
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_read_session] = override_get_read_session
+    # Писатель привязан к циклу событий теста и к тестовой БД
+    writer = WriteCoordinator(AsyncTestingSessionLocal)
+    app.dependency_overrides[get_writer] = lambda: writer
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as c:
         yield c
 
+    await writer.close()
     app.dependency_overrides.clear()
 
 
@@ -84,3 +99,23 @@ def user_a_data_fixture() -> Dict[str, Any]:
 def user_b_data_fixture() -> Dict[str, Any]:
     """Возвращает тестовые данные для пользователя Б."""
     return {"id": 999999, "first_name": "UserB"}
+
+
+@pytest.fixture
+def executed_statements() -> Iterator[List[str]]:
+    """
+    Собирает SQL-запросы, выполненные через тестовые движки, чтобы проверять
+    число обращений к БД. Список можно очищать перед измеряемым действием.
+    """
+    statements: List[str] = []
+
+    def record(
+        conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any
+    ) -> None:
+        statements.append(statement)
+
+    for target in (engine, read_engine):
+        event.listen(target.sync_engine, "before_cursor_execute", record)
+    yield statements
+    for target in (engine, read_engine):
+        event.remove(target.sync_engine, "before_cursor_execute", record)
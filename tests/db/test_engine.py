@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from budget_bot.config import DatabaseSettings
+from budget_bot.db.engine import create_engine_from_settings, read_only_url
+
+
+def test_database_settings_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест: настройки БД читаются из переменных окружения."""
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///other.db")
+    monkeypatch.setenv("DATABASE_ECHO", "true")
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "3")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "1500")
+
+    settings = DatabaseSettings.from_env()
+
+    assert settings.url == "sqlite+aiosqlite:///other.db"
+    assert settings.echo is True
+    assert settings.pool_size == 3
+    assert settings.sqlite_busy_timeout_ms == 1500
+    assert settings.sqlite_synchronous == "NORMAL"
+
+
+def test_database_settings_defaults_disable_echo(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Тест: по умолчанию SQL-запросы не логируются."""
+    monkeypatch.delenv("DATABASE_ECHO", raising=False)
+    assert DatabaseSettings.from_env().echo is False
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_applied_on_connect(tmp_path: Path) -> None:
+    """Тест: к каждому соединению SQLite применяются PRAGMA производительности."""
+    settings = DatabaseSettings(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}",
+        sqlite_busy_timeout_ms=1234,
+    )
+    engine = create_engine_from_settings(settings)
+    try:
+        async with engine.connect() as conn:
+            pragmas: Dict[str, Any] = {}
+            for name in ("journal_mode", "synchronous", "temp_store", "busy_timeout"):
+                pragmas[name] = (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+    finally:
+        await engine.dispose()
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["temp_store"] == 2  # MEMORY
+    assert pragmas["busy_timeout"] == 1234
+
+
+@pytest.mark.asyncio
+async def test_read_only_engine_rejects_writes(tmp_path: Path) -> None:
+    """Тест: движок для чтения открывает тот же файл SQLite только на чтение."""
+    settings = DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path / 'ro.db'}")
+    engine = create_engine_from_settings(settings)
+    read_engine = create_engine_from_settings(settings, read_only=True)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+            await conn.execute(text("INSERT INTO item (id) VALUES (1)"))
+
+        async with read_engine.connect() as conn:
+            assert (await conn.execute(text("SELECT id FROM item"))).scalar() == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(text("INSERT INTO item (id) VALUES (2)"))
+    finally:
+        await read_engine.dispose()
+        await engine.dispose()
+
+    assert "mode=ro" in read_only_url(settings)
+    replica = DatabaseSettings(url=settings.url, read_url="sqlite+aiosqlite:///r.db")
+    assert read_only_url(replica) == "sqlite+aiosqlite:///r.db"
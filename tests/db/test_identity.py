@@ -0,0 +1,65 @@
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from budget_bot.db.identity import (
+    IdentityCache,
+    create_user,
+    identity_cache,
+    resolve_user_id,
+)
+
+
+def test_identity_cache_lru_eviction() -> None:
+    """Тест: кэш ограничен по размеру и вытесняет давние записи."""
+    cache = IdentityCache(maxsize=2)
+    cache.put(1, 10)
+    cache.put(2, 20)
+    assert cache.get(1) == 10
+    cache.put(3, 30)
+
+    assert cache.get(2) is None
+    assert cache.get(1) == 10
+    assert cache.get(3) == 30
+    assert cache.stats()["hits"] == 3
+    assert cache.counters.hit_rate == pytest.approx(0.75)
+
+
+@pytest.mark.asyncio
+async def test_resolve_user_id_hits_db_once(
+    db_session: AsyncSession, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: повторное разрешение пользователя не обращается к БД."""
+    user_id = await create_user(user_a_data, db_session)
+    identity_cache.clear()
+
+    statements: List[str] = []
+
+    def count_statements(*args: Any) -> None:
+        statements.append(args[2])
+
+    sync_engine = db_session.get_bind()
+    event.listen(sync_engine, "before_cursor_execute", count_statements)
+    try:
+        assert await resolve_user_id(user_a_data["id"], db_session) == user_id
+        assert await resolve_user_id(user_a_data["id"], db_session) == user_id
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count_statements)
+
+    assert len(statements) == 1
+    assert identity_cache.counters.hits == 1
+    assert identity_cache.counters.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_user_is_not_cached(
+    db_session: AsyncSession, user_b_data: Dict[str, Any]
+) -> None:
+    """Тест: отсутствующий пользователь не кэшируется и виден после создания."""
+    assert await resolve_user_id(user_b_data["id"], db_session) is None
+    assert len(identity_cache) == 0
+
+    user_id = await create_user(user_b_data, db_session)
+    assert identity_cache.get(user_b_data["id"]) == user_id
@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import pytest
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
+
+import budget_bot.db.models  # noqa: F401  # таблицы моделей в metadata
+from budget_bot.config import DatabaseSettings
+from budget_bot.db.engine import create_engine_from_settings
+from budget_bot.db.migrations import LATEST_VERSION, run_migrations
+
+pytestmark = pytest.mark.asyncio
+
+# Схема, которую создавал прежний create_all при старте приложения
+LEGACY_SCHEMA = [
+    "CREATE TABLE user (id INTEGER PRIMARY KEY, telegram_id INTEGER NOT NULL, "
+    "full_name VARCHAR NOT NULL, created_at DATETIME NOT NULL)",
+    "CREATE UNIQUE INDEX ix_user_telegram_id ON user (telegram_id)",
+    "CREATE TABLE category (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+    "user_id INTEGER NOT NULL REFERENCES user (id))",
+    "CREATE INDEX ix_category_user_id ON category (user_id)",
+    "CREATE TABLE expense (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL "
+    "REFERENCES user (id), category_id INTEGER NOT NULL REFERENCES category (id), "
+    "amount FLOAT NOT NULL, expense_date DATE NOT NULL, created_at DATETIME NOT NULL)",
+    "CREATE INDEX ix_expense_user_id ON expense (user_id)",
+    "CREATE INDEX ix_expense_category_id ON expense (category_id)",
+]
+
+
+def make_engine(tmp_path: Path) -> AsyncEngine:
+    """Создает движок для отдельного файла БД."""
+    engine: AsyncEngine = create_engine_from_settings(
+        DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}")
+    )
+    return engine
+
+
+async def index_names(engine: AsyncEngine) -> Set[str]:
+    """Возвращает имена индексов в БД."""
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        )
+        return {row[0] for row in result}
+
+
+async def test_migrations_on_fresh_database(tmp_path: Path) -> None:
+    """Тест: миграции создают схему с нуля и повторно ничего не меняют."""
+    engine = make_engine(tmp_path)
+    try:
+        assert await run_migrations(engine) == LATEST_VERSION
+        assert await run_migrations(engine) == LATEST_VERSION
+        indexes = await index_names(engine)
+    finally:
+        await engine.dispose()
+
+    assert "ix_expense_user_id_expense_date_id" in indexes
+    assert "ix_expense_user_id_category_id" in indexes
+    assert "ix_category_user_id_name" in indexes
+
+
+async def test_migrations_upgrade_legacy_database(tmp_path: Path) -> None:
+    """Тест: существующая БД без версии схемы получает составные индексы."""
+    engine = make_engine(tmp_path)
+    try:
+        async with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+        assert await run_migrations(engine) == LATEST_VERSION
+        indexes = await index_names(engine)
+        async with engine.connect() as conn:
+            result = await conn.execute(text('PRAGMA table_info("user")'))
+            user_columns = {row[1] for row in result}
+    finally:
+        await engine.dispose()
+
+    assert "data_version" in user_columns
+    assert "ix_expense_user_id_expense_date_id" in indexes
+    assert "ix_expense_user_id" not in indexes
+    assert "ix_category_user_id" not in indexes
+
+
+async def test_expense_feed_query_uses_index_for_order(tmp_path: Path) -> None:
+    """Тест: лента расходов сортируется по индексу, без временного B-дерева."""
+    engine = make_engine(tmp_path)
+    try:
+        await run_migrations(engine)
+
+        def explain(conn: Connection) -> List[Any]:
+            return list(
+                conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN SELECT * FROM expense WHERE user_id = 1 "
+                    "ORDER BY expense_date DESC, id DESC"
+                )
+            )
+
+        async with engine.connect() as conn:
+            plan = " ".join(str(row[-1]) for row in await conn.run_sync(explain))
+    finally:
+        await engine.dispose()
+
+    assert "ix_expense_user_id_expense_date_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+async def test_migrated_schema_matches_models(tmp_path: Path) -> None:
+    """
+    Тест: зафиксированный DDL миграций дает те же таблицы, колонки и индексы,
+    что описаны в моделях. При изменении модели нужна новая миграция.
+    """
+    engine = make_engine(tmp_path)
+
+    def columns(conn: Connection) -> Dict[str, Set[str]]:
+        return {
+            table: {
+                row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')
+            }
+            for table in SQLModel.metadata.tables
+        }
+
+    try:
+        await run_migrations(engine)
+        async with engine.connect() as conn:
+            migrated = await conn.run_sync(columns)
+        indexes = await index_names(engine)
+    finally:
+        await engine.dispose()
+
+    assert migrated == {
+        name: {column.name for column in table.columns}
+        for name, table in SQLModel.metadata.tables.items()
+    }
+    assert {name for name in indexes if not name.startswith("sqlite_")} == {
+        str(index.name)
+        for table in SQLModel.metadata.tables.values()
+        for index in table.indexes
+    }
@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from httpx import AsyncClient
+from pytest import approx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from budget_bot.db.rollups import RollupMismatch, rebuild_rollups, verify_rollups
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def rollup_rows(session: AsyncSession) -> List[Tuple[Any, ...]]:
+    """Возвращает содержимое таблицы агрегатов."""
+    result = await session.execute(
+        text(
+            "SELECT category_id, month, total, count FROM expense_monthly_rollup "
+            "ORDER BY category_id, month"
+        )
+    )
+    return [tuple(row) for row in result]
+
+
+async def verify(session: AsyncSession) -> List[RollupMismatch]:
+    """Запускает проверку агрегатов на соединении сессии."""
+    mismatches: List[RollupMismatch] = await session.run_sync(
+        lambda sync_session: verify_rollups(sync_session.connection())
+    )
+    return mismatches
+
+
+async def test_rollups_follow_expense_writes(
+    client: AsyncClient, db_session: AsyncSession, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: добавление, перенос между месяцами/категориями и удаление расходов
+    отражаются в месячных агрегатах.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    taxi_id = (await client.post("/api/categories", json={"name": "Такси"})).json()[
+        "id"
+    ]
+    for amount, expense_date in [(100, "2025-08-01"), (50, "2025-08-20")]:
+        await client.post(
+            "/api/expenses",
+            json={
+                "category_id": food_id,
+                "amount": amount,
+                "expense_date": expense_date,
+            },
+        )
+    assert await rollup_rows(db_session) == [(food_id, "2025-08", approx(150), 2)]
+
+    expense_id = (await client.get("/api/expenses")).json()[0]["id"]
+    await client.put(
+        f"/api/expenses/{expense_id}",
+        json={"category_id": taxi_id, "amount": 70, "expense_date": "2025-09-02"},
+    )
+    assert await rollup_rows(db_session) == [
+        (food_id, "2025-08", approx(100), 1),
+        (taxi_id, "2025-09", approx(70), 1),
+    ]
+
+    await client.delete(f"/api/expenses/{expense_id}")
+    assert await rollup_rows(db_session) == [(food_id, "2025-08", approx(100), 1)]
+    assert await verify(db_session) == []
+
+
+async def test_rollups_verify_and_rebuild(
+    client: AsyncClient, db_session: AsyncSession, user_a_data: Dict[str, Any]
+) -> None:
+    """
+    Тест: проверка находит расхождение агрегата, пересчет его устраняет,
+    а помесячная сводка читает данные из таблицы агрегатов.
+    """
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    await client.post(
+        "/api/expenses",
+        json={"category_id": food_id, "amount": 100, "expense_date": "2025-08-01"},
+    )
+    await db_session.execute(text("UPDATE expense_monthly_rollup SET total = 1"))
+    await db_session.commit()
+
+    window = {"date_from": "2025-08-01", "date_to": "2025-08-31"}
+    monthly = (await client.get("/api/summary", params=window)).json()
+    assert monthly["total"] == approx(1)
+    daily = await client.get("/api/summary", params={**window, "period": "day"})
+    assert daily.json()["total"] == approx(100)
+
+    mismatches = await verify(db_session)
+    assert len(mismatches) == 1
+    assert mismatches[0].expected_total == approx(100)
+    assert mismatches[0].actual_total == approx(1)
+
+    def rebuild(sync_session: Session) -> None:
+        rebuild_rollups(sync_session.connection())
+
+    await db_session.run_sync(rebuild)
+    await db_session.commit()
+    assert await verify(db_session) == []
+    monthly = (await client.get("/api/summary", params=window)).json()
+    assert monthly["total"] == approx(100)
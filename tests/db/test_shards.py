@@ -0,0 +1,297 @@
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from budget_bot.api.changes import load_changes
+from budget_bot.config import DatabaseSettings, ShardSettings
+from budget_bot.db import session as db_session_module
+from budget_bot.db.identity import identity_cache, resolve_user_id
+from budget_bot.db.migrations import LATEST_VERSION, schema_version
+from budget_bot.db.rollups import verify_rollups
+from budget_bot.db.session import (
+    get_read_session,
+    get_session,
+    get_shard,
+    get_writer,
+)
+from budget_bot.db.shards import (
+    ShardRouter,
+    check_shard_rollups,
+    copy_user,
+    jump_hash,
+    rebalance,
+    user_table,
+)
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+USERS = [{"id": telegram_id, "first_name": "U"} for telegram_id in range(101, 109)]
+
+
+async def noop(session: Any) -> None:
+    return None
+
+
+def make_router(directory: Path, **options: Any) -> ShardRouter:
+    settings = ShardSettings(**{"mode": "hash", "directory": str(directory), **options})
+    return ShardRouter(settings, DatabaseSettings())
+
+
+@pytest_asyncio.fixture
+async def sharded_client(client: AsyncClient) -> AsyncGenerator[AsyncClient, None]:
+    """Клиент API без подмены сессий: запросы идут через роутер шардов."""
+    for dependency in (get_session, get_read_session, get_writer):
+        app.dependency_overrides.pop(dependency)
+    yield client
+
+
+async def add_expenses(client: AsyncClient, user: Dict[str, Any], count: int) -> None:
+    app.dependency_overrides[get_validated_user_data] = lambda: user
+    response = await client.post("/api/categories", json={"name": "Еда"})
+    for amount in range(1, count + 1):
+        await client.post(
+            "/api/expenses",
+            json={
+                "category_id": response.json()["id"],
+                "amount": amount,
+                "expense_date": "2025-08-01",
+            },
+        )
+
+
+async def list_amounts(client: AsyncClient, user: Dict[str, Any]) -> List[float]:
+    app.dependency_overrides[get_validated_user_data] = lambda: user
+    response = await client.get("/api/expenses")
+    return sorted(expense["amount"] for expense in response.json())
+
+
+async def test_shard_names_are_stable(tmp_path: Path) -> None:
+    """
+    Тест: шард зависит только от telegram_id, а при добавлении шарда
+    пользователи переезжают только в новый.
+    """
+    four = make_router(tmp_path, count=4)
+    five = make_router(tmp_path, count=5)
+    names = {telegram_id: four.shard_name(telegram_id) for telegram_id in range(1000)}
+
+    assert names == {t: make_router(tmp_path, count=4).shard_name(t) for t in names}
+    assert len(set(names.values())) == 4
+    moved = [t for t in names if five.shard_name(t) != names[t]]
+    assert all(five.shard_name(t) == "shard-0004" for t in moved)
+    assert 100 < len(moved) < 300
+    assert make_router(tmp_path, mode="user").shard_name(42) == "user-42"
+    assert all(0 <= jump_hash(key, 7) < 7 for key in range(100))
+
+
+async def test_router_migrates_and_evicts_shards(tmp_path: Path) -> None:
+    """Тест: шард создается с актуальной схемой, а LRU ограничивает открытые."""
+    router = make_router(tmp_path, mode="user", cache_size=2)
+    try:
+        for telegram_id in (1, 2, 1, 3):
+            await router.get(telegram_id)
+        assert router.opened == 3
+        assert router.stored_names() == ["user-1", "user-2", "user-3"]
+
+        # user-2 вытеснен последним: повторное открытие снова создает движок
+        await router.get(2)
+        assert router.opened == 4
+        shard = await router.get(2)
+        async with shard.read_engine.connect() as conn:
+            version = (await conn.execute(select(schema_version.c.version))).scalar()
+        assert version == LATEST_VERSION
+    finally:
+        await router.close()
+
+
+async def test_api_writes_and_reads_in_user_shard(
+    sharded_client: AsyncClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тест: запросы API читают и пишут в шард пользователя из initData."""
+    router = make_router(tmp_path, count=3)
+    monkeypatch.setattr(db_session_module, "shard_router", router)
+    try:
+        for index, user in enumerate(USERS[:4]):
+            await add_expenses(sharded_client, user, index + 1)
+        for index, user in enumerate(USERS[:4]):
+            amounts = await list_amounts(sharded_client, user)
+            assert amounts == list(range(1, index + 2))
+
+        for user in USERS[:4]:
+            shard = await router.get(user["id"])
+            async with shard.engine.connect() as conn:
+                telegram_ids = (
+                    await conn.execute(select(user_table.c.telegram_id))
+                ).scalars()
+                assert user["id"] in set(telegram_ids)
+    finally:
+        await router.close()
+
+
+async def test_rebalance_moves_users_with_their_data(
+    sharded_client: AsyncClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Тест: после смены числа шардов rebalance переносит пользователей с
+    категориями, расходами и агрегатами, а опустевшие файлы удаляет.
+    """
+    before = make_router(tmp_path, count=4)
+    monkeypatch.setattr(db_session_module, "shard_router", before)
+    try:
+        for index, user in enumerate(USERS):
+            await add_expenses(sharded_client, user, index + 1)
+    finally:
+        await before.close()
+
+    after = make_router(tmp_path, count=2)
+    monkeypatch.setattr(db_session_module, "shard_router", after)
+    identity_cache.clear()
+    try:
+        moved = await rebalance(after)
+        expected_moves = sum(
+            before.shard_name(user["id"]) != after.shard_name(user["id"])
+            for user in USERS
+        )
+        assert moved == expected_moves > 0
+        assert after.stored_names() == ["shard-0000", "shard-0001"]
+
+        for index, user in enumerate(USERS):
+            amounts = await list_amounts(sharded_client, user)
+            assert amounts == list(range(1, index + 2))
+        for name in after.stored_names():
+            shard = await after.open(name)
+            async with shard.engine.connect() as conn:
+                assert await conn.run_sync(verify_rollups) == []
+                users = (await conn.execute(select(user_table))).mappings().all()
+            assert {after.shard_name(user["telegram_id"]) for user in users} == {name}
+            # Клиенты перенесенных пользователей полностью пересинхронизируются
+            assert all(
+                user["changes_horizon"] == user["data_version"]
+                for user in users
+                if before.shard_name(user["telegram_id"]) != name
+            )
+    finally:
+        await after.close()
+
+
+async def test_moved_user_resets_cursor_at_old_version(tmp_path: Path) -> None:
+    """
+    Тест: после переноса курсор, равный версии данных до переноса, требует
+    полной синхронизации — даже если у пользователя не было строк.
+    """
+    router = make_router(tmp_path, mode="user")
+    try:
+        source, target = await router.open("source"), await router.open("target")
+        async with source.engine.begin() as conn:
+            await conn.execute(
+                insert(user_table).values(
+                    telegram_id=7,
+                    full_name="U",
+                    created_at=datetime.now(UTC),
+                    data_version=3,
+                )
+            )
+        async with source.engine.begin() as source_conn:
+            async with target.engine.begin() as target_conn:
+                await copy_user(source_conn, target_conn, 7)
+
+        async with AsyncSession(target.engine) as session:
+            user_id = await resolve_user_id(7, session)
+            changes = await load_changes(session, user_id, since=3)
+        assert changes.reset is True
+        assert changes.cursor > 3
+    finally:
+        await router.close()
+
+
+async def test_rollups_checked_in_every_shard(
+    sharded_client: AsyncClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Тест: проверка и пересчет агрегатов проходят по всем шардам, а не
+    только по основной БД.
+    """
+    router = make_router(tmp_path, count=2)
+    monkeypatch.setattr(db_session_module, "shard_router", router)
+    try:
+        for user in USERS[:4]:
+            await add_expenses(sharded_client, user, 2)
+        broken = router.shard_name(USERS[0]["id"])
+        async with (await router.open(broken)).engine.begin() as conn:
+            await conn.execute(text("UPDATE expense_monthly_rollup SET total = 1"))
+
+        results = await check_shard_rollups(router)
+        assert set(results) == {"shard-0000", "shard-0001"}
+        assert {name for name, found in results.items() if found} == {broken}
+
+        assert await check_shard_rollups(router, rebuild=True) == {
+            "shard-0000": [],
+            "shard-0001": [],
+        }
+        results = await check_shard_rollups(router)
+        assert all(found == [] for found in results.values())
+    finally:
+        await router.close()
+
+
+async def test_purge_skips_request_cache_and_broken_shards(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """
+    Тест: очистка надгробий не открывает шарды в LRU запросов, а ошибка
+    одного файла не мешает очистить остальные.
+    """
+    router = make_router(tmp_path, mode="user")
+    try:
+        for telegram_id in (1, 2):
+            await router.get(telegram_id)
+    finally:
+        await router.close()
+    # Файл без схемы: очистка в нем падает
+    router.path("user-0").touch()
+
+    assert await router.purge_tombstones() == 0
+    assert router.opened == 2
+    assert router.stored_names() == ["user-0", "user-1", "user-2"]
+    failures = [r.getMessage() for r in caplog.records if r.levelname == "ERROR"]
+    assert failures == ["Очистка надгробий шарда user-0 не удалась"]
+
+
+async def test_reopened_shard_keeps_its_writer(tmp_path: Path) -> None:
+    """
+    Тест: шард, вытесненный с еще работающим писателем, при повторном
+    открытии возвращается тем же объектом — второго писателя у файла нет.
+    """
+    router = make_router(tmp_path, mode="user", cache_size=1)
+    try:
+        first = await router.get(1)
+        await first.writer.submit(noop)
+        assert first.writer.running
+
+        await router.get(2)
+        assert await router.get(1) is first
+        assert router.opened == 2
+    finally:
+        await router.close()
+    assert not first.writer.running
+
+
+async def test_get_shard_rejects_invalid_user_id(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тест: без целого telegram_id шард не выбирается и файл не создается."""
+    router = make_router(tmp_path, mode="user")
+    monkeypatch.setattr(db_session_module, "shard_router", router)
+    for user_data in ({}, {"id": "../escape"}, {"id": 1.5}):
+        with pytest.raises(HTTPException) as error:
+            await get_shard(user_data)
+        assert error.value.status_code == 403
+    assert router.stored_names() == []
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from datetime import date
+from typing import Any, List, Tuple
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from budget_bot.db.models import Category, Expense, User
+from budget_bot.db.writer import WriteCoordinator
+
+pytestmark = pytest.mark.asyncio
+
+
+async def create_owner(session: AsyncSession) -> Tuple[int, int]:
+    """Создает пользователя с категорией и возвращает их ID."""
+    user = User(telegram_id=777, full_name="Writer")
+    session.add(user)
+    await session.flush()
+    category = Category(name="Еда", user_id=user.id)
+    session.add(category)
+    await session.commit()
+    return int(user.id or 0), int(category.id or 0)
+
+
+def session_factory(session: AsyncSession) -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий к той же тестовой БД."""
+    return async_sessionmaker(session.bind, expire_on_commit=False)
+
+
+def expense_values(user_id: int, category_id: int, amount: float) -> Any:
+    return insert(Expense).values(
+        user_id=user_id,
+        category_id=category_id,
+        amount=amount,
+        expense_date=date(2025, 8, 1),
+    )
+
+
+async def count_expenses(session: AsyncSession) -> int:
+    result = await session.execute(select(func.count()).select_from(Expense))
+    return int(result.scalar_one())
+
+
+async def test_group_commit_isolates_failed_jobs(db_session: AsyncSession) -> None:
+    """
+    Тест: одновременные операции фиксируются одной транзакцией, а ошибка
+    одной операции откатывает только ее и достается только ее вызывающему.
+    """
+    user_id, category_id = await create_owner(db_session)
+    writer = WriteCoordinator(session_factory(db_session), max_delay=0.05)
+
+    def job(amount: float) -> Any:
+        async def run(session: AsyncSession) -> float:
+            await session.execute(expense_values(user_id, category_id, amount))
+            if amount == 3:
+                raise ValueError("bad amount")
+            return amount
+
+        return run
+
+    try:
+        results: List[Any] = await asyncio.gather(
+            *(writer.submit(job(amount)) for amount in range(1, 6)),
+            return_exceptions=True,
+        )
+    finally:
+        await writer.close()
+
+    assert results[:2] == [1, 2] and results[3:] == [4, 5]
+    assert isinstance(results[2], ValueError)
+    assert writer.batches == 1
+    assert await count_expenses(db_session) == 4
+
+
+async def test_group_commit_batches_concurrent_writes(
+    db_session: AsyncSession,
+) -> None:
+    """Тест: одновременные вставки фиксируются меньшим числом транзакций."""
+    user_id, category_id = await create_owner(db_session)
+    writer = WriteCoordinator(session_factory(db_session))
+    count = 200
+
+    async def insert_job(amount: float) -> None:
+        async def run(session: AsyncSession) -> None:
+            await session.execute(expense_values(user_id, category_id, amount))
+
+        await writer.submit(run)
+
+    try:
+        await asyncio.gather(*(insert_job(i + 1) for i in range(count)))
+    finally:
+        await writer.close()
+
+    assert await count_expenses(db_session) == count
+    assert writer.jobs == count
+    assert writer.batches < count
+
+
+@pytest.mark.benchmark
+async def test_group_commit_benchmark(
+    db_session: AsyncSession, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """
+    Бенчмарк: 1000 одновременных вставок — по сессии и коммиту на каждую
+    против единственного писателя с групповым коммитом.
+    """
+    user_id, category_id = await create_owner(db_session)
+    factory = session_factory(db_session)
+    count = 1000
+
+    async def insert_with_own_commit(amount: float) -> None:
+        async with factory() as session:
+            await session.execute(expense_values(user_id, category_id, amount))
+            await session.commit()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(insert_with_own_commit(i + 1) for i in range(count)))
+    direct_time = time.perf_counter() - started
+
+    writer = WriteCoordinator(factory)
+
+    async def insert_job(amount: float) -> None:
+        async def run(session: AsyncSession) -> None:
+            await session.execute(expense_values(user_id, category_id, amount))
+
+        await writer.submit(run)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(insert_job(i + 1) for i in range(count)))
+    finally:
+        await writer.close()
+    grouped_time = time.perf_counter() - started
+
+    with capsys.disabled():
+        print(
+            f"\nConcurrent inserts x{count}: commit per write "
+            f"{count / direct_time:,.0f}/s, group commit "
+            f"{count / grouped_time:,.0f}/s in {writer.batches} transactions"
+        )
+    assert await count_expenses(db_session) == 2 * count
+
+
+async def test_idle_writer_stops_and_restarts(db_session: AsyncSession) -> None:
+    """Тест: писатель с idle_timeout останавливается без операций и оживает."""
+    user_id, category_id = await create_owner(db_session)
+    writer = WriteCoordinator(session_factory(db_session), idle_timeout=0.01)
+
+    async def run(session: AsyncSession) -> None:
+        await session.execute(expense_values(user_id, category_id, 1))
+
+    try:
+        await writer.submit(run)
+        await asyncio.sleep(0.05)
+        assert writer._task is not None and writer._task.done()
+        await writer.submit(run)
+    finally:
+        await writer.close()
+
+    assert writer.batches == 2
+    assert await count_expenses(db_session) == 2
@@ -0,0 +1,57 @@
+import csv
+import io
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.filters import CommandObject
+from aiogram.types import FSInputFile
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from budget_bot.handlers.export import command_export
+from budget_bot.main import app
+from budget_bot.utils.security import get_validated_user_data
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_command_export(
+    client: AsyncClient, db_session: AsyncSession, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: /export отправляет документ с расходами пользователя."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    food_id = (await client.post("/api/categories", json={"name": "Еда"})).json()["id"]
+    await client.post(
+        "/api/expenses",
+        json={"category_id": food_id, "amount": 42, "expense_date": "2025-08-01"},
+    )
+
+    documents: List[str] = []
+
+    async def capture(document: FSInputFile, **kwargs: Any) -> None:
+        # Временный файл удаляется после отправки, читаем его сразу
+        documents.append(Path(document.path).read_text())
+
+    mock_message = AsyncMock()
+    mock_message.from_user.id = user_a_data["id"]
+    mock_message.answer_document.side_effect = capture
+    session_factory = async_sessionmaker(db_session.bind, class_=AsyncSession)
+
+    await command_export(
+        mock_message, CommandObject(command="export"), session_factory=session_factory
+    )
+
+    assert len(documents) == 1
+    rows = list(csv.DictReader(io.StringIO(documents[0])))
+    assert [(r["category"], r["amount"]) for r in rows] == [("Еда", "42.0")]
+
+    mock_message.reset_mock()
+    await command_export(
+        mock_message,
+        CommandObject(command="export", args="xml"),
+        session_factory=session_factory,
+    )
+    mock_message.answer_document.assert_not_called()
+    assert "/export csv" in mock_message.answer.call_args[0][0]
@@ -1,11 +1,19 @@
 # tests/test_main.py
-from typing import Any
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Mapping
 
 import pytest
 from httpx import AsyncClient
 from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from budget_bot.assets import IMMUTABLE_CACHE_CONTROL, AssetBundle
+from budget_bot.db.identity import identity_cache
+from budget_bot.main import app, run_cache_stats_logger
+from budget_bot.utils.security import get_validated_user_data
+
 pytestmark = pytest.mark.asyncio
 
 
@@ -37,3 +45,106 @@ async def test_lifespan_creates_tables(
     # Запускаем синхронную функцию проверки внутри асинхронной сессии
     tables_exist = await db_session.run_sync(check_tables_exist)
     assert tables_exist is True
+
+
+async def test_cache_stats_logged_while_running(
+    client: AsyncClient,
+    user_a_data: Dict[str, Any],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """
+    Тест: статистика кэшей периодически пишется в лог во время работы,
+    и счетчики в ней растут вместе с запросами.
+    """
+    caplog.set_level(logging.INFO, logger="budget_bot.main")
+    identity_cache.clear()
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    await client.post("/api/categories", json={"name": "Еда"})
+
+    stats_logger = asyncio.create_task(run_cache_stats_logger(0.01))
+    try:
+        for _ in range(3):
+            await client.get("/api/categories")
+            await asyncio.sleep(0.05)
+    finally:
+        stats_logger.cancel()
+
+    snapshots: Dict[str, List[Mapping[str, Any]]] = {}
+    for record in caplog.records:
+        if isinstance(record.args, Mapping):
+            name = record.msg.split(":")[0]
+            snapshots.setdefault(name, []).append(record.args)
+    assert set(snapshots) == {"Кэш initData", "Кэш идентификаторов"}
+    identity = snapshots["Кэш идентификаторов"]
+    assert len(identity) >= 2
+    assert identity[-1]["hits"] > identity[0]["hits"]
+    assert identity[-1]["hit_rate"] > 0
+
+
+async def test_root_served_precompressed_with_etag(client: AsyncClient) -> None:
+    """
+    Тест: главная страница отдается из памяти сжатой, со сильным ETag;
+    повторный запрос с этим ETag получает 304 без тела.
+    """
+    response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+    assert etag.startswith('"')
+    assert "Учет Расходов" in response.text
+
+    cached = await client.get(
+        "/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    plain = await client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != etag
+    assert plain.text == response.text
+
+
+async def test_static_index_still_served(client: AsyncClient) -> None:
+    """Тест: главная страница по-прежнему доступна как /static/index.html."""
+    root = await client.get("/")
+    response = await client.get("/static/index.html")
+    assert response.status_code == 200
+    assert "text/html" in response.headers["content-type"]
+    assert response.text == root.text
+    assert response.headers["etag"] == root.headers["etag"]
+
+
+async def test_asset_bundle_hashes_static_links(tmp_path: Path) -> None:
+    """
+    Тест: ссылки главной страницы на статику заменяются именами с хэшем,
+    которые кэшируются надолго.
+    """
+    (tmp_path / "app.js").write_text("console.log('budget');" * 100)
+    (tmp_path / "index.html").write_text('<script src="/static/app.js"></script>')
+
+    bundle = AssetBundle.build(tmp_path)
+    hashed = next(name for name in bundle.assets if name != "app.js")
+    assert hashed.startswith("app.") and hashed.endswith(".js")
+    assert bundle.entry.bodies["identity"] == (
+        f'<script src="/static/{hashed}"></script>'.encode()
+    )
+    assert bundle.assets[hashed].cache_control == IMMUTABLE_CACHE_CONTROL
+    assert bundle.assets["app.js"].cache_control == "no-cache"
+    assert "gzip" in bundle.assets[hashed].bodies
+
+
+async def test_api_responses_compressed(
+    client: AsyncClient, user_a_data: Dict[str, Any]
+) -> None:
+    """Тест: крупные ответы API сжимаются gzip, мелкие — нет."""
+    app.dependency_overrides[get_validated_user_data] = lambda: user_a_data
+    small = await client.get("/api/categories", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    for index in range(30):
+        await client.post("/api/categories", json={"name": f"Категория {index}"})
+    large = await client.get("/api/categories", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert len(large.json()) == 30
@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+from budget_bot.supervisor import BotProcess
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_bot_process_restarts_after_exit() -> None:
+    """Тест: завершившийся процесс бота запускается заново."""
+    bot = BotProcess(target=time.sleep, args=(0,), restart_delay=0.05)
+    bot.start()
+    try:
+        deadline = time.monotonic() + 30
+        while bot.starts < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert bot.starts >= 2
+    finally:
+        bot.stop()
+
+
+async def test_bot_process_stop_terminates() -> None:
+    """Тест: остановка supervisor завершает процесс бота и не перезапускает его."""
+    bot = BotProcess(target=time.sleep, args=(60,), restart_delay=0.05)
+    bot.start()
+    bot.stop(timeout=5)
+    assert bot.process is not None and not bot.process.is_alive()
+    time.sleep(0.2)
+    assert bot.starts == 1
@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, TelegramMethod
+from aiogram.types import Chat, Message
+from httpx import AsyncClient
+
+from budget_bot.bot import create_dispatcher
+from budget_bot.main import app
+from budget_bot.webhook import SECRET_TOKEN_HEADER, WEBHOOK_PATH, TelegramWebhook
+
+pytestmark = pytest.mark.asyncio
+
+SECRET = "test-secret_token"
+
+# Роутеры aiogram подключаются к диспетчеру один раз, поэтому он общий
+DISPATCHER = create_dispatcher("https://test.app")
+
+
+class FakeTelegramSession(BaseSession):
+    """Сессия бота без сети: запоминает вызовы Bot API и отвечает сообщением."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.requests: List[TelegramMethod[Any]] = []
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None
+    ) -> Any:
+        self.requests.append(method)
+        return Message(
+            message_id=len(self.requests),
+            date=datetime.now(),
+            chat=Chat(id=1, type="private"),
+        )
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest_asyncio.fixture
+async def fake_telegram() -> AsyncIterator[FakeTelegramSession]:
+    """Подключает к приложению webhook с ботом на фальшивой сессии."""
+    session = FakeTelegramSession()
+    bot = Bot(token="42:TEST", session=session)
+    app.state.telegram_webhook = TelegramWebhook(bot, DISPATCHER, SECRET)
+    yield session
+    del app.state.telegram_webhook
+
+
+def start_update(update_id: int = 1) -> Dict[str, Any]:
+    user = {"id": 555, "is_bot": False, "first_name": "Test"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": 10,
+            "date": 1_700_000_000,
+            "chat": {"id": 555, "type": "private"},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def test_webhook_feeds_update_to_dispatcher(
+    client: AsyncClient, fake_telegram: FakeTelegramSession
+) -> None:
+    """Тест: обновление с верным токеном обрабатывается хэндлерами бота."""
+    response = await client.post(
+        WEBHOOK_PATH, json=start_update(), headers={SECRET_TOKEN_HEADER: SECRET}
+    )
+    assert response.status_code == 200
+
+    assert len(fake_telegram.requests) == 1
+    method = fake_telegram.requests[0]
+    assert isinstance(method, SendMessage)
+    assert method.chat_id == 555
+    assert "Добро пожаловать" in method.text
+
+
+async def test_webhook_rejects_bad_requests(
+    client: AsyncClient, fake_telegram: FakeTelegramSession
+) -> None:
+    """
+    Тест: запросы без секретного токена и с битым телом (в том числе не JSON)
+    не доходят до бота; на битое тело отвечаем 400, а не 500.
+    """
+    for headers in ({}, {SECRET_TOKEN_HEADER: "wrong"}):
+        response = await client.post(WEBHOOK_PATH, json=start_update(), headers=headers)
+        assert response.status_code == 401
+
+    response = await client.post(
+        WEBHOOK_PATH, json={"message": {}}, headers={SECRET_TOKEN_HEADER: SECRET}
+    )
+    assert response.status_code == 400
+    for body in (b"", b"not json", b'{"update_id": ', b"\xff\xfe"):
+        response = await client.post(
+            WEBHOOK_PATH, content=body, headers={SECRET_TOKEN_HEADER: SECRET}
+        )
+        assert response.status_code == 400
+    assert fake_telegram.requests == []
+
+
+async def test_webhook_disabled_in_polling_mode(client: AsyncClient) -> None:
+    """Тест: без настроенного webhook маршрут не существует для клиентов."""
+    response = await client.post(
+        WEBHOOK_PATH, json=start_update(), headers={SECRET_TOKEN_HEADER: SECRET}
+    )
+    assert response.status_code == 404
@@ -0,0 +1,22 @@
+import pytest
+
+from budget_bot.utils.cache import CacheStats
+
+
+def test_cache_stats_snapshot_and_reset() -> None:
+    """Тест: доля попаданий и статистика считаются по счетчикам и сбрасываются."""
+    counters = CacheStats()
+    assert counters.hit_rate == 0.0
+
+    counters.hits += 3
+    counters.misses += 1
+    assert counters.snapshot(2, 10) == {
+        "size": 2,
+        "maxsize": 10,
+        "hits": 3,
+        "misses": 1,
+        "hit_rate": pytest.approx(0.75),
+    }
+
+    counters.reset()
+    assert (counters.hits, counters.misses) == (0, 0)
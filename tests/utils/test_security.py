@@ -1,13 +1,43 @@
 import hashlib
 import hmac
 import json
+import time
+import timeit
+from typing import List, Optional
 from urllib.parse import quote
 
 import pytest
+from fastapi import HTTPException
 from hypothesis import given
 from hypothesis import strategies as st
 
-from budget_bot.utils.security import parse_init_data, validate_init_data
+from budget_bot.utils import security
+from budget_bot.utils.security import (
+    InitData,
+    InitDataCache,
+    get_validated_user_data,
+    parse_init_data,
+    validate_init_data,
+)
+
+BOT_TOKEN = "6910699622:AAHl_s_jUnqD0obO23423423423423423_o"
+
+
+def make_signed_init_data(user_json: str, auth_date: Optional[str] = None) -> str:
+    """Формирует корректно подписанную строку initData (по умолчанию свежую)."""
+    if auth_date is None:
+        auth_date = str(int(time.time()))
+    data_pairs = [("auth_date", auth_date), ("user", user_json)]
+    data_check_string = "\n".join(
+        f"{key}={value}" for key, value in sorted(data_pairs, key=lambda x: x[0])
+    )
+    secret_key = hmac.new(
+        key=b"WebAppData", msg=BOT_TOKEN.encode(), digestmod=hashlib.sha256
+    ).digest()
+    correct_hash = hmac.new(
+        key=secret_key, msg=data_check_string.encode(), digestmod=hashlib.sha256
+    ).hexdigest()
+    return f"auth_date={auth_date}&user={quote(user_json)}&hash={correct_hash}"
 
 
 def test_parse_init_data_success() -> None:
@@ -121,3 +151,190 @@ def test_parse_init_data_is_robust(init_data_str: str) -> None:
         assert result is None or isinstance(result, dict)
     except Exception as e:
         pytest.fail(f"parse_init_data failed on input: {repr(init_data_str)} with {e}")
+
+
+class FakeClock:
+    """Управляемые часы для проверки TTL."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_init_data_cache_ttl() -> None:
+    """Тест: запись кэша перестает возвращаться после истечения TTL."""
+    clock = FakeClock()
+    cache = InitDataCache(maxsize=10, ttl=60, clock=clock)
+    key = cache.make_key("init-data")
+    cache.put(key, {"id": 1})
+
+    assert cache.get(key) == {"id": 1}
+    clock.now += 61
+    assert cache.get(key) is None
+    assert cache.counters.hits == 1
+    assert cache.counters.misses == 1
+    assert len(cache) == 0
+
+
+def test_init_data_cache_lru_eviction() -> None:
+    """Тест: при переполнении вытесняется давно не использованная запись."""
+    cache = InitDataCache(maxsize=2, ttl=60)
+    key_a, key_b, key_c = (cache.make_key(s) for s in ("a", "b", "c"))
+    cache.put(key_a, {"id": 1})
+    cache.put(key_b, {"id": 2})
+    cache.get(key_a)  # key_a становится самой свежей записью
+    cache.put(key_c, {"id": 3})
+
+    assert cache.get(key_b) is None
+    assert cache.get(key_a) == {"id": 1}
+    assert cache.get(key_c) == {"id": 3}
+
+
+def test_get_validated_user_data_uses_cache(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Тест: повторный запрос с тем же initData не проверяет подпись заново."""
+    monkeypatch.setenv("BOT_TOKEN", BOT_TOKEN)
+    cache = InitDataCache(maxsize=10, ttl=60)
+    monkeypatch.setattr(security, "init_data_cache", cache)
+
+    calls: List[str] = []
+    original_verify = InitData.verify_signature
+
+    def counting_verify(self: InitData, bot_token: str) -> bool:
+        calls.append(bot_token)
+        is_valid: bool = original_verify(self, bot_token)
+        return is_valid
+
+    monkeypatch.setattr(InitData, "verify_signature", counting_verify)
+
+    init_data = make_signed_init_data('{"id":12345,"first_name":"Test"}')
+    first = get_validated_user_data(init_data)
+    second = get_validated_user_data(init_data)
+
+    assert first == second == {"id": 12345, "first_name": "Test"}
+    assert len(calls) == 1
+    assert cache.counters.hits == 1
+    assert cache.counters.misses == 1
+
+
+def test_get_validated_user_data_does_not_cache_invalid(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Тест: невалидные initData не попадают в кэш."""
+    monkeypatch.setenv("BOT_TOKEN", BOT_TOKEN)
+    cache = InitDataCache(maxsize=10, ttl=60)
+    monkeypatch.setattr(security, "init_data_cache", cache)
+
+    init_data = make_signed_init_data('{"id":12345}').replace("hash=", "hash=0")
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            get_validated_user_data(init_data)
+        assert exc_info.value.status_code == 403
+
+    assert len(cache) == 0
+    assert cache.counters.hits == 0
+
+
+def test_init_data_parse_single_pass() -> None:
+    """Тест: InitData.parse извлекает все поля за один разбор строки."""
+    init_data = make_signed_init_data('{"id":42,"first_name":"Ann"}', "1700000000")
+    parsed = InitData.parse(f"query_id=AAE1&{init_data}")
+
+    assert parsed is not None
+    assert parsed.user == {"id": 42, "first_name": "Ann"}
+    assert parsed.auth_date == 1700000000
+    assert parsed.query_id == "AAE1"
+    assert parsed.hash is not None and len(parsed.hash) == 64
+    assert "hash=" not in parsed.data_check_string
+
+
+def test_init_data_freshness() -> None:
+    """Тест: проверка окна свежести по auth_date."""
+    parsed = InitData.parse("auth_date=1000&hash=abc")
+    assert parsed is not None
+    assert parsed.is_fresh(max_age=60, now=1050) is True
+    assert parsed.is_fresh(max_age=60, now=1061) is False
+    # auth_date из будущего допускается только в пределах расхождения часов
+    assert parsed.is_fresh(max_age=60, now=970, skew=30) is True
+    assert parsed.is_fresh(max_age=60, now=969, skew=30) is False
+
+    without_auth_date = InitData.parse("hash=abc")
+    assert without_auth_date is not None
+    assert without_auth_date.is_fresh(max_age=60) is False
+
+
+def test_get_validated_user_data_rejects_stale_before_crypto(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Тест: устаревшие initData отклоняются без вычисления HMAC."""
+    monkeypatch.setenv("BOT_TOKEN", BOT_TOKEN)
+    monkeypatch.setattr(security, "init_data_cache", InitDataCache())
+    monkeypatch.setattr(security, "INIT_DATA_MAX_AGE", 3600)
+
+    def fail_verify(self: InitData, bot_token: str) -> bool:
+        raise AssertionError("HMAC не должен вычисляться для устаревших данных")
+
+    monkeypatch.setattr(InitData, "verify_signature", fail_verify)
+
+    stale_auth_date = str(int(time.time()) - 7200)
+    init_data = make_signed_init_data('{"id":1}', stale_auth_date)
+    with pytest.raises(HTTPException) as exc_info:
+        get_validated_user_data(init_data)
+    assert exc_info.value.status_code == 403
+    assert exc_info.value.detail == "initData has expired"
+
+
+def test_get_validated_user_data_rejects_future_auth_date(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест: initData с auth_date из будущего отклоняются, а в пределах
+    расхождения часов кэшируются не дольше INIT_DATA_MAX_AGE.
+    """
+    monkeypatch.setenv("BOT_TOKEN", BOT_TOKEN)
+    clock = FakeClock()
+    cache = InitDataCache(ttl=86400, clock=clock)
+    monkeypatch.setattr(security, "init_data_cache", cache)
+    monkeypatch.setattr(security, "INIT_DATA_MAX_AGE", 3600)
+
+    future_auth_date = str(int(time.time()) + 3600)
+    with pytest.raises(HTTPException) as exc_info:
+        get_validated_user_data(make_signed_init_data('{"id":1}', future_auth_date))
+    assert exc_info.value.status_code == 403
+    assert exc_info.value.detail == "initData has expired"
+
+    skewed_auth_date = str(int(time.time()) + security.INIT_DATA_CLOCK_SKEW // 2)
+    init_data = make_signed_init_data('{"id":1}', skewed_auth_date)
+    assert get_validated_user_data(init_data) == {"id": 1}
+    clock.now += 3600
+    assert cache.get(cache.make_key(init_data)) is None
+
+
+@pytest.mark.benchmark
+def test_stale_rejection_benchmark(capsys: pytest.CaptureFixture[str]) -> None:
+    """
+    Микробенчмарк: ранний отказ по auth_date дешевле полной проверки
+    подписи и разбора пользователя.
+    """
+    user_json = '{"id":12345,"first_name":"Test","last_name":"User"}'
+    init_data = make_signed_init_data(user_json, "1600000000")
+    number = 2000
+
+    def full_check() -> None:
+        validate_init_data(init_data, BOT_TOKEN)
+        parse_init_data(init_data)
+
+    def early_reject() -> None:
+        parsed = InitData.parse(init_data)
+        assert parsed is not None and not parsed.is_fresh(86400)
+
+    full_time = min(timeit.repeat(full_check, number=number, repeat=3))
+    early_time = min(timeit.repeat(early_reject, number=number, repeat=3))
+    with capsys.disabled():
+        print(
+            f"\ninitData x{number}: full check {full_time * 1000:.1f} ms, "
+            f"stale rejection {early_time * 1000:.1f} ms"
+        )